@@ -1,11 +1,17 @@
+import os
+import sys
 import pandas as pd
 
+# Shared pipeline modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from diabetes_pipeline.cache import load_dataset
+
 # 1. Show all columns when printing
 pd.set_option('display.max_columns', None)
 
 # 2. Load the CSV file
 file_path = r"C:\Users\leonw\Desktop\Projects\Diabetes\diabetes_012_health_indicators_BRFSS2015.csv"
-df = pd.read_csv(file_path)
+df = load_dataset(file_path)
 
 # 3. Preview data
 print("=== Top 5 rows ===")
@@ -1,28 +1,36 @@
+import os
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 
+# Shared pipeline modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from diabetes_pipeline.cache import load_dataset
+from diabetes_pipeline.summary import class_summary
+
 # 1. Load data
 file_path = r"C:\Users\leonw\Desktop\Projects\Diabetes\diabetes_012_health_indicators_BRFSS2015.csv"
-df = pd.read_csv(file_path)
+df = load_dataset(file_path)
+
+# Class means and every target correlation from one fused pass over df
+summary = class_summary(df)
 
 # 2. Group‐Means Matrix
-group_means = df.groupby('Diabetes_012').mean().T
+group_means = summary.means()
 group_means.columns = ['Healthy (0)', 'Prediabetes (1)', 'Diabetes (2)']
 
 print("=== Feature Means by Diabetes Status ===")
 print(group_means)
 
-# 3. Binary Correlation Matrices
-df['is_prediabetes'] = (df['Diabetes_012'] == 1).astype(int)
-df['is_diabetes']    = (df['Diabetes_012'] == 2).astype(int)
-
-corr_pre = df.corr()['is_prediabetes'].sort_values()
-corr_di  = df.corr()['is_diabetes'].sort_values()
+# 3. Binary Correlations (one-vs-rest targets, no helper columns on df)
+corr_bin = summary.correlations()
+corr_pre = corr_bin['is_prediabetes'].sort_values()
+corr_di  = corr_bin['is_diabetes'].sort_values()
 
 corr_df = pd.DataFrame({
     'Corr with Prediabetes': corr_pre,
     'Corr with Diabetes':    corr_di
-}).drop(index=['is_prediabetes', 'is_diabetes', 'Diabetes_012'])
+}).drop(index=['Diabetes_012'])
 
 print("\n=== Binary Correlations ===")
 print(corr_df)
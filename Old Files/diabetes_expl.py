@@ -1,13 +1,23 @@
+import os
+import sys
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 
+# Shared pipeline modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from diabetes_pipeline.cache import load_dataset
+from diabetes_pipeline.summary import class_summary
+
 # Load data
 file_path = r"C:\Users\leonw\Desktop\Projects\Diabetes\diabetes_012_health_indicators_BRFSS2015.csv"
-df = pd.read_csv(file_path)
+df = load_dataset(file_path)
+
+# Class means and target correlations from one fused pass over df
+summary = class_summary(df)
 
 # 1) Compute means and transpose
-group_means = df.groupby('Diabetes_012').mean().T
+group_means = summary.means()
 
 # 2) Rename columns for clarity
 group_means.columns = ['Healthy (0)', 'Prediabetes (1)', 'Diabetes (2)']
@@ -17,7 +27,7 @@ print("=== Mean values by Diabetes Status ===")
 print(group_means)
 
 # 4) Correlations with the target
-corr = df.corr()['Diabetes_012'].sort_values()
+corr = summary.correlations()['Diabetes_012'].sort_values()
 
 # 5) Plot heatmap
 plt.figure(figsize=(6,8))
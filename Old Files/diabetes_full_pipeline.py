@@ -4,11 +4,16 @@
 # ===============================
 
 import os
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.preprocessing import StandardScaler
+
+# Shared pipeline modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from diabetes_pipeline.cohort import Cohort
+from diabetes_pipeline.pipeline import build_pipeline
 
 # =====================================
 # 1) Load dataset
@@ -19,7 +24,10 @@ if not os.path.exists(file_path):
     print(f"Error: File not found at {file_path}")
     exit()
 
-df = pd.read_csv(file_path)
+# Every section below is a memoised stage: results are cached in
+# .pipeline_cache and only stages whose code, parameters or inputs changed rerun
+pipeline = build_pipeline(file_path)
+df = pipeline.run('load')  # binary uint8/float32 cache, built on first run
 print(f"Successfully loaded dataset from: {file_path}")
 print(df.shape)
 print(df.head())
@@ -27,7 +35,7 @@ print(df.head())
 # =====================================
 # 2) Correlation matrix
 # =====================================
-corr = df.corr(numeric_only=True)
+corr = pipeline.run('correlations')
 plt.figure(figsize=(12, 10))
 sns.heatmap(corr, cmap="RdBu_r", center=0)
 plt.title("Correlation Matrix of Health Indicators", fontsize=14)
@@ -37,10 +45,7 @@ plt.show()
 # 3) Identify risk and protective factors
 # =====================================
 target = 'Diabetes_012'
-correlations = corr[target].drop(target).sort_values()
-
-risk_factors = correlations[correlations > 0].index.tolist()
-protective_factors = correlations[correlations < 0].index.tolist()
+risk_factors, protective_factors = pipeline.run('factors')
 
 print("\n" + "="*60)
 print("RISK AND PROTECTIVE FACTORS")
@@ -56,11 +61,7 @@ print("="*60)
 # =====================================
 # 4) Standardize features and compute RiskScore
 # =====================================
-scaler = StandardScaler()
-scaled = pd.DataFrame(scaler.fit_transform(df[risk_factors + protective_factors]),
-                      columns=risk_factors + protective_factors)
-
-df['RiskScore'] = scaled[risk_factors].sum(axis=1) - scaled[protective_factors].sum(axis=1)
+df['RiskScore'] = pipeline.run('scores')
 
 # =====================================
 # 5) Distribution of RiskScore
@@ -75,7 +76,7 @@ plt.show()
 # =====================================
 # 6) Average RiskScore by Diabetes Status
 # =====================================
-group_scores = df.groupby(target)['RiskScore'].mean()
+group_scores = pipeline.run('status_scores')
 plt.figure(figsize=(6, 4))
 group_scores.plot(kind="bar", color=["green", "orange", "red"])
 plt.title("Average Risk Score by Diabetes Status")
@@ -96,15 +97,13 @@ print("="*60)
 # =====================================
 # 7) High-risk individuals (top 10%)
 # =====================================
-threshold = df['RiskScore'].quantile(0.90)
-high_risk_individuals = df[df['RiskScore'] >= threshold]
-
-def top_risk_features(row, n=3):
-    risk_vals = row[risk_factors]
-    top_risks = risk_vals.sort_values(ascending=False).head(n).index.tolist()
-    return ', '.join(top_risks)
+threshold = pipeline.run('threshold')
 
-high_risk_individuals['Top_Risk_Features'] = high_risk_individuals.apply(top_risk_features, axis=1)
+# Top-3 standardized risk contributors, computed once for every row so the
+# high-risk subsets below inherit the column instead of recomputing it
+df['Top_Risk_Features'] = pipeline.run('top_features')
+# Cohorts are predicates over df; only the plotted column is materialised
+high_risk_individuals = Cohort(df).where('RiskScore', '>=', threshold, name='high_risk')
 
 plt.figure(figsize=(10, 6))
 sns.histplot(high_risk_individuals['RiskScore'], bins=20, kde=True, color="red")
@@ -116,8 +115,7 @@ plt.show()
 # =====================================
 # 8) High-risk non-diabetic / pre-diabetic
 # =====================================
-high_risk_non_diabetic = high_risk_individuals[high_risk_individuals[target] != 2]
-high_risk_non_diabetic['Top_Risk_Features'] = high_risk_non_diabetic.apply(top_risk_features, axis=1)
+high_risk_non_diabetic = high_risk_individuals.where(target, '!=', 2, name='high_risk_non_diabetic')
 
 plt.figure(figsize=(10, 6))
 sns.histplot(high_risk_non_diabetic['RiskScore'], bins=20, kde=True, color="orange")
@@ -129,7 +127,11 @@ plt.show()
 # =====================================
 # 9) Top 10 High-Risk Non-Diabetic / Pre-Diabetic Individuals
 # =====================================
-top_leaderboard = high_risk_non_diabetic.sort_values('RiskScore', ascending=False).head(10)
+# Bounded top-10 boards (overall, non-diabetic, pre-diabetic) without sorting
+# the population. Keeping the board's rows inside the top 10% gives the top
+# 10 of the high-risk subset (fewer if it has under 10 non-diabetic rows)
+top_leaderboard = pipeline.run('leaderboard')
+top_leaderboard = top_leaderboard[top_leaderboard['RiskScore'] >= threshold]
 leaderboard_display = top_leaderboard[['RiskScore', 'Top_Risk_Features', target]].copy()
 leaderboard_display.columns = ['Risk Score', 'Top Risk Features', 'Diabetes Status']
 leaderboard_display = leaderboard_display.reset_index(drop=True)
@@ -157,14 +159,12 @@ plt.show()
 # 10) Income Analysis (4 groups)
 # =====================================
 if 'Income' in df.columns:
-    # Use qcut with duplicates='drop' and generate matching labels
-    income_groups = pd.qcut(df['Income'], q=4, duplicates='drop')
-    n_groups = income_groups.cat.categories.size
-    labels = ['Low', 'Medium', 'High', 'Very High'][:n_groups]
-    df['IncomeGroup'] = income_groups.cat.rename_categories(labels)
+    # Income quartiles (qcut, duplicates dropped) and per-group summary stages;
+    # changing the cut only reruns these two
+    df['IncomeGroup'] = pipeline.run('income_groups')
     
     # Average risk score by income group
-    income_risk = df.groupby('IncomeGroup')['RiskScore'].mean()
+    income_risk = pipeline.run('income_summary')['mean_risk_score']
     
     plt.figure(figsize=(8, 5))
     sns.barplot(x=income_risk.index, y=income_risk.values, color='teal')
@@ -1,7 +1,15 @@
+import os
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 from sklearn.preprocessing import StandardScaler
 
+# Shared pipeline modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from diabetes_pipeline.cache import load_dataset
+from diabetes_pipeline.cohort import Cohort
+from diabetes_pipeline.summary import class_summary
+
 # 1. Human-readable descriptions for each feature
 column_key = {
     'HighBP':               'High blood pressure (1 = yes; 0 = no)',
@@ -49,10 +57,13 @@ def show_table(df: pd.DataFrame, title: str):
 
 # 3. Load the dataset (update path as needed)
 file_path = r"C:\Users\leonw\Desktop\Projects\Diabetes\diabetes_012_health_indicators_BRFSS2015.csv"
-df = pd.read_csv(file_path)
+df = load_dataset(file_path)
+
+# Class means and every target correlation from one fused pass over df
+summary = class_summary(df)
 
 # 4. Compute feature means by Diabetes_012 and round
-group_means = df.groupby('Diabetes_012').mean().T.round(2)
+group_means = summary.means().round(2)
 group_means.columns = ['Healthy (0)', 'Prediabetes (1)', 'Diabetes (2)']
 
 # 5. Insert descriptions into the first column
@@ -68,13 +79,10 @@ print("=== Average Health Indicators by Diabetes Status ===")
 print(group_means_desc)
 show_table(group_means_desc, "Average Health Indicators by Diabetes Status")
 
-# 7. Create binary flags for prediabetes and diabetes
-df['is_prediabetes'] = (df['Diabetes_012'] == 1).astype(int)
-df['is_diabetes']    = (df['Diabetes_012'] == 2).astype(int)
-
-# 8. Compute and round correlations
-corr_pre = df.corr()['is_prediabetes'].sort_values().round(2)
-corr_di  = df.corr()['is_diabetes'].sort_values().round(2)
+# 7-8. Correlations with prediabetes and diabetes flags, from the same pass
+corr_bin = summary.correlations()
+corr_pre = corr_bin['is_prediabetes'].sort_values().round(2)
+corr_di  = corr_bin['is_diabetes'].sort_values().round(2)
 
 # 9. Build a clean correlation DataFrame and add descriptions
 corr_df = pd.DataFrame({
@@ -138,18 +146,21 @@ print("\nHigh-risk factors:", high_risk_feats)
 print("Secondary-risk factors:", mod_risk_feats)
 
 # 14. Compute and display risk scores for healthy individuals
-healthy = df[df['Diabetes_012'] == 0].copy()
+# The healthy cohort is a predicate over df: only the scored features of its
+# rows are materialised, and df itself is never copied or rescaled
+healthy = Cohort(df).where('Diabetes_012', '==', 0, name='healthy')
 all_feats = high_risk_feats + mod_risk_feats
+healthy_feats = healthy.frame(all_feats)
 
 # 14a. Standardize continuous features
-cont_feats = [f for f in all_feats if healthy[f].nunique() > 2]
+cont_feats = [f for f in all_feats if healthy_feats[f].nunique() > 2]
 scaler = StandardScaler()
-healthy[cont_feats] = scaler.fit_transform(healthy[cont_feats])
+healthy_feats[cont_feats] = scaler.fit_transform(healthy_feats[cont_feats])
 
 # 14b. Sum up standardized + binary features to create the risk_score
-healthy['risk_score'] = healthy[all_feats].sum(axis=1).round(2)
+healthy_feats['risk_score'] = healthy_feats[all_feats].sum(axis=1).round(2)
 
 # 15. Show top 10 healthy individuals by risk_score
-top10 = healthy.sort_values('risk_score', ascending=False).head(10)
+top10 = healthy_feats.sort_values('risk_score', ascending=False).head(10)
 print("\nTop 10 Healthy Individuals by Risk Score")
 print(top10[['risk_score'] + high_risk_feats + mod_risk_feats].round(2))
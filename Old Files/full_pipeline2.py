@@ -4,6 +4,7 @@
 # ===============================
 
 import os
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -11,7 +12,13 @@ import seaborn as sns
 from sklearn.preprocessing import StandardScaler
 from tabulate import tabulate  # pip install tabulate if needed
 
-pd.options.mode.chained_assignment = None  # Suppress SettingWithCopyWarning
+# Shared pipeline modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from diabetes_pipeline.attribution import top_risk_features
+from diabetes_pipeline.cache import load_dataset
+from diabetes_pipeline.cohort import Cohort
+from diabetes_pipeline.leaderboard import LeaderboardSet
+from diabetes_pipeline.stratify import income_groups, stratum_summary
 
 # =====================================
 # 1) Load dataset
@@ -21,7 +28,7 @@ if not os.path.exists(file_path):
     print(f"Error: File not found at {file_path}")
     exit()
 
-df = pd.read_csv(file_path)
+df = load_dataset(file_path)  # binary uint8/float32 cache, built on first run
 print(f"Successfully loaded dataset from: {file_path}")
 print(df.shape)
 print(df.head())
@@ -90,14 +97,12 @@ print(tabulate(scores_df, headers='keys', tablefmt='grid', floatfmt=".3f"))
 # 7) High-risk individuals (top 10%)
 # =====================================
 threshold = df['RiskScore'].quantile(0.90)
-high_risk_individuals = df[df['RiskScore'] >= threshold]
 
-def top_risk_features(row, n=3):
-    risk_vals = row[risk_factors]
-    top_risks = risk_vals.sort_values(ascending=False).head(n).index.tolist()
-    return ', '.join(top_risks)
-
-high_risk_individuals['Top_Risk_Features'] = high_risk_individuals.apply(top_risk_features, axis=1)
+# Top-3 standardized risk contributors, computed once for every row so the
+# high-risk subsets below inherit the column instead of recomputing it
+df['Top_Risk_Features'] = top_risk_features(df, risk_factors, n=3)
+# Cohorts are predicates over df; only the plotted column is materialised
+high_risk_individuals = Cohort(df).where('RiskScore', '>=', threshold, name='high_risk')
 
 plt.figure(figsize=(10, 6))
 sns.histplot(high_risk_individuals['RiskScore'], bins=20, kde=True, color="red")
@@ -109,8 +114,7 @@ plt.show()
 # =====================================
 # 8) High-risk non-diabetic / pre-diabetic
 # =====================================
-high_risk_non_diabetic = high_risk_individuals[high_risk_individuals[target] != 2]
-high_risk_non_diabetic['Top_Risk_Features'] = high_risk_non_diabetic.apply(top_risk_features, axis=1)
+high_risk_non_diabetic = high_risk_individuals.where(target, '!=', 2, name='high_risk_non_diabetic')
 
 plt.figure(figsize=(10, 6))
 sns.histplot(high_risk_non_diabetic['RiskScore'], bins=20, kde=True, color="orange")
@@ -122,7 +126,12 @@ plt.show()
 # =====================================
 # 9) Top 10 High-Risk Non-Diabetic / Pre-Diabetic Individuals (Table)
 # =====================================
-top_leaderboard = high_risk_non_diabetic.sort_values('RiskScore', ascending=False).head(10)
+# Bounded top-10 boards (overall, non-diabetic, pre-diabetic) without sorting
+# the population. Keeping the board's rows inside the top 10% gives the top
+# 10 of the high-risk subset (fewer if it has under 10 non-diabetic rows)
+leaderboards = LeaderboardSet(k=10, payload=['Top_Risk_Features', target], group_by=None).update(df)
+top_leaderboard = leaderboards['non_diabetic']
+top_leaderboard = top_leaderboard[top_leaderboard['RiskScore'] >= threshold]
 leaderboard_display = top_leaderboard[['RiskScore', 'Top_Risk_Features', target]].copy()
 leaderboard_display.columns = ['Risk Score', 'Top Risk Features', 'Diabetes Status']
 leaderboard_display = leaderboard_display.reset_index(drop=True)
@@ -138,16 +147,15 @@ print(tabulate(leaderboard_display, headers='keys', tablefmt='grid', floatfmt=".
 # =====================================
 if 'Income' in df.columns:
     # Create 4 income groups
-    income_groups = pd.qcut(df['Income'], q=4, duplicates='drop')
-    n_groups = income_groups.cat.categories.size
-    labels = ['Low','Medium','High','Very High'][:n_groups]
-    df['IncomeGroup'] = income_groups.cat.rename_categories(labels)
+    df['IncomeGroup'] = income_groups(df['Income'])
+
+    # All income-group statistics from one grouped pass
+    income_summary = stratum_summary(df, 'IncomeGroup', target=target)
 
     # Average RiskScore by IncomeGroup
-    income_risk = df.groupby('IncomeGroup')['RiskScore'].mean()
     income_risk_table = pd.DataFrame({
-        'Income Group': income_risk.index,
-        'Average Risk Score': income_risk.values
+        'Income Group': income_summary.index,
+        'Average Risk Score': income_summary['mean_risk_score'].values
     })
     print("\n" + "="*60)
     print("AVERAGE RISK SCORES BY INCOME GROUP")
@@ -155,9 +163,7 @@ if 'Income' in df.columns:
     print(tabulate(income_risk_table, headers='keys', tablefmt='grid', floatfmt=".3f"))
 
     # Diabetes prevalence by IncomeGroup
-    income_diabetes = df.groupby(['IncomeGroup', target]).size().unstack(fill_value=0)
-    income_diabetes_prop = income_diabetes.div(income_diabetes.sum(axis=1), axis=0)
-    income_diabetes_prop_table = income_diabetes_prop.reset_index()
+    income_diabetes_prop_table = income_summary[['no_diabetes', 'prediabetes', 'diabetes']].reset_index()
     income_diabetes_prop_table.columns = ['IncomeGroup', 'No Diabetes (0)', 'Pre-diabetes (1)', 'Diabetes (2)']
     print("\n" + "="*80)
     print("DIABETES STATUS PROPORTION BY INCOME GROUP")
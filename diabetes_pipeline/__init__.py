@@ -0,0 +1,9 @@
+"""
+Reusable building blocks for the diabetes risk analysis pipelines.
+
+The scripts in ``Old Files/`` and the notebook stay the readable, top-to-bottom
+version of the analysis; the modules in this package hold the pieces that need
+to be fast or reusable. Submodules are imported explicitly, e.g.
+``from diabetes_pipeline.attribution import top_risk_features``, so importing
+the package itself stays cheap.
+"""
@@ -0,0 +1,3 @@
+from diabetes_pipeline.cli import main
+
+main()
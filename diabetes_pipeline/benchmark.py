@@ -0,0 +1,264 @@
+"""
+Benchmark suite for the pipeline steps, on synthetic BRFSS-shaped data.
+
+Each step (load, correlation, scoring, attribution, thresholding, income
+grouping, logistic regression) is timed over ``--repeat`` runs (best wall time
+is kept) and then run once more under ``tracemalloc`` for its peak Python /
+NumPy allocation. Results are written as JSON together with the dataset size,
+seed, library versions and git commit, and can be compared with an earlier
+run to flag regressions.
+
+Usage:
+    python -m diabetes_pipeline.benchmark --rows 1000000 --out bench.json
+    python -m diabetes_pipeline.benchmark --rows 1000000 --baseline bench.json --tolerance 0.2
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from diabetes_pipeline.attribution import top_risk_features
+from diabetes_pipeline.cache import build_cache, load_dataset
+from diabetes_pipeline.columns import TARGET
+from diabetes_pipeline.correlation import target_correlations
+from diabetes_pipeline.model import RiskModel
+from diabetes_pipeline.quantiles import assign_risk_levels
+from diabetes_pipeline.regression import design_matrix, fit_logit
+from diabetes_pipeline.stratify import stratum_summary
+from diabetes_pipeline.synthetic import write_csv
+
+
+# =====================================
+# Steps
+# =====================================
+# Each step takes the shared state dict and may add to it for later steps
+def step_read_csv(state):
+    pd.read_csv(state['path'])
+
+
+def step_load_cold(state):
+    build_cache(state['path'])
+
+
+def step_load(state):
+    state['df'] = load_dataset(state['path'])
+
+
+def step_correlation(state):
+    df = state['df']
+    target_correlations(df, {'is_prediabetes': df[TARGET] == 1, 'is_diabetes': df[TARGET] == 2})
+
+
+def step_correlation_matrix(state):
+    state['df'].corr(numeric_only=True)
+
+
+def step_scoring(state):
+    state['model'] = RiskModel.fit(state['df'])
+    state['scores'] = state['model'].score_frame(state['df'])
+
+
+def step_attribution(state):
+    top_risk_features(state['df'], state['model'].risk_factors, n=3)
+
+
+def step_threshold(state):
+    scores = state['scores']
+    cutoffs = scores.quantile([0.50, 0.90]).to_numpy()
+    assign_risk_levels(scores.to_numpy(), cutoffs)
+    scores[scores >= cutoffs[1]]
+
+
+def step_income_groups(state):
+    df = state['df']
+    frame = pd.DataFrame({'Income': df['Income'], TARGET: df[TARGET], 'RiskScore': state['scores'],
+                          'HvyAlcoholConsump': df['HvyAlcoholConsump']})
+    stratum_summary(frame, 'IncomeGroup')
+
+
+def step_logistic(state):
+    X, y, names = design_matrix(state['df'])
+    fit_logit(X, y, names)
+
+
+STEPS = {
+    'read_csv': step_read_csv,
+    'load_cold': step_load_cold,
+    'load': step_load,
+    'correlation': step_correlation,
+    'correlation_matrix': step_correlation_matrix,
+    'scoring': step_scoring,
+    'attribution': step_attribution,
+    'threshold': step_threshold,
+    'income_groups': step_income_groups,
+    'logistic': step_logistic,
+}
+
+
+# =====================================
+# Measurement
+# =====================================
+def measure(func, state, repeat=3):
+    """Best wall time over ``repeat`` runs, plus peak traced memory of one more."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func(state)
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(times), 'seconds_all': times, 'peak_mb': peak / 2 ** 20}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(path, steps=None, repeat=3):
+    """Run ``steps`` (default: all, in order) on the CSV at ``path``.
+
+    Returns ``(results, rows)``.
+    """
+    steps = list(STEPS) if steps is None else steps
+    # Steps need the frame, model and scores whether or not those steps are
+    # selected, so produce them once up front (untimed)
+    state = {'path': path}
+    step_load(state)
+    step_scoring(state)
+
+    results = {}
+    for name in STEPS:
+        if name in steps:
+            results[name] = measure(STEPS[name], state, repeat)
+            print(f"{name:<20} {results[name]['seconds']:9.4f} s  {results[name]['peak_mb']:9.1f} MB peak",
+                  flush=True)
+    return results, len(state['df'])
+
+
+def report(path, results, rows, seed, repeat):
+    return {
+        'meta': {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'data': os.path.abspath(path),
+            'rows': rows,
+            'seed': seed,
+            'repeat': repeat,
+            'git_commit': _git_commit(),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+
+# Run settings that must match for timings to be comparable
+COMPARABLE_META = ('rows', 'repeat', 'cpus')
+
+
+def mismatched_meta(current, baseline):
+    """``{field: (baseline, current)}`` for the ``COMPARABLE_META`` fields that differ."""
+    before, after = baseline.get('meta', {}), current.get('meta', {})
+    return {field: (before.get(field), after.get(field))
+            for field in COMPARABLE_META if before.get(field) != after.get(field)}
+
+
+def compare(current, baseline, tolerance=0.2, check_meta=True):
+    """Steps whose time or peak memory grew by more than ``tolerance`` (a fraction).
+
+    Returns a list of ``(step, metric, baseline, current, ratio)``. Raises
+    ``ValueError`` if the runs differ in rows, repeat or CPU count (see
+    ``mismatched_meta``), unless ``check_meta`` is False.
+    """
+    mismatched = mismatched_meta(current, baseline) if check_meta else {}
+    if mismatched:
+        details = ', '.join(f"{field} {before} vs {after}" for field, (before, after) in mismatched.items())
+        raise ValueError(f"runs are not comparable: {details}")
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        for metric in ('seconds', 'peak_mb'):
+            if before[metric] > 0:
+                ratio = result[metric] / before[metric]
+                if ratio > 1 + tolerance:
+                    regressions.append((name, metric, before[metric], result[metric], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline steps on synthetic data")
+    parser.add_argument('--rows', type=int, default=253_680)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data', help="benchmark this CSV instead of a synthetic one")
+    parser.add_argument('--steps', nargs='+', choices=list(STEPS), default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--out', default='benchmark.json')
+    parser.add_argument('--baseline', help="earlier results JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown, e.g. 0.2 = 20%%")
+    parser.add_argument('--force-compare', action='store_true',
+                        help="compare with the baseline even if rows / repeat / cpus differ")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = args.data
+        if path is None:
+            path = os.path.join(workdir, f'synthetic_{args.rows}_{args.seed}.csv')
+            print(f"Generating {args.rows} synthetic rows ...", flush=True)
+            write_csv(path, args.rows, args.seed)
+        else:
+            # keep the dataset's columnar cache out of the user's data directory
+            path = os.path.join(workdir, os.path.basename(args.data))
+            os.symlink(os.path.abspath(args.data), path)
+        results, rows = run_benchmarks(path, args.steps, args.repeat)
+        current = report(args.data or path, results, rows, None if args.data else args.seed, args.repeat)
+
+    with open(args.out, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"Results -> {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        mismatched = mismatched_meta(current, baseline)
+        if mismatched and not args.force_compare:
+            for field, (before, after) in mismatched.items():
+                print(f"MISMATCH {field}: baseline {before}, current {after}")
+            sys.exit(f"Not comparing against {args.baseline}: different run settings (--force-compare to override)")
+        for field, (before, after) in mismatched.items():
+            print(f"WARNING {field} differs: baseline {before}, current {after}")
+        regressions = compare(current, baseline, args.tolerance, check_meta=False)
+        for name, metric, before, after, ratio in regressions:
+            print(f"REGRESSION {name} {metric}: {before:.4g} -> {after:.4g} ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
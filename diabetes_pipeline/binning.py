@@ -0,0 +1,310 @@
+"""
+Pre-binned RiskScore distributions: grouped histograms and binned KDEs.
+
+``sns.histplot(kde=True)`` evaluates a Gaussian KDE over every score and the
+stacked-by-RiskLevel chart scans the scores again. ``BinnedScores`` makes one
+O(n) pass per chunk and keeps, for every group (RiskLevel, diabetes status,
+...), two arrays on a shared grid of width ``dx``:
+
+* exact bin counts over ``[i * dx, (i + 1) * dx)``, and
+* linearly binned masses on the grid points, from which a Gaussian KDE is a
+  single FFT convolution.
+
+The grid is anchored at zero and ``dx`` is a power of two, so two instances
+always line up: widening the range or merging with a coarser instance only
+ever halves the resolution, which both arrays support exactly (counts add in
+pairs; linear masses of odd points split evenly between their neighbours).
+Chunked or parallel scoring therefore never needs the raw scores in memory.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class BinnedScores:
+    """Mergeable per-group histogram / KDE accumulator on a dyadic grid."""
+
+    def __init__(self, max_bins=4096):
+        self.max_bins = max_bins
+        self.dx = None
+        self.start = 0  # grid index of column 0
+        self.groups = []
+        self.counts = np.zeros((0, 0))
+        self.masses = np.zeros((0, 0))
+        # per-group count, mean and sum of squared deviations (Chan merge)
+        self.n = np.zeros(0)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+
+    def __len__(self):
+        return int(self.n.sum())
+
+    # ---------------------------------
+    # Grid management
+    # ---------------------------------
+    def _group_rows(self, keys):
+        for key in keys:
+            if key not in self.groups:
+                self.groups.append(key)
+        extra = len(self.groups) - len(self.n)
+        if extra:
+            width = self.counts.shape[1]
+            self.counts = np.vstack([self.counts, np.zeros((extra, width))])
+            self.masses = np.vstack([self.masses, np.zeros((extra, width))])
+            self.n, self.mean, self.m2 = (np.r_[a, np.zeros(extra)] for a in (self.n, self.mean, self.m2))
+        return [self.groups.index(key) for key in keys]
+
+    def _coarsen(self):
+        """Double ``dx``: grid index i becomes i // 2 (floor)."""
+        width = self.counts.shape[1]
+        index = self.start + np.arange(width)
+        new_start = self.start // 2
+        new_width = (self.start + width - 1) // 2 - new_start + 2
+        target = index // 2 - new_start
+        counts = np.zeros((len(self.groups), new_width))
+        masses = np.zeros((len(self.groups), new_width))
+        odd = index % 2 == 1
+        for g in range(len(self.groups)):
+            counts[g] = np.bincount(target, self.counts[g], new_width)
+            # an odd point sits halfway between two even points of the new grid
+            masses[g] = (np.bincount(target[~odd], self.masses[g, ~odd], new_width)
+                         + np.bincount(target[odd], self.masses[g, odd] / 2, new_width)
+                         + np.bincount(target[odd] + 1, self.masses[g, odd] / 2, new_width))
+        self.dx *= 2
+        self.start = new_start
+        self.counts, self.masses = counts, masses
+
+    def _cover(self, lo_index, hi_index):
+        """Extend (coarsening as needed) so grid indices lo..hi are in range."""
+        while True:
+            width = self.counts.shape[1]
+            lo = min(lo_index, self.start) if width else lo_index
+            hi = max(hi_index, self.start + width - 1) if width else hi_index
+            if hi - lo + 1 <= self.max_bins:
+                break
+            self._coarsen()
+            lo_index, hi_index = lo_index // 2, hi_index // 2
+        pad_left = self.start - lo if width else 0
+        pad_right = hi - (self.start + width - 1) if width else hi - lo + 1
+        if pad_left or pad_right:
+            pad = ((0, 0), (pad_left, pad_right))
+            self.counts = np.pad(self.counts, pad)
+            self.masses = np.pad(self.masses, pad)
+        self.start = lo
+
+    def _initial_dx(self, values):
+        span = float(values.max() - values.min())
+        if span <= 0:
+            return 2.0 ** -10
+        return 2.0 ** math.floor(math.log2(span / (self.max_bins / 4)))
+
+    # ---------------------------------
+    # Accumulation
+    # ---------------------------------
+    def update(self, values, groups=None):
+        """Add a batch of scores, optionally with a group label per score.
+
+        ``groups`` is an array of labels, or a tuple of arrays to group by
+        their combination (keys are then tuples).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        keep = ~np.isnan(values)
+        values = values[keep]
+        if groups is None:
+            codes, keys = np.zeros(len(values), dtype=np.int64), [None]
+        elif isinstance(groups, tuple):
+            codes, keys = _factorize(tuple(np.asarray(g)[keep] for g in groups))
+        else:
+            codes, keys = _factorize(np.asarray(groups)[keep])
+        if len(values) == 0:
+            return self
+        if self.dx is None:
+            self.dx = self._initial_dx(values)
+
+        rows = np.asarray(self._group_rows(keys))
+        self._cover(math.floor(values.min() / self.dx), math.floor(values.max() / self.dx) + 1)
+        while True:  # coarsening inside _cover changes the positions
+            position = values / self.dx - self.start
+            left = np.floor(position).astype(np.int64)
+            if left.max() + 1 < self.counts.shape[1]:
+                break
+            self._cover(self.start + int(left.max()) + 1, self.start + int(left.max()) + 1)
+        frac = position - left
+
+        width = self.counts.shape[1]
+        flat = rows[codes] * width + left
+        size = len(self.groups) * width
+        self.counts += np.bincount(flat, minlength=size).reshape(len(self.groups), width)
+        self.masses += (np.bincount(flat, 1 - frac, size) + np.bincount(flat + 1, frac, size)).reshape(
+            len(self.groups), width)
+
+        n = np.bincount(codes, minlength=len(keys)).astype(np.float64)
+        sums = np.bincount(codes, values, len(keys))
+        mean = np.divide(sums, n, out=np.zeros_like(sums), where=n > 0)
+        m2 = np.bincount(codes, (values - mean[codes]) ** 2, len(keys))
+        self._combine(rows, n, mean, m2)
+        return self
+
+    def _combine(self, rows, n_b, mean_b, m2_b):
+        n_a, mean_a = self.n[rows], self.mean[rows]
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        ratio = np.divide(n_b, n, out=np.zeros_like(n), where=n > 0)
+        self.mean[rows] = mean_a + delta * ratio
+        self.m2[rows] += m2_b + delta ** 2 * n_a * ratio
+        self.n[rows] = n
+
+    def merge(self, other):
+        """Fold in an accumulator built on other chunks or by another worker."""
+        if other.dx is None:
+            return self
+        other = other.copy()
+        if self.dx is None:
+            self.dx = other.dx
+        while self.dx < other.dx:
+            self._coarsen()
+        rows = np.asarray(self._group_rows(other.groups))
+        while True:  # covering the union may coarsen self past other
+            while other.dx < self.dx:
+                other._coarsen()
+            self._cover(other.start, other.start + other.counts.shape[1] - 1)
+            if other.dx == self.dx:
+                break
+        offset = other.start - self.start
+        width = other.counts.shape[1]
+        self.counts[rows, offset:offset + width] += other.counts
+        self.masses[rows, offset:offset + width] += other.masses
+        self._combine(rows, other.n, other.mean, other.m2)
+        return self
+
+    def copy(self):
+        clone = BinnedScores(self.max_bins)
+        clone.dx, clone.start, clone.groups = self.dx, self.start, list(self.groups)
+        for name in ('counts', 'masses', 'n', 'mean', 'm2'):
+            setattr(clone, name, getattr(self, name).copy())
+        return clone
+
+    # ---------------------------------
+    # Results
+    # ---------------------------------
+    def _rows(self, groups):
+        if groups is None:
+            return list(range(len(self.groups)))
+        return [self.groups.index(g) for g in groups if g in self.groups]
+
+    def _select(self, groups, lo, hi):
+        """Summed counts and masses of ``groups``, restricted to ``lo <= x < hi``.
+
+        A bin belongs to the range if its left edge does, so a range cut is
+        resolved to within ``dx`` (the top 10% is ``lo=threshold``).
+        """
+        rows = self._rows(groups)
+        counts = self.counts[rows].sum(axis=0)
+        masses = self.masses[rows].sum(axis=0)
+        if lo is not None or hi is not None:
+            x = (self.start + np.arange(counts.shape[0])) * self.dx
+            outside = np.zeros(len(x), dtype=bool)
+            if lo is not None:
+                outside |= x < lo
+            if hi is not None:
+                outside |= x >= hi
+            counts = np.where(outside, 0.0, counts)
+            masses = np.where(outside, 0.0, masses)
+        return counts, masses
+
+    def histogram(self, bins=50, groups=None, lo=None, hi=None):
+        """``(counts, edges)`` over the occupied range, with at most ``bins`` bins.
+
+        Bin widths are ``dx`` times a power of two, so the edges are fixed
+        multiples of that width rather than ``np.histogram``'s min..max split.
+        ``groups`` selects (and sums) a subset of the groups and ``lo`` /
+        ``hi`` a range of scores.
+        """
+        counts, _ = self._select(groups, lo, hi)
+        occupied = np.flatnonzero(counts)
+        if len(occupied) == 0:
+            return np.zeros(0), np.zeros(1)
+        counts = counts[occupied[0]:occupied[-1] + 1]
+        first, width = self.start + occupied[0], 1
+        while len(counts) > bins:
+            # merge pairs aligned on the doubled grid
+            if first % 2:
+                counts = np.r_[0.0, counts]
+                first -= 1
+            if len(counts) % 2:
+                counts = np.r_[counts, 0.0]
+            counts = counts.reshape(-1, 2).sum(axis=1)
+            first //= 2
+            width *= 2
+        edges = (first + np.arange(len(counts) + 1)) * width * self.dx
+        return counts, edges
+
+    def stacked_histograms(self, bins=50, parts=None):
+        """Counts of several parts on shared edges, for a stacked histogram.
+
+        ``parts`` maps a label to ``{'groups': ..., 'lo': ..., 'hi': ...}``
+        (any key optional); by default there is one part per group. Returns
+        ``({label: counts}, edges)``.
+        """
+        if parts is None:
+            parts = {g: {'groups': [g]} for g in self.groups}
+        _, edges = self.histogram(bins)
+        left = (self.start + np.arange(self.counts.shape[1])) * self.dx
+        index = np.searchsorted(edges, left + self.dx / 2, side='right') - 1
+        inside = (index >= 0) & (index < len(edges) - 1)
+        stacked = {}
+        for label, part in parts.items():
+            counts, _ = self._select(part.get('groups'), part.get('lo'), part.get('hi'))
+            stacked[label] = np.bincount(index[inside], counts[inside], len(edges) - 1)
+        return stacked, edges
+
+    def kde(self, groups=None, lo=None, hi=None, bw_adjust=1.0):
+        """``(x, density)`` of a Gaussian KDE with Scott's bandwidth, in count units.
+
+        Multiply by a histogram's bin width to overlay it on that histogram,
+        as ``sns.histplot(kde=True)`` does. The bandwidth uses the exact
+        moments of the groups, or the binned masses when a range is given.
+        """
+        _, masses = self._select(groups, lo, hi)
+        if lo is None and hi is None:
+            rows = self._rows(groups)
+            n = self.n[rows].sum()
+            mean = (self.n[rows] * self.mean[rows]).sum() / n if n else 0.0
+            m2 = (self.m2[rows] + self.n[rows] * (self.mean[rows] - mean) ** 2).sum()
+        else:
+            x = (self.start + np.arange(len(masses))) * self.dx
+            n = masses.sum()
+            mean = (masses * x).sum() / n if n else 0.0
+            m2 = (masses * (x - mean) ** 2).sum()
+        if n < 2:
+            return np.zeros(0), np.zeros(0)
+        bandwidth = bw_adjust * math.sqrt(m2 / (n - 1)) * n ** (-1 / 5)
+
+        occupied = np.flatnonzero(masses)
+        half = int(math.ceil(4 * bandwidth / self.dx))
+        masses = np.pad(masses[occupied[0]:occupied[-1] + 1], half)
+        x = (self.start + occupied[0] - half + np.arange(len(masses))) * self.dx
+        if half == 0:
+            return x, masses / self.dx
+        kernel = np.exp(-0.5 * (np.arange(-half, half + 1) * self.dx / bandwidth) ** 2)
+        kernel /= kernel.sum() * self.dx
+        return x, _fft_convolve(masses, kernel)
+
+
+def _factorize(groups):
+    """Integer codes and keys; a tuple of arrays groups by their combination."""
+    if isinstance(groups, tuple):
+        groups = pd.MultiIndex.from_arrays([np.asarray(g) for g in groups])
+    codes, keys = pd.factorize(groups, sort=True)
+    return codes.astype(np.int64), list(keys)
+
+
+def _fft_convolve(signal, kernel):
+    """``np.convolve(signal, kernel, mode='same')`` via the real FFT."""
+    size = len(signal) + len(kernel) - 1
+    fft_size = 1 << (size - 1).bit_length()
+    full = np.fft.irfft(np.fft.rfft(signal, fft_size) * np.fft.rfft(kernel, fft_size), fft_size)[:size]
+    start = (len(kernel) - 1) // 2
+    return np.maximum(full[start:start + len(signal)], 0.0)
@@ -0,0 +1,178 @@
+"""
+Bitmap index over the low-cardinality BRFSS columns.
+
+Nearly every column is a binary flag or a small code (HighBP, Smoker, GenHlth,
+Age, Income, Diabetes_012, ...), so each ``(column, value)`` pair is stored
+once as a packed bit vector of the rows holding that value: one bit per row,
+``n / 8`` bytes per value, a few MB for the whole survey. Cohort counts,
+prevalence rates and crosstabs are then bitwise ANDs of those vectors followed
+by a popcount, with no pass over the frame::
+
+    bitmaps = BitmapIndex(df)
+    # share of heavy drinkers with HighBP among prediabetic women aged 60+
+    bitmaps.share({'HvyAlcoholConsump': 1}, HighBP=1, Diabetes_012=1, Sex=0, Age=('>=', 9))
+    bitmaps.crosstab('Age', 'HvyAlcoholConsump', normalize='index', Diabetes_012=1)
+
+A condition is a value, a list of values (any of them), or an ``(op, value)``
+pair (``'=='``, ``'!='``, ``'<'``, ``'<='``, ``'>'``, ``'>='``) compared against
+the column's distinct values. Derived categoricals such as ``IncomeGroup`` are
+indexed with ``add``; their values are the category labels.
+"""
+
+import operator
+
+import numpy as np
+import pandas as pd
+
+from diabetes_pipeline.cohort import Cohort
+
+DEFAULT_MAX_CARDINALITY = 32
+
+_OPS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(words):
+        """Number of set bits in a packed bit vector."""
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+else:  # NumPy < 2.0
+    _POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        """Number of set bits in a packed bit vector."""
+        return int(_POPCOUNT8[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+def pack(mask):
+    """A boolean row mask as a packed bit vector of uint64 words."""
+    packed = np.packbits(np.asarray(mask, dtype=bool))
+    padded = np.zeros(-(-len(packed) // 8) * 8, dtype=np.uint8)
+    padded[:len(packed)] = packed
+    return padded.view(np.uint64)
+
+
+def unpack(words, n_rows):
+    """The boolean row mask of a packed bit vector."""
+    return np.unpackbits(words.view(np.uint8), count=n_rows).astype(bool)
+
+
+class BitmapIndex:
+    """Packed bitmaps per value of every low-cardinality column of ``df``."""
+
+    def __init__(self, df, columns=None, max_cardinality=DEFAULT_MAX_CARDINALITY):
+        self.base = df
+        self.n_rows = len(df)
+        self.max_cardinality = max_cardinality
+        # column -> {value: packed bits}
+        self.bitmaps = {}
+        self.all_rows = pack(np.ones(self.n_rows, dtype=bool))
+        for column in (df.columns if columns is None else columns):
+            self.add(column, df[column], strict=columns is not None)
+
+    def add(self, column, values, strict=True):
+        """Index ``values`` (aligned with the base rows) under ``column``.
+
+        Columns with more than ``max_cardinality`` distinct values are skipped,
+        or raise ``ValueError`` if ``strict``.
+        """
+        values = pd.Series(values)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes, labels = values.cat.codes.to_numpy(), list(values.cat.categories)
+        else:
+            codes, uniques = pd.factorize(values, sort=True)
+            labels = [v.item() if isinstance(v, np.generic) else v for v in uniques]
+        if len(labels) > self.max_cardinality:
+            if strict:
+                raise ValueError(f"{column} has {len(labels)} distinct values (max {self.max_cardinality})")
+            return self
+        self.bitmaps[column] = {label: pack(codes == code) for code, label in enumerate(labels)}
+        return self
+
+    @property
+    def nbytes(self):
+        return sum(bits.nbytes for values in self.bitmaps.values() for bits in values.values())
+
+    # ---------------------------------
+    # Queries
+    # ---------------------------------
+    def values(self, column):
+        """The indexed values of ``column``."""
+        return list(self.bitmaps[column])
+
+    def _matching(self, column, condition):
+        if column not in self.bitmaps:
+            raise KeyError(f"{column} is not indexed")
+        values = self.bitmaps[column]
+        if isinstance(condition, tuple) and len(condition) == 2 and condition[0] in _OPS:
+            op, operand = _OPS[condition[0]], condition[1]
+            return [v for v in values if op(v, operand)]
+        if isinstance(condition, (list, tuple, set, frozenset)):
+            return [v for v in condition if v in values]
+        return [condition] if condition in values else []
+
+    def select(self, **conditions):
+        """Packed bits of the rows meeting every condition (all rows if none)."""
+        bits = self.all_rows.copy()
+        for column, condition in conditions.items():
+            matching = self._matching(column, condition)
+            column_bits = np.zeros_like(bits)
+            for value in matching:
+                np.bitwise_or(column_bits, self.bitmaps[column][value], out=column_bits)
+            np.bitwise_and(bits, column_bits, out=bits)
+        return bits
+
+    def count(self, **conditions):
+        """Number of rows meeting every condition."""
+        return popcount(self.select(**conditions))
+
+    def share(self, numerator, **conditions):
+        """Share of the rows meeting ``conditions`` that also meet ``numerator`` (a dict)."""
+        cohort = self.select(**conditions)
+        total = popcount(cohort)
+        if total == 0:
+            return np.nan
+        return popcount(cohort & self.select(**numerator)) / total
+
+    def crosstab(self, index, columns, normalize=False, **conditions):
+        """Counts of ``index`` x ``columns`` values among the rows meeting
+        ``conditions``, as ``pd.crosstab`` lays them out.
+
+        ``normalize`` is ``'index'`` (rows sum to 1), ``'columns'``, ``True``
+        (everything sums to 1) or ``False``.
+        """
+        cohort = self.select(**conditions)
+        rows = {v: cohort & bits for v, bits in self.bitmaps[index].items()}
+        counts = np.array([[popcount(row_bits & col_bits) for col_bits in self.bitmaps[columns].values()]
+                           for row_bits in rows.values()], dtype=np.int64)
+        table = pd.DataFrame(counts, index=pd.Index(list(rows), name=index),
+                             columns=pd.Index(self.values(columns), name=columns))
+        if normalize == 'index':
+            return table.div(table.sum(axis=1), axis=0)
+        if normalize == 'columns':
+            return table / table.sum(axis=0)
+        if normalize is True:
+            return table / counts.sum()
+        return table
+
+    def value_counts(self, column, **conditions):
+        """Counts of each value of ``column`` among the rows meeting ``conditions``."""
+        cohort = self.select(**conditions)
+        return pd.Series({v: popcount(cohort & bits) for v, bits in self.bitmaps[column].items()},
+                         name='count').rename_axis(column)
+
+    # ---------------------------------
+    # Rows
+    # ---------------------------------
+    def mask(self, **conditions):
+        """Boolean row mask of the rows meeting every condition."""
+        return unpack(self.select(**conditions), self.n_rows)
+
+    def cohort(self, name=None, **conditions):
+        """The rows meeting every condition as a ``Cohort`` of the base frame."""
+        return Cohort.from_positions(self.base, np.flatnonzero(self.mask(**conditions)), name)
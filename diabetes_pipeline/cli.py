@@ -0,0 +1,239 @@
+"""
+Command-line entry point for the pipeline: ``python -m diabetes_pipeline``.
+
+The scripts import matplotlib, seaborn, sklearn and tabulate (the notebook
+also statsmodels) before doing anything, read a hardcoded ``file_path`` and
+run every section top to bottom, so even a text-only run pays for all of it.
+Here each section is a subcommand on the memoised stage DAG of
+``pipeline.build_pipeline`` (a repeated call loads its results from the stage
+cache), and each subcommand imports only what it uses:
+
+* nothing beyond numpy / pandas and the stages at startup;
+* tabulate when a table is printed;
+* matplotlib only in ``report``'s render workers, and only without
+  ``--no-plots`` (plus seaborn for the correlation heatmap drawn by
+  ``summarize`` and ``plots``). sklearn and statsmodels are never needed.
+
+Subcommands: ``summarize`` (factors and RiskScore by status), ``score``
+(RiskScore and RiskLevel per respondent), ``leaderboard`` (top 10 high-risk
+non-diabetic / pre-diabetic respondents), ``income`` (income-group tables),
+``alcohol`` (the notebook's heavy-alcohol investigation) and ``plots`` (every
+report figure).
+
+Usage:
+    python -m diabetes_pipeline summarize --data data.csv --no-plots
+    python -m diabetes_pipeline score --data data.csv --out scored.csv
+    python -m diabetes_pipeline score --data data.csv --no-plots --export scored/
+    python -m diabetes_pipeline leaderboard --data data.csv
+    python -m diabetes_pipeline plots --data data.csv --images Images --dpi 150
+"""
+
+import argparse
+import os
+import sys
+
+STATUS_LABELS = ['No Diabetes (0)', 'Pre-diabetes (1)', 'Diabetes (2)']
+
+# Report figures drawn by each subcommand (``plots`` draws all of them)
+FIGURES = {
+    'summarize': ['correlation_matrix.png', 'risk_score_distribution.png', 'avg_risk_by_status.png',
+                  'risk_factors_distribution.png', 'protective_factors_distribution.png'],
+    'score': ['risk_score_distribution.png', 'risk_level_distribution.png', 'high_risk_distribution.png'],
+    'leaderboard': ['high_risk_non_diabetic.png', 'top_10_highrisk_by_risk_scre_non.png'],
+    'income': ['income_risk.png', 'income_diabetes_status.png'],
+    'alcohol': ['heavy_alcohol_by_status.png'],
+}
+
+
+def _table(frame, floatfmt='.3f'):
+    from tabulate import tabulate
+    return tabulate(frame, headers='keys', tablefmt='grid', floatfmt=floatfmt)
+
+
+def _banner(title, width=60):
+    print("\n" + "=" * width)
+    print(title)
+    print("=" * width)
+
+
+def _pipeline(args):
+    from diabetes_pipeline.pipeline import build_pipeline
+    from diabetes_pipeline.stages import DiskCache
+    return build_pipeline(args.data, args.target, DiskCache(args.cache_dir))
+
+
+def _plot(args, pipeline, names=None):
+    """Render the report figures ``names`` (all when None) unless ``--no-plots``."""
+    if args.no_plots:
+        return
+    from diabetes_pipeline.report import prepare_figures, render_figures
+
+    df, scores, (risk_factors, protective_factors), board, income = pipeline.run(
+        'load', 'scores', 'factors', 'leaderboard', 'income_summary')
+    df = df.assign(RiskScore=scores)
+    figures = prepare_figures(df, risk_factors, protective_factors, args.target, board, income)
+    if names is not None:
+        figures = {name: figures[name] for name in names if name in figures}
+    for filename, state in render_figures(figures, args.images, args.dpi).items():
+        print(f"{state:>8}  {os.path.join(args.images, filename)}")
+
+
+# =====================================
+# Subcommands
+# =====================================
+def summarize(args):
+    pipeline = _pipeline(args)
+    df, (risk_factors, protective_factors), status_scores = pipeline.run('load', 'factors', 'status_scores')
+    print(f"Loaded {args.data}: {df.shape[0]:,} rows x {df.shape[1]} columns")
+
+    _banner("RISK AND PROTECTIVE FACTORS")
+    print("RISK FACTORS:")
+    for i, factor in enumerate(risk_factors, 1):
+        print(f"  {i:2d}. {factor}")
+    print("\nPROTECTIVE FACTORS:")
+    for i, factor in enumerate(protective_factors, 1):
+        print(f"  {i:2d}. {factor}")
+
+    _banner("AVERAGE RISK SCORES BY DIABETES STATUS")
+    labels = [STATUS_LABELS[int(s)] if int(s) < len(STATUS_LABELS) else str(s) for s in status_scores.index]
+    print(_table({'Diabetes Status': labels, 'Average Risk Score': status_scores.to_numpy()}))
+    _plot(args, pipeline, FIGURES['summarize'])
+
+
+def score(args):
+    import numpy as np
+    import pandas as pd
+
+    from diabetes_pipeline.quantiles import RISK_LEVEL_QUANTILES, assign_risk_levels
+
+    pipeline = _pipeline(args)
+    scores, threshold = pipeline.run('scores', 'threshold')
+    cutoffs = tuple(np.quantile(scores.to_numpy(), RISK_LEVEL_QUANTILES))
+    levels = assign_risk_levels(scores.to_numpy(), cutoffs)
+    print(f"Scored {len(scores):,} respondents")
+    print(f"RiskLevel cutoffs (50th / 90th percentile): {cutoffs[0]:.4f} / {cutoffs[1]:.4f}")
+    print(f"High-risk threshold (90th percentile): {threshold:.4f}")
+    counts = pd.Series(levels).value_counts(sort=False)
+    print(_table({'RiskLevel': list(counts.index), 'Respondents': counts.to_numpy()}, floatfmt='.0f'))
+    if args.out:
+        pd.DataFrame({'RiskScore': scores.to_numpy(), 'RiskLevel': levels}, index=scores.index).to_csv(
+            args.out, index_label='row')
+        print(f"Scores -> {args.out}")
+    if args.export:
+        from diabetes_pipeline.export import export_frame
+
+        df, risk_model = pipeline.run('load', 'model')
+        export_frame(df, args.export, risk_model, scores.to_numpy(), args.export_format)
+        print(f"Scored population ({args.export_format}, by RiskLevel / IncomeGroup) -> {args.export}")
+    _plot(args, pipeline, FIGURES['score'])
+
+
+def leaderboard(args):
+    pipeline = _pipeline(args)
+    board = pipeline.run('leaderboard')
+    display = board[['RiskScore', 'Top_Risk_Features', args.target]].reset_index(drop=True)
+    display.columns = ['Risk Score', 'Top Risk Features', 'Diabetes Status']
+    display.index = display.index + 1
+    _banner("TOP 10 HIGH-RISK NON-DIABETIC/PRE-DIABETIC INDIVIDUALS", 80)
+    print(_table(display, floatfmt='.2f'))
+    _plot(args, pipeline, FIGURES['leaderboard'])
+
+
+def income(args):
+    pipeline = _pipeline(args)
+    summary = pipeline.run('income_summary')
+    _banner("AVERAGE RISK SCORES BY INCOME GROUP")
+    print(_table({'Income Group': [str(g) for g in summary.index],
+                  'Average Risk Score': summary['mean_risk_score'].to_numpy()}))
+    proportions = summary[['no_diabetes', 'prediabetes', 'diabetes']].reset_index()
+    proportions.columns = ['IncomeGroup'] + STATUS_LABELS
+    _banner("DIABETES STATUS PROPORTION BY INCOME GROUP", 80)
+    print(_table(proportions))
+    _plot(args, pipeline, FIGURES['income'])
+
+
+def alcohol(args):
+    from diabetes_pipeline.bitmap import BitmapIndex
+    from diabetes_pipeline.regression import design_matrix, fit_logit
+    from diabetes_pipeline.stratify import age_groups, stratum_summary
+
+    pipeline = _pipeline(args)
+    df, groups = pipeline.run('load', 'income_groups')
+    target = args.target
+    frame = df[[target, 'HvyAlcoholConsump']].assign(IncomeGroup=groups)
+
+    rate = frame.groupby(target)['HvyAlcoholConsump'].mean() * 100
+    _banner("HEAVY ALCOHOL CONSUMPTION BY DIABETES STATUS (%)")
+    print(_table({'Diabetes Status': [int(s) for s in rate.index],
+                  'Heavy Alcohol Consumers (%)': rate.to_numpy()}, floatfmt='.2f'))
+
+    bitmaps = BitmapIndex(frame, columns=['HvyAlcoholConsump']).add('IncomeGroup', frame['IncomeGroup'])
+    by_income = bitmaps.crosstab('IncomeGroup', 'HvyAlcoholConsump', normalize='index') * 100
+    by_income.columns = ['Non-Heavy Drinker (%)', 'Heavy Drinker (%)']
+    _banner("HEAVY ALCOHOL CONSUMPTION BY INCOME GROUP (%)")
+    print(_table(by_income, floatfmt='.2f'))
+
+    X, y, names = design_matrix(df)
+    _banner("LOGISTIC REGRESSION: DIABETES VS HEAVY ALCOHOL (ADJUSTED)", 80)
+    print(_table(fit_logit(X, y, names).table(), floatfmt='.4f'))
+
+    frame = frame.assign(AgeGroup=age_groups(df['Age']))
+    for by in ['IncomeGroup', 'AgeGroup']:
+        print(f"\n=== Heavy alcohol rate (%) stratified by {by} ===")
+        print((stratum_summary(frame, [by, target])['heavy_alcohol_rate'].unstack() * 100).round(2))
+    _plot(args, pipeline, FIGURES['alcohol'])
+
+
+def plots(args):
+    if args.no_plots:
+        print("plots: nothing to do with --no-plots")
+        return
+    _plot(args, _pipeline(args))
+
+
+COMMANDS = {
+    'summarize': (summarize, "risk / protective factors and RiskScore by diabetes status"),
+    'score': (score, "RiskScore and RiskLevel for every respondent"),
+    'leaderboard': (leaderboard, "top 10 high-risk non-diabetic / pre-diabetic respondents"),
+    'income': (income, "RiskScore and diabetes status by income group"),
+    'alcohol': (alcohol, "heavy alcohol consumption and diabetes"),
+    'plots': (plots, "render every report figure"),
+}
+
+
+def build_parser():
+    from diabetes_pipeline.columns import TARGET
+    from diabetes_pipeline.stages import DEFAULT_CACHE_DIR
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--data', required=True, help="BRFSS CSV")
+    common.add_argument('--target', default=TARGET)
+    common.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="stage cache directory")
+    common.add_argument('--no-plots', action='store_true', help="text output only; never import matplotlib")
+    common.add_argument('--images', default='Images', help="figure output directory")
+    common.add_argument('--dpi', type=int, default=300)
+
+    parser = argparse.ArgumentParser(prog='python -m diabetes_pipeline',
+                                     description="Diabetes risk analysis pipeline")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    for name, (func, help_text) in COMMANDS.items():
+        sub = subcommands.add_parser(name, parents=[common], help=help_text, description=help_text)
+        sub.set_defaults(func=func)
+        if name == 'score':
+            sub.add_argument('--out', help="write RiskScore / RiskLevel per row to this CSV")
+            sub.add_argument('--export', metavar='DIR',
+                             help="write the scored population as a partitioned dataset (needs pyarrow)")
+            sub.add_argument('--export-format', choices=['parquet', 'ipc'], default='parquet')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.data):
+        parser.error(f"data file not found: {args.data}")
+    args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
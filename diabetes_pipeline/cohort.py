@@ -0,0 +1,185 @@
+"""
+Copy-free cohorts: row subsets of one shared base frame.
+
+``df[df['RiskScore'] >= threshold]`` copies every column of the matching rows,
+and filtering that again copies once more. A ``Cohort`` instead holds the base
+frame and a predicate tree (``RiskScore >= t & Diabetes_012 != 2 & ...``);
+cohorts compose with ``&``, ``|`` and ``~`` or by chaining ``where`` without
+touching the data. The row mask is evaluated from the base columns only when
+it is needed and is not kept, so defining more cohorts costs no memory, and a
+column is materialised only for the rows of the cohort when it is asked for::
+
+    high_risk = Cohort(df).where('RiskScore', '>=', threshold, name='high_risk')
+    high_risk_non_diabetic = high_risk.where(TARGET, '!=', 2)
+    low_income = high_risk_non_diabetic.where('IncomeGroup', '==', 'Low')
+    sns.histplot(high_risk_non_diabetic['RiskScore'])
+
+Predicates read the base at evaluation time, so columns added to the frame
+after a cohort is defined (``Top_Risk_Features``, ``IncomeGroup``) are visible
+to it.
+"""
+
+import numpy as np
+import pandas as pd
+
+_OPS = {
+    '==': np.equal,
+    '!=': np.not_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+}
+
+
+def _column_values(base, column):
+    """A column as a NumPy array without copying; categoricals as their codes."""
+    series = base[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    return series.to_numpy(), None
+
+
+def _category_code(categories, value, op):
+    if value in categories:
+        return categories.get_loc(value)
+    if op in ('==', '!='):
+        return -2  # matches no row; NaN rows have code -1
+    raise KeyError(f"{value!r} is not a category of the column")
+
+
+def _evaluate(node, base):
+    """Boolean row mask of a predicate tree over ``base``."""
+    kind = node[0]
+    if kind == 'cmp':
+        _, column, op, value = node
+        values, categories = _column_values(base, column)
+        if categories is not None:
+            value = _category_code(categories, value, op)
+        return _OPS[op](values, value)
+    if kind == 'isin':
+        _, column, wanted = node
+        values, categories = _column_values(base, column)
+        if categories is not None:
+            wanted = categories.get_indexer(list(wanted))
+            wanted = wanted[wanted >= 0]
+        return np.isin(values, list(wanted))
+    if kind == 'rows':
+        mask = np.zeros(len(base), dtype=bool)
+        mask[node[1]] = True
+        return mask
+    if kind == 'not':
+        return np.logical_not(_evaluate(node[1], base))
+    # 'and' / 'or': the left mask is reused as the output buffer
+    left = _evaluate(node[1], base)
+    combine = np.logical_and if kind == 'and' else np.logical_or
+    return combine(left, _evaluate(node[2], base), out=left)
+
+
+def _describe(node):
+    kind = node[0]
+    if kind == 'cmp':
+        value = node[3].item() if isinstance(node[3], np.generic) else node[3]
+        return f"{node[1]} {node[2]} {value!r}"
+    if kind == 'isin':
+        return f"{node[1]} in {list(node[2])!r}"
+    if kind == 'rows':
+        return f"<{len(node[1])} rows>"
+    if kind == 'not':
+        return f"~({_describe(node[1])})"
+    symbol = ' & ' if kind == 'and' else ' | '
+    return f"({_describe(node[1])}{symbol}{_describe(node[2])})"
+
+
+class Cohort:
+    """Rows of ``base`` selected by a predicate tree (all rows if ``predicate`` is None)."""
+
+    def __init__(self, base, predicate=None, name=None):
+        self.base = base
+        self.predicate = predicate
+        self.name = name
+
+    @classmethod
+    def from_positions(cls, base, positions, name=None):
+        """A cohort of explicit row positions, e.g. a leaderboard's rows."""
+        return cls(base, ('rows', np.asarray(positions, dtype=np.intp)), name)
+
+    # ---------------------------------
+    # Composition
+    # ---------------------------------
+    def _combine(self, kind, node, name):
+        predicate = node if self.predicate is None else (kind, self.predicate, node)
+        return Cohort(self.base, predicate, name)
+
+    def where(self, column, op, value, name=None):
+        """This cohort narrowed to rows where ``column <op> value``."""
+        if op not in _OPS:
+            raise ValueError(f"op must be one of {list(_OPS)}")
+        return self._combine('and', ('cmp', column, op, value), name)
+
+    def isin(self, column, values, name=None):
+        """This cohort narrowed to rows whose ``column`` is one of ``values``."""
+        return self._combine('and', ('isin', column, tuple(values)), name)
+
+    def _check_base(self, other):
+        if other.base is not self.base:
+            raise ValueError("cohorts over different base frames cannot be combined")
+
+    def __and__(self, other):
+        self._check_base(other)
+        if other.predicate is None:
+            return Cohort(self.base, self.predicate)
+        return self._combine('and', other.predicate, None)
+
+    def __or__(self, other):
+        self._check_base(other)
+        if self.predicate is None or other.predicate is None:
+            return Cohort(self.base)
+        return Cohort(self.base, ('or', self.predicate, other.predicate))
+
+    def __invert__(self):
+        if self.predicate is None:
+            return Cohort.from_positions(self.base, [])
+        return Cohort(self.base, ('not', self.predicate))
+
+    # ---------------------------------
+    # Evaluation
+    # ---------------------------------
+    def mask(self):
+        """Boolean mask over the base rows (evaluated now, not cached)."""
+        if self.predicate is None:
+            return np.ones(len(self.base), dtype=bool)
+        return _evaluate(self.predicate, self.base)
+
+    def positions(self):
+        """Row positions of the cohort in the base frame."""
+        if self.predicate is None:
+            return np.arange(len(self.base))
+        if self.predicate[0] == 'rows':
+            return np.unique(self.predicate[1])
+        return np.flatnonzero(self.mask())
+
+    def __len__(self):
+        if self.predicate is None:
+            return len(self.base)
+        return int(np.count_nonzero(self.mask()))
+
+    def column(self, column):
+        """One column for the cohort's rows, as a Series with the base index."""
+        return self.base[column].take(self.positions())
+
+    def frame(self, columns=None):
+        """The cohort's rows as a new frame holding only ``columns`` (default: all)."""
+        if columns is None:
+            return self.base.take(self.positions())
+        # only the selected cells are copied
+        return self.base.iloc[self.positions(), self.base.columns.get_indexer(list(columns))]
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+        return self.frame(key)
+
+    def __repr__(self):
+        label = self.name or (_describe(self.predicate) if self.predicate is not None else 'all')
+        return f"Cohort({label}: {len(self)} of {len(self.base)} rows)"
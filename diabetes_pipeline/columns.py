@@ -0,0 +1,29 @@
+"""
+Column names shared by the pipeline modules.
+"""
+
+# Outcome: 0 = no diabetes, 1 = prediabetes, 2 = diabetes
+TARGET = 'Diabetes_012'
+
+# The 21 health indicators, in BRFSS file order
+FEATURES = [
+    'HighBP', 'HighChol', 'CholCheck', 'BMI', 'Smoker', 'Stroke',
+    'HeartDiseaseorAttack', 'PhysActivity', 'Fruits', 'Veggies',
+    'HvyAlcoholConsump', 'AnyHealthcare', 'NoDocbcCost', 'GenHlth',
+    'MentHlth', 'PhysHlth', 'DiffWalk', 'Sex', 'Age', 'Education', 'Income',
+]
+
+COLUMNS = [TARGET] + FEATURES
+
+# Narrow storage dtypes: every indicator is a 0/1 flag or a small ordinal code
+# (Age 1-13, Income 1-8, GenHlth 1-5, MentHlth/PhysHlth 0-30); BMI keeps a
+# float so non-integer BMI values from other extracts survive.
+DTYPES = {column: 'uint8' for column in COLUMNS}
+DTYPES['BMI'] = 'float32'
+
+# One-vs-rest outcome indicators: name -> (column, values counted as 1)
+OUTCOME_INDICATORS = {
+    'is_prediabetes': (TARGET, (1,)),
+    'is_diabetes': (TARGET, (2,)),
+    'is_any_diabetes': (TARGET, (1, 2)),
+}
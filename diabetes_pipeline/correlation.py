@@ -0,0 +1,95 @@
+"""
+Incremental correlation engine built on sufficient statistics.
+
+``CorrelationEngine`` keeps the count, column sums and cross-product matrix
+(as a mean / co-moment pair, see ``RunningMoments``) of the health indicators
+plus one-vs-rest outcome indicators. New survey batches are appended in
+O(batch) time and the correlation matrix and risk / protective factor lists
+are re-derived from the statistics without rescanning earlier batches.
+
+``target_correlations`` is the one-off version for scripts that only need a
+few target columns of ``df.corr()``: it computes them for several targets in
+one pass instead of building the full matrix once per target.
+"""
+
+import numpy as np
+import pandas as pd
+
+from diabetes_pipeline.columns import COLUMNS, OUTCOME_INDICATORS, TARGET
+from diabetes_pipeline.factors import classify_factors
+from diabetes_pipeline.moments import RunningMoments
+
+
+def indicator_values(df, column, values):
+    """0/1 float array: 1 where ``df[column]`` is one of ``values``."""
+    return np.isin(df[column].to_numpy(), values).astype(np.float64)
+
+
+class CorrelationEngine:
+    """Appendable correlation matrix over ``columns`` and outcome indicators."""
+
+    def __init__(self, columns=COLUMNS, target=TARGET, indicators=OUTCOME_INDICATORS):
+        self.target = target
+        self.columns = list(columns)
+        self.indicators = dict(indicators)
+        self.moments = RunningMoments(self.columns + list(self.indicators))
+
+    @property
+    def count(self):
+        return self.moments.count
+
+    def append(self, df):
+        """Fold a new batch of respondents into the statistics."""
+        X = np.empty((len(df), len(self.moments.columns)))
+        X[:, :len(self.columns)] = df[self.columns].to_numpy(dtype=np.float64)
+        for j, (column, values) in enumerate(self.indicators.values(), start=len(self.columns)):
+            X[:, j] = indicator_values(df, column, values)
+        self.moments.update(X)
+        return self
+
+    def merge(self, other):
+        """Combine with an engine fed from other batches (e.g. another worker)."""
+        self.moments.merge(other.moments)
+        return self
+
+    def matrix(self):
+        """``df.corr()`` over the data columns seen so far."""
+        return self.moments.correlation().loc[self.columns, self.columns]
+
+    def target_correlations(self, targets=None):
+        """Correlation of every data column with each target, as columns.
+
+        ``targets`` may name data columns or indicators; by default the target
+        column and all indicators are returned.
+        """
+        targets = [self.target] + list(self.indicators) if targets is None else list(targets)
+        return self.moments.correlation().loc[self.columns, targets]
+
+    def factors(self):
+        """Current ``(risk_factors, protective_factors)`` split."""
+        return classify_factors(self.target_correlations([self.target])[self.target], self.target)
+
+
+def target_correlations(df, targets, columns=None):
+    """Correlation of each column of ``df`` with several targets in one pass.
+
+    ``targets`` maps a name to a column name or an array-like (e.g. a boolean
+    mask such as ``df['Diabetes_012'] == 1``); nothing is added to ``df``.
+    Returns a DataFrame with one row per column and one column per target,
+    equal to the matching columns of ``df.corr()``.
+    """
+    columns = list(df.select_dtypes('number').columns if columns is None else columns)
+    X = df[columns].to_numpy(dtype=np.float64)
+    Y = np.column_stack([
+        df[t].to_numpy(dtype=np.float64) if isinstance(t, str) else np.asarray(t, dtype=np.float64)
+        for t in targets.values()
+    ])
+
+    X = X - X.mean(axis=0)
+    Y = Y - Y.mean(axis=0)
+    cov = X.T @ Y
+    std_x = np.sqrt(np.einsum('ij,ij->j', X, X))
+    std_y = np.sqrt(np.einsum('ij,ij->j', Y, Y))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = cov / np.outer(std_x, std_y)
+    return pd.DataFrame(corr, index=columns, columns=list(targets))
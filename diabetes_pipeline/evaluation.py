@@ -0,0 +1,308 @@
+"""
+Threshold sweep, ROC / PR curves and lift for RiskScore.
+
+The cutoffs in the scripts (the pipelines' 90th percentile, the notebook's
+50th / 90th percentile RiskLevel bands) are picked by hand and never checked
+against the outcome; trying another one means another pass over the rows.
+Here the scores are sorted once and every possible cutoff is evaluated at
+once from cumulative sums: after sorting by descending score, the counts of
+each ``Diabetes_012`` class among the rows at or above a cutoff are prefix
+sums, and the confusion counts of any outcome defined on the classes
+(prediabetes, diabetes, any diabetes) follow from them.
+
+* ``threshold_sweep``: one table per outcome with, for each distinct score,
+  flagged / TP / FP counts, sensitivity, specificity, PPV and lift;
+* ``roc_curve`` / ``pr_curve`` / ``roc_auc`` / ``average_precision`` read off a
+  sweep, ``at_cutoffs`` and ``lift_table`` look up particular cutoffs or
+  depths;
+* ``stratified_sweeps`` / ``stratified_auc`` do the same per income or age
+  group from one more sort.
+
+Usage:
+    python -m diabetes_pipeline.evaluation data.csv
+    python -m diabetes_pipeline.evaluation data.csv --by IncomeGroup AgeGroup --figures Images
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from diabetes_pipeline.columns import OUTCOME_INDICATORS, TARGET
+from diabetes_pipeline.quantiles import RISK_LEVEL_QUANTILES
+from diabetes_pipeline.stratify import strata
+
+SWEEP_COLUMNS = ['threshold', 'flagged', 'depth', 'tp', 'fp', 'sensitivity', 'specificity', 'fpr', 'ppv',
+                 'lift']
+DEFAULT_DEPTHS = (0.05, 0.10, 0.20, 0.30, 0.50)
+
+
+# =====================================
+# Sweep
+# =====================================
+def _class_weights(classes, indicators):
+    """(classes x outcomes) 0/1 matrix: which classes count as each outcome."""
+    return np.column_stack([np.isin(classes, values) for column, values in indicators.values()]
+                           ).astype(np.float64)
+
+
+def _sorted_sweep(scores, codes, weights, W, names):
+    """Sweep tables from rows already sorted by descending score."""
+    n, k = len(scores), W.shape[0]
+    # last row of each run of equal scores: a cutoff flags whole ties
+    ends = np.append(np.flatnonzero(scores[1:] != scores[:-1]), n - 1) if n else np.array([], dtype=np.int64)
+    one_hot = np.eye(k)[codes] if weights is None else np.eye(k)[codes] * weights[:, None]
+    by_class = np.vstack([np.zeros(k), np.cumsum(one_hot, axis=0)[ends]])
+    flagged = by_class.sum(axis=1)
+    positives = by_class @ W
+    if weights is None:  # plain row counts
+        flagged, positives = flagged.astype(np.int64), np.rint(positives).astype(np.int64)
+    # row 0 is the cutoff above every score: nothing flagged, the ROC origin
+    threshold = np.append(np.inf, scores[ends])
+    total = flagged[-1]
+    return {name: _metrics(threshold, flagged, positives[:, j], total) for j, name in enumerate(names)}
+
+
+def _metrics(threshold, flagged, tp, total):
+    fp = flagged - tp
+    n_pos = tp[-1]
+    n_neg = total - n_pos
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ppv = tp / flagged
+        sensitivity = tp / n_pos
+        fpr = fp / n_neg
+        table = pd.DataFrame({
+            'threshold': threshold,
+            'flagged': flagged,
+            'depth': flagged / total,
+            'tp': tp,
+            'fp': fp,
+            'sensitivity': sensitivity,
+            'specificity': 1.0 - fpr,
+            'fpr': fpr,
+            'ppv': ppv,
+            'lift': ppv / (n_pos / total),
+        }, columns=SWEEP_COLUMNS)
+    return table
+
+
+def _inputs(scores, status, weights):
+    scores = np.asarray(scores, dtype=np.float64)
+    if np.isnan(scores).any():
+        raise ValueError("scores contain NaN")
+    codes, classes = pd.factorize(np.asarray(status), sort=True)
+    if (codes < 0).any():
+        raise ValueError("status has missing values")
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.shape != scores.shape:
+            raise ValueError(f"expected {len(scores)} weights, got shape {weights.shape}")
+    return scores, codes, np.asarray(classes), weights
+
+
+def threshold_sweep(scores, status, indicators=OUTCOME_INDICATORS, weights=None):
+    """Every cutoff of ``scores`` evaluated against each outcome in ``indicators``.
+
+    A row flags the respondents with ``score >= threshold``; there is one row
+    per distinct score, in descending order, after a first row (``threshold
+    = inf``) that flags nobody. Returns ``{outcome: DataFrame}`` with the
+    ``SWEEP_COLUMNS`` (``sensitivity`` is also the capture rate at ``depth``,
+    ``lift`` is PPV over prevalence). With ``weights`` the counts are weight
+    totals.
+    """
+    scores, codes, classes, weights = _inputs(scores, status, weights)
+    order = np.argsort(-scores, kind='stable')
+    return _sorted_sweep(scores[order], codes[order], None if weights is None else weights[order],
+                         _class_weights(classes, indicators), list(indicators))
+
+
+def stratified_sweeps(scores, status, strata, indicators=OUTCOME_INDICATORS, weights=None):
+    """``threshold_sweep`` within each stratum (e.g. ``df['IncomeGroup']``).
+
+    One sort by (stratum, descending score) puts every stratum's rows in a
+    contiguous, already ordered block. Returns ``{stratum: {outcome: DataFrame}}``
+    in the strata's order (categories first for a categorical).
+    """
+    scores, codes, classes, weights = _inputs(scores, status, weights)
+    strata = pd.Series(strata).reset_index(drop=True)
+    if len(strata) != len(scores):
+        raise ValueError(f"expected {len(scores)} strata, got {len(strata)}")
+    if isinstance(strata.dtype, pd.CategoricalDtype):
+        stratum_codes, labels = strata.cat.codes.to_numpy(), list(strata.cat.categories)
+    else:
+        stratum_codes, labels = pd.factorize(strata, sort=True)
+        labels = list(labels)
+    order = np.lexsort((-scores, stratum_codes))
+    sorted_codes = stratum_codes[order]
+    bounds = np.searchsorted(sorted_codes, np.arange(len(labels) + 1))
+    W = _class_weights(classes, indicators)
+    sweeps = {}
+    for i, label in enumerate(labels):
+        rows = order[bounds[i]:bounds[i + 1]]
+        if len(rows):
+            sweeps[label] = _sorted_sweep(scores[rows], codes[rows], None if weights is None else weights[rows],
+                                          W, list(indicators))
+    return sweeps
+
+
+# =====================================
+# Curves and cutoffs
+# =====================================
+def roc_curve(sweep):
+    """``(fpr, tpr, thresholds)`` of one outcome's sweep, starting at (0, 0)."""
+    return sweep['fpr'].to_numpy(), sweep['sensitivity'].to_numpy(), sweep['threshold'].to_numpy()
+
+
+def roc_auc(sweep):
+    """Area under the ROC curve (trapezoids, so ties count one half)."""
+    fpr, tpr, _ = roc_curve(sweep)
+    return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1])) / 2)
+
+
+def pr_curve(sweep):
+    """``(recall, precision, thresholds)``, leaving out the empty first cutoff."""
+    return (sweep['sensitivity'].to_numpy()[1:], sweep['ppv'].to_numpy()[1:],
+            sweep['threshold'].to_numpy()[1:])
+
+
+def average_precision(sweep):
+    """Precision averaged over the recall steps, ``sum (R_i - R_{i-1}) P_i``."""
+    recall = sweep['sensitivity'].to_numpy()
+    return float(np.sum(np.diff(recall) * sweep['ppv'].to_numpy()[1:]))
+
+
+def at_cutoffs(sweep, cutoffs, inclusive=True):
+    """Sweep rows for particular ``cutoffs``, indexed by cutoff.
+
+    ``inclusive`` flags ``score >= cutoff`` as the pipelines' high-risk filter
+    does; ``inclusive=False`` flags ``score > cutoff``, the notebook's High
+    RiskLevel band.
+    """
+    cutoffs = np.atleast_1d(np.asarray(cutoffs, dtype=np.float64))
+    descending = -sweep['threshold'].to_numpy()
+    rows = np.searchsorted(descending, -cutoffs, side='right' if inclusive else 'left') - 1
+    table = sweep.iloc[rows].drop(columns='threshold')
+    table.index = pd.Index(cutoffs, name='cutoff')
+    return table
+
+
+def lift_table(sweep, depths=DEFAULT_DEPTHS):
+    """Capture rate and lift when the top ``depths`` share of respondents is flagged.
+
+    Each depth is taken at the last cutoff that flags no more than that share
+    (ties are never split).
+    """
+    depth = sweep['depth'].to_numpy()
+    rows = np.searchsorted(depth, np.asarray(depths, dtype=np.float64), side='right') - 1
+    table = sweep.iloc[rows][['threshold', 'depth', 'sensitivity', 'ppv', 'lift']]
+    table = table.rename(columns={'sensitivity': 'capture_rate'})
+    table.index = pd.Index(depths, name='target_depth')
+    return table
+
+
+def summarize(sweeps):
+    """ROC AUC, average precision and prevalence of each outcome's sweep."""
+    return pd.DataFrame({
+        'roc_auc': {name: roc_auc(s) for name, s in sweeps.items()},
+        'average_precision': {name: average_precision(s) for name, s in sweeps.items()},
+        'prevalence': {name: s['tp'].iloc[-1] / s['flagged'].iloc[-1] for name, s in sweeps.items()},
+    })
+
+
+def stratified_auc(sweeps_by_stratum, metric='roc_auc'):
+    """One row per stratum, one column per outcome, of ``metric`` from ``summarize``."""
+    return pd.DataFrame({stratum: summarize(sweeps)[metric] for stratum, sweeps in sweeps_by_stratum.items()}).T
+
+
+# =====================================
+# Figures (drawn by report.render_figures)
+# =====================================
+def draw_roc(plt, data):
+    plt.figure(figsize=(6, 6))
+    for label, (fpr, tpr, auc) in data['curves'].items():
+        plt.plot(fpr, tpr, label=f"{label} (AUC {auc:.3f})")
+    plt.plot([0, 1], [0, 1], color='grey', linestyle='--')
+    plt.xlabel("False Positive Rate")
+    plt.ylabel("True Positive Rate")
+    plt.title(data['title'])
+    plt.legend(loc='lower right')
+    plt.tight_layout()
+
+
+def draw_pr(plt, data):
+    plt.figure(figsize=(6, 6))
+    for label, (recall, precision, ap) in data['curves'].items():
+        plt.plot(recall, precision, label=f"{label} (AP {ap:.3f})")
+    plt.xlabel("Recall")
+    plt.ylabel("Precision")
+    plt.title(data['title'])
+    plt.legend(loc='upper right')
+    plt.tight_layout()
+
+
+def _thin(*curves, points=500):
+    """Keep at most ``points`` points of each curve; enough to draw it."""
+    step = max(1, len(curves[0]) // points)
+    return tuple(np.append(c[::step], c[-1]) for c in curves)
+
+
+def curve_figures(sweeps_by_group, outcome, name):
+    """ROC and PR figures of ``outcome``, one curve per group (strata or 'All')."""
+    roc = {label: _thin(*roc_curve(s[outcome])[:2]) + (roc_auc(s[outcome]),) for label, s in sweeps_by_group.items()}
+    pr = {label: _thin(*pr_curve(s[outcome])[:2]) + (average_precision(s[outcome]),)
+          for label, s in sweeps_by_group.items()}
+    return {
+        f'roc_{outcome}_{name}.png': (draw_roc, {'curves': roc, 'title': f"ROC: {outcome} by {name}"}),
+        f'pr_{outcome}_{name}.png': (draw_pr, {'curves': pr, 'title': f"Precision-Recall: {outcome} by {name}"}),
+    }
+
+
+def main():
+    from diabetes_pipeline.pipeline import build_pipeline
+    from diabetes_pipeline.report import render_figures
+
+    parser = argparse.ArgumentParser(description="Evaluate every RiskScore cutoff against the outcome")
+    parser.add_argument('data', help="BRFSS CSV")
+    parser.add_argument('--target', default=TARGET)
+    parser.add_argument('--by', nargs='*', default=['IncomeGroup', 'AgeGroup'], help="stratifiers for AUC tables")
+    parser.add_argument('--cutoffs', nargs='*', type=float, help="score cutoffs to report "
+                        "(default: the 50th / 90th percentile RiskLevel cutoffs)")
+    parser.add_argument('--figures', metavar='DIR', help="render ROC / PR figures into DIR")
+    args = parser.parse_args()
+
+    pipeline = build_pipeline(args.data, args.target)
+    df, scores = pipeline.run('load', 'scores')
+    scores = np.asarray(scores, dtype=np.float64)
+    status = df[args.target].to_numpy()
+
+    start = time.perf_counter()
+    sweeps = threshold_sweep(scores, status)
+    elapsed = time.perf_counter() - start
+    print(f"Swept {len(sweeps[next(iter(sweeps))]) - 1:,} cutoffs x {len(sweeps)} outcomes "
+          f"over {len(scores):,} rows in {elapsed * 1e3:.1f} ms")
+    print()
+    print(summarize(sweeps).to_string(float_format='{:.4f}'.format))
+
+    cutoffs = args.cutoffs or list(np.quantile(scores, RISK_LEVEL_QUANTILES))
+    for outcome, sweep in sweeps.items():
+        print(f"\n== {outcome}: cutoffs (score >= cutoff) ==")
+        print(at_cutoffs(sweep, cutoffs).to_string(float_format='{:.4f}'.format))
+        print(f"\n== {outcome}: lift by depth ==")
+        print(lift_table(sweep).to_string(float_format='{:.4f}'.format))
+
+    figures = {}
+    for name in args.by:
+        by_stratum = stratified_sweeps(scores, status, strata(df, [name])[name])
+        print(f"\n== ROC AUC by {name} ==")
+        print(stratified_auc(by_stratum).to_string(float_format='{:.4f}'.format))
+        for outcome in sweeps:
+            figures.update(curve_figures({'All': sweeps, **by_stratum}, outcome, name))
+
+    if args.figures:
+        for filename, state in render_figures(figures, args.figures).items():
+            print(f"{state:>8}  {filename}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""
+Partitioned Parquet / Arrow IPC export of the scored population.
+
+The scripts compute ``RiskScore``, ``RiskLevel``, ``Top_Risk_Features`` and
+``IncomeGroup`` for every respondent and drop them on exit; the only file
+written is the notebook's small ``heavy_alcohol_by_status.csv``. Here the
+scored rows go to a hive-partitioned dataset::
+
+    out_dir/RiskLevel=High/IncomeGroup=Low/part-0.parquet
+
+* ``RiskLevel`` and ``IncomeGroup`` are the partition keys, so a reader that
+  filters on them opens only the matching directories;
+* ``Top_Risk_Features`` is dictionary-encoded (one fixed dictionary of every
+  ordered feature combination, so Arrow IPC files can hold it too), the
+  indicators keep their narrow ``uint8`` / ``float32`` storage, and a ``row``
+  column points back to the source line;
+* Parquet files carry row-group min / max statistics for predicate pushdown;
+  IPC files are uncompressed so they can be memory-mapped (``open_scored``);
+* the fitted ``RiskModel`` (factor split, scaler and RiskLevel cutoffs) is
+  stored in the schema metadata.
+
+``export_csv`` streams a CSV in chunks: one pass for the moments and the
+Income distribution (the IncomeGroup quartile edges), one for the RiskLevel
+cutoffs if the model has none, and one that scores each chunk and hands it
+to the writer as a record batch. Only one chunk (plus the writer's open row
+groups) is in memory at a time. ``export_frame`` does the same for a frame
+that is already loaded.
+
+Needs the optional ``pyarrow`` package.
+
+Usage:
+    python -m diabetes_pipeline.export data.csv scored/
+    python -m diabetes_pipeline.export data.csv scored_ipc/ --format ipc --model model.json
+"""
+
+import argparse
+import itertools
+import json
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+except ImportError:
+    pa = ds = fs = None
+
+from diabetes_pipeline.attribution import top_risk_features
+from diabetes_pipeline.columns import DTYPES, TARGET
+from diabetes_pipeline.model import RiskModel
+from diabetes_pipeline.moments import RunningMoments
+from diabetes_pipeline.quantiles import RISK_LEVEL_QUANTILES, RISK_LEVELS, QuantileSketch
+from diabetes_pipeline.stratify import INCOME_LABELS
+from diabetes_pipeline.streaming import DEFAULT_CHUNKSIZE, read_chunks, score_chunks
+
+FORMATS = ('parquet', 'ipc')
+EXTENSIONS = {'parquet': 'parquet', 'ipc': 'arrow'}
+PARTITIONS = ['RiskLevel', 'IncomeGroup']
+DEFAULT_ROWS_PER_GROUP = 64 * 1024
+MODEL_METADATA_KEY = b'diabetes_risk_model'
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("the exporter needs pyarrow: pip install pyarrow")
+
+
+def quantile_edges(values, counts, q):
+    """``np.quantile(data, q)`` (linear) of data given as distinct ``values`` and their ``counts``."""
+    order = np.argsort(values)
+    values, cumulative = np.asarray(values, dtype=np.float64)[order], np.cumsum(np.asarray(counts)[order])
+    position = np.asarray(q, dtype=np.float64) * (cumulative[-1] - 1)
+    lo, hi = np.floor(position), np.ceil(position)
+    below, above = (values[np.searchsorted(cumulative, rank, side='right')] for rank in (lo, hi))
+    return below + (above - below) * (position - lo)
+
+
+class ScoredBatches:
+    """Turns chunks of respondents into record batches with one fixed schema.
+
+    ``model`` must have its RiskLevel cutoffs; ``income_edges`` are the
+    ``pd.qcut`` bin edges of Income (``income_groups`` assigns the same
+    groups, right-closed).
+    """
+
+    def __init__(self, model, income_edges, columns, n_features=3, income_labels=INCOME_LABELS):
+        _require_pyarrow()
+        if model.cutoffs is None:
+            raise ValueError("RiskModel has no RiskLevel cutoffs")
+        self.model = model
+        self.columns = list(columns)
+        self.n_features = n_features
+        edges = np.unique(np.asarray(income_edges, dtype=np.float64))
+        self.income_interior = edges[1:-1]
+        self.income_labels = list(income_labels)[:max(len(edges) - 1, 1)]
+
+        n_risk = len(model.risk_factors)
+        combos = itertools.permutations(model.risk_factors, min(n_features, n_risk))
+        self.feature_labels = pd.Index([', '.join(c) for c in combos])
+        # Every batch shares the same dictionaries (required by the IPC file format)
+        self.dictionaries = {
+            'Top_Risk_Features': pa.array(self.feature_labels, pa.string()),
+            'RiskLevel': pa.array(RISK_LEVELS, pa.string()),
+            'IncomeGroup': pa.array(self.income_labels, pa.string()),
+        }
+        fields = [pa.field('row', pa.int64())]
+        fields += [pa.field(c, pa.from_numpy_dtype(np.dtype(DTYPES.get(c, 'float64')))) for c in self.columns]
+        fields += [
+            pa.field('RiskScore', pa.float64()),
+            pa.field('Top_Risk_Features', pa.dictionary(pa.int32(), pa.string())),
+            pa.field('RiskLevel', pa.dictionary(pa.int8(), pa.string())),
+            pa.field('IncomeGroup', pa.dictionary(pa.int8(), pa.string())),
+        ]
+        self.schema = pa.schema(fields, metadata={MODEL_METADATA_KEY: json.dumps(model.to_dict())})
+
+    def _dictionary(self, name, codes):
+        index_type = self.schema.field(name).type.index_type
+        return pa.DictionaryArray.from_arrays(pa.array(codes, index_type), self.dictionaries[name])
+
+    def batch(self, chunk, start, scores=None):
+        """Record batch for ``chunk`` (rows ``start`` .. of the source)."""
+        model = self.model
+        scores = model.score(chunk) if scores is None else np.asarray(scores, dtype=np.float64)
+        n_risk = len(model.risk_factors)
+        features = top_risk_features(chunk, model.risk_factors, n=self.n_features,
+                                     means=model.means[:n_risk], scales=model.scales[:n_risk])
+        levels = np.searchsorted(np.asarray(model.cutoffs), scores, side='left')
+        income = chunk['Income'].to_numpy(dtype=np.float64)
+        groups = np.searchsorted(self.income_interior, income, side='left')
+
+        feature_codes = self.feature_labels.get_indexer(features.to_numpy())
+        if (feature_codes < 0).any():
+            raise ValueError("unexpected Top_Risk_Features combination")
+
+        arrays = [pa.array(np.arange(start, start + len(chunk), dtype=np.int64))]
+        # safe casts: a value the narrow type cannot hold raises instead of wrapping
+        arrays += [pa.array(chunk[c].to_numpy()).cast(self.schema.field(c).type) for c in self.columns]
+        arrays += [
+            pa.array(scores),
+            self._dictionary('Top_Risk_Features', feature_codes),
+            self._dictionary('RiskLevel', levels),
+            self._dictionary('IncomeGroup', groups),
+        ]
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+
+def write_batches(batches, schema, out_dir, format='parquet', rows_per_group=DEFAULT_ROWS_PER_GROUP):
+    """Stream record batches into a hive-partitioned dataset at ``out_dir`` (replacing it)."""
+    _require_pyarrow()
+    if format not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}, got {format!r}")
+    if format == 'parquet':
+        file_format = ds.ParquetFileFormat()
+        options = file_format.make_write_options(compression='zstd', write_statistics=True)
+    else:
+        file_format = ds.IpcFileFormat()
+        options = file_format.make_write_options(compression=None)  # memory-mappable
+    partitioning = ds.partitioning(pa.schema([schema.field(p) for p in PARTITIONS]), flavor='hive')
+    ds.write_dataset(batches, out_dir, schema=schema, format=file_format, file_options=options,
+                     partitioning=partitioning, existing_data_behavior='delete_matching',
+                     min_rows_per_group=rows_per_group, max_rows_per_group=rows_per_group,
+                     basename_template=f'part-{{i}}.{EXTENSIONS[format]}')
+
+
+# =====================================
+# Export
+# =====================================
+def export_csv(file_path, out_dir, model=None, target=TARGET, format='parquet', chunksize=DEFAULT_CHUNKSIZE,
+               rows_per_group=DEFAULT_ROWS_PER_GROUP, eps=0.005):
+    """Score ``file_path`` chunk by chunk and write the partitioned dataset.
+
+    Without a ``model`` one is fitted from streamed moments (as
+    ``streaming.stream_risk_scores`` does); a model without RiskLevel cutoffs
+    gets them from a quantile sketch of the scores (accurate to ``eps`` in
+    rank). Returns ``{'rows', 'model', 'income_edges'}``.
+    """
+    _require_pyarrow()
+    moments, income = None, pd.Series(dtype=np.int64)
+    for chunk in read_chunks(file_path, chunksize, usecols=None if model is None else ['Income']):
+        if model is None:
+            if moments is None:
+                moments = RunningMoments(chunk.select_dtypes('number').columns)
+            moments.update(chunk)
+        income = income.add(chunk['Income'].value_counts(), fill_value=0)
+    if income.empty:
+        raise ValueError(f"No rows found in {file_path}")
+    model = RiskModel.from_moments(moments, target) if model is None else model
+    if model.cutoffs is None:
+        sketch = QuantileSketch(eps)
+        for chunk in score_chunks(file_path, model, chunksize):
+            sketch.update(chunk['RiskScore'].to_numpy())
+        model.set_cutoffs(sketch)
+
+    edges = quantile_edges(income.index.to_numpy(), income.to_numpy(), np.linspace(0, 1, len(INCOME_LABELS) + 1))
+    builder = ScoredBatches(model, edges, pd.read_csv(file_path, nrows=0).columns)
+    rows = 0
+
+    def batches():
+        nonlocal rows
+        for chunk in read_chunks(file_path, chunksize):
+            yield builder.batch(chunk, rows)
+            rows += len(chunk)
+
+    write_batches(batches(), builder.schema, out_dir, format, rows_per_group)
+    return {'rows': rows, 'model': model, 'income_edges': edges}
+
+
+def export_frame(df, out_dir, model, scores=None, format='parquet', block_rows=DEFAULT_CHUNKSIZE,
+                 rows_per_group=DEFAULT_ROWS_PER_GROUP):
+    """Write an in-memory frame (e.g. the pipeline's ``load`` stage) the same way.
+
+    ``scores`` defaults to ``model.score(df)``; a model without RiskLevel
+    cutoffs gets the exact 50th / 90th percentiles of the scores (on a copy).
+    """
+    _require_pyarrow()
+    scores = model.score(df) if scores is None else np.asarray(scores, dtype=np.float64)
+    if model.cutoffs is None:
+        model = RiskModel.from_dict(model.to_dict())
+        model.cutoffs = tuple(np.quantile(scores, RISK_LEVEL_QUANTILES).tolist())
+    income = df['Income'].value_counts()
+    edges = quantile_edges(income.index.to_numpy(), income.to_numpy(), np.linspace(0, 1, len(INCOME_LABELS) + 1))
+    builder = ScoredBatches(model, edges, df.columns)
+    batches = (builder.batch(df.iloc[start:start + block_rows], start, scores[start:start + block_rows])
+               for start in range(0, len(df), block_rows))
+    write_batches(batches, builder.schema, out_dir, format, rows_per_group)
+    return {'rows': len(df), 'model': model, 'income_edges': edges}
+
+
+def open_scored(out_dir, format='parquet'):
+    """The exported dataset, partition keys as dictionary columns; IPC files are memory-mapped."""
+    _require_pyarrow()
+    partitioning = ds.HivePartitioning.discover(infer_dictionary=True)
+    filesystem = fs.LocalFileSystem(use_mmap=format == 'ipc')
+    return ds.dataset(out_dir, format=format, partitioning=partitioning, filesystem=filesystem)
+
+
+def stored_model(dataset):
+    """The ``RiskModel`` stored in an exported dataset's schema metadata."""
+    return RiskModel.from_dict(json.loads(dataset.schema.metadata[MODEL_METADATA_KEY]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the scored population as partitioned Parquet / Arrow")
+    parser.add_argument('input', help="BRFSS CSV to score")
+    parser.add_argument('out_dir', help="dataset directory (replaced partitions are deleted)")
+    parser.add_argument('--format', choices=FORMATS, default='parquet')
+    parser.add_argument('--model', help="score with this RiskModel artifact instead of fitting one")
+    parser.add_argument('--target', default=TARGET)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--rows-per-group', type=int, default=DEFAULT_ROWS_PER_GROUP)
+    args = parser.parse_args()
+
+    model = RiskModel.load(args.model) if args.model else None
+    result = export_csv(args.input, args.out_dir, model, args.target, args.format, args.chunksize,
+                        args.rows_per_group)
+    model = result['model']
+    print(f"Exported {result['rows']:,} rows -> {args.out_dir} ({args.format})")
+    print(f"RiskLevel cutoffs (50th / 90th pct.): {model.cutoffs[0]:.3f} / {model.cutoffs[1]:.3f}")
+    print(f"IncomeGroup edges: {', '.join(f'{e:g}' for e in result['income_edges'])}")
+    dataset = open_scored(args.out_dir, args.format)
+    counts = dataset.to_table(columns=PARTITIONS).group_by(PARTITIONS).aggregate([([], 'count_all')])
+    print(counts.to_pandas().rename(columns={'count_all': 'rows'}).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+"""
+Search over RiskScore factor subsets and weights.
+
+``RiskScore`` is an unweighted, signed sum of standardized features, and the
+factor set is a choice: the pipelines use every feature (risk factors minus
+protective factors), the notebook's Cell 7 the five features
+``GenHlth, DiffWalk, PhysHlth, HighBP, HeartDiseaseorAttack``. How well a
+linear score ``s = x @ w`` separates the ``Diabetes_012`` classes depends
+only on second-order statistics, which are gathered in one pass:
+
+* per-class counts ``n_k``, means ``m_k`` and covariances ``C_k``;
+* the pooled within-class covariance ``Sw = sum n_k C_k / n`` and the
+  between-class covariance ``Sb = sum n_k (m_k - m)(m_k - m)' / n``.
+
+A candidate subset is then scored without touching the rows:
+
+* ``separation`` = ``w'Sb w / w'(Sb + Sw) w``, the share of the score's
+  variance that lies between the classes (eta squared);
+* with ``weights='optimal'`` the ``w`` maximizing it is the leading
+  generalized eigenvector of ``(Sb, Sw)`` on the subset (Fisher's linear
+  discriminant); ``weights='unit'`` scores the subset the way ``RiskScore``
+  does (sign of the feature's correlation with the target / its std);
+* ``corr``: correlation of the score with ``Diabetes_012``;
+* ``auc``: the normal approximation ``Phi(dmu / sqrt(var_0 + var_1))`` of the
+  any-diabetes AUC.
+
+Candidates of one size are evaluated as a batch (stacked k x k Cholesky /
+eigen decompositions), and large exhaustive searches are split over a process
+pool. ``forward`` adds one feature at a time; ``exhaustive`` tries every
+subset of size ``k``.
+
+Usage:
+    python -m diabetes_pipeline.factor_search data.csv --mode forward --max-k 10
+    python -m diabetes_pipeline.factor_search data.csv --mode exhaustive --max-k 5 --weights unit
+"""
+
+import argparse
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from diabetes_pipeline.columns import FEATURES, TARGET
+
+MODES = ('forward', 'exhaustive')
+WEIGHTS = ('optimal', 'unit')
+NOTEBOOK_FACTORS = ['GenHlth', 'DiffWalk', 'PhysHlth', 'HighBP', 'HeartDiseaseorAttack']
+DEFAULT_BATCH = 4096
+
+
+class ClassStatistics:
+    """Per-class counts, means and covariances of ``columns`` and the derived scatter matrices."""
+
+    def __init__(self, columns, classes, counts, means, covariances):
+        self.columns = list(columns)
+        self.classes = np.asarray(classes, dtype=np.float64)
+        self.counts = np.asarray(counts, dtype=np.float64)
+        self.means = means
+        self.covariances = covariances
+
+        n = self.counts.sum()
+        share = self.counts / n
+        self.mean = share @ means
+        deviations = means - self.mean
+        self.within = np.einsum('k,kij->ij', share, covariances)
+        self.between = (deviations * share[:, None]).T @ deviations
+        self.total = self.within + self.between
+        # covariance of each feature with the ordinal outcome
+        outcome = self.classes - share @ self.classes
+        self.outcome_cov = deviations.T @ (share * outcome)
+        self.outcome_var = share @ outcome ** 2
+        self.std = np.sqrt(np.diag(self.total))
+        self.std[self.std == 0] = 1.0
+        # any diabetes (class > 0) against none, for the AUC approximation
+        lowest = self.classes == self.classes.min()
+        self.groups = [self._merge(lowest), self._merge(~lowest)]
+
+    def _merge(self, selected):
+        share = self.counts[selected] / self.counts[selected].sum()
+        mean = share @ self.means[selected]
+        deviations = self.means[selected] - mean
+        within = np.einsum('k,kij->ij', share, self.covariances[selected])
+        return mean, within + (deviations * share[:, None]).T @ deviations
+
+    def positions(self, features):
+        return np.array([self.columns.index(f) for f in features], dtype=np.intp)
+
+    def unit_weights(self):
+        """``RiskScore``'s weights: the sign of each feature's outcome correlation over its std."""
+        return np.sign(self.outcome_cov) / self.std
+
+
+def class_statistics(df, columns=FEATURES, target=TARGET):
+    """``ClassStatistics`` of ``df`` from one pass over the rows."""
+    columns = list(columns)
+    codes, classes = pd.factorize(df[target], sort=True)
+    if (codes < 0).any():
+        raise ValueError(f"{target} has missing values")
+    X = df[columns].to_numpy(dtype=np.float64)
+    k, p = len(classes), len(columns)
+    counts = np.bincount(codes, minlength=k)
+    means, covariances = np.empty((k, p)), np.empty((k, p, p))
+    for j in range(k):
+        rows = X[codes == j]
+        means[j] = rows.mean(axis=0)
+        rows -= means[j]
+        covariances[j] = rows.T @ rows / len(rows)
+    return ClassStatistics(columns, np.asarray(classes), counts, means, covariances)
+
+
+# =====================================
+# Closed-form scoring of candidate subsets
+# =====================================
+def _sub(matrix, candidates):
+    """``matrix[S, S]`` for every row ``S`` of ``candidates`` -> ``(B, k, k)``."""
+    return matrix[candidates[:, :, None], candidates[:, None, :]]
+
+
+def _optimal_weights(stats, candidates):
+    """Leading generalized eigenvector of ``(Sb, Sw)`` on each subset."""
+    L = np.linalg.cholesky(_sub(stats.within, candidates))
+    half = np.linalg.solve(L, _sub(stats.between, candidates))
+    whitened = np.linalg.solve(L, np.swapaxes(half, 1, 2))
+    _, vectors = np.linalg.eigh((whitened + np.swapaxes(whitened, 1, 2)) / 2)
+    return np.linalg.solve(np.swapaxes(L, 1, 2), vectors[:, :, -1:])[:, :, 0]
+
+
+def _quadratic(matrix, candidates, w):
+    return np.einsum('bi,bij,bj->b', w, _sub(matrix, candidates), w)
+
+
+def score_candidates(stats, candidates, weights='optimal'):
+    """Separation, outcome correlation and any-diabetes AUC of each candidate subset.
+
+    ``candidates`` is a ``(B, k)`` array of column positions. Returns
+    ``(metrics, w)``: a dict of ``(B,)`` arrays and the ``(B, k)`` raw
+    weights (oriented so the score increases with the outcome).
+    """
+    candidates = np.atleast_2d(np.asarray(candidates, dtype=np.intp))
+    if weights == 'optimal':
+        w = _optimal_weights(stats, candidates)
+    elif weights == 'unit':
+        w = stats.unit_weights()[candidates]
+    else:
+        raise ValueError(f"weights must be one of {WEIGHTS}, got {weights!r}")
+    w = w * np.where(np.einsum('bi,bi->b', w, stats.outcome_cov[candidates]) < 0, -1.0, 1.0)[:, None]
+
+    between = _quadratic(stats.between, candidates, w)
+    total = _quadratic(stats.total, candidates, w)
+    (mean_0, cov_0), (mean_1, cov_1) = stats.groups
+    gap = np.einsum('bi,bi->b', w, (mean_1 - mean_0)[candidates])
+    spread = np.sqrt(_quadratic(cov_0, candidates, w) + _quadratic(cov_1, candidates, w))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metrics = {
+            'separation': between / total,
+            'corr': np.einsum('bi,bi->b', w, stats.outcome_cov[candidates]) / np.sqrt(total * stats.outcome_var),
+            'auc': _normal_cdf(gap / spread),
+        }
+    return metrics, w
+
+
+def _normal_cdf(z):
+    return 0.5 * (1.0 + np.vectorize(math.erf)(z / math.sqrt(2.0)))
+
+
+def _results(stats, candidates, metrics, w):
+    """Result rows: features, size, metrics and weights in standardized units."""
+    rows = []
+    for i, subset in enumerate(candidates):
+        standardized = w[i] * stats.std[subset]
+        standardized = standardized / np.abs(standardized).mean()
+        rows.append({
+            'k': len(subset),
+            'features': ', '.join(stats.columns[j] for j in subset),
+            **{name: float(values[i]) for name, values in metrics.items()},
+            'weights': dict(zip((stats.columns[j] for j in subset), np.round(standardized, 3).tolist())),
+        })
+    return rows
+
+
+# =====================================
+# Parallel evaluation and search
+# =====================================
+_worker = {}
+
+
+def _attach(stats, weights):
+    _worker['stats'] = stats
+    _worker['weights'] = weights
+
+
+def _score_batch(candidates):
+    metrics, _ = score_candidates(_worker['stats'], candidates, _worker['weights'])
+    return metrics['separation']
+
+
+def _batches(iterator, size):
+    while True:
+        batch = np.array(list(itertools.islice(iterator, size)), dtype=np.intp)
+        if not len(batch):
+            return
+        yield batch
+
+
+def search(stats, mode='forward', max_k=5, weights='optimal', top=10, processes=None,
+           batch_size=DEFAULT_BATCH, candidates_from=None):
+    """Best factor subsets by ``separation``.
+
+    ``forward`` extends the best subset one feature at a time up to ``max_k``
+    and returns the best subset of every size; ``exhaustive`` scores every
+    subset of exactly ``max_k`` features (``candidates_from`` restricts the
+    pool) and returns the ``top`` ones. Returns ``(table, evaluated)``.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+    pool_columns = stats.positions(candidates_from or stats.columns)
+    evaluated = 0
+
+    if mode == 'forward':
+        chosen, rows = [], []
+        for _ in range(min(max_k, len(pool_columns))):
+            remaining = [j for j in pool_columns if j not in chosen]
+            candidates = np.array([chosen + [j] for j in remaining], dtype=np.intp)
+            metrics, w = score_candidates(stats, candidates, weights)
+            evaluated += len(candidates)
+            best = int(np.nanargmax(metrics['separation']))
+            chosen = list(candidates[best])
+            rows += _results(stats, candidates[best:best + 1], {m: v[best:best + 1] for m, v in metrics.items()},
+                             w[best:best + 1])
+        return pd.DataFrame(rows), evaluated
+
+    combos = itertools.combinations(pool_columns, max_k)
+    best_scores, best_candidates = np.empty(0), np.empty((0, max_k), dtype=np.intp)
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count(), initializer=_attach,
+                             initargs=(stats, weights)) as pool:
+        batches = list(_batches(combos, batch_size))
+        for batch, separation in zip(batches, pool.map(_score_batch, batches)):
+            evaluated += len(batch)
+            # keep only the running top candidates
+            scores = np.concatenate([best_scores, np.nan_to_num(separation, nan=-np.inf)])
+            merged = np.concatenate([best_candidates, batch])
+            keep = np.argsort(-scores, kind='stable')[:top]
+            best_scores, best_candidates = scores[keep], merged[keep]
+    metrics, w = score_candidates(stats, best_candidates, weights)
+    return pd.DataFrame(_results(stats, best_candidates, metrics, w)), evaluated
+
+
+def baselines(stats, risk_factors=None, protective_factors=None):
+    """The pipelines' RiskScore and the notebook's Cell 7 set, with unit and optimal weights."""
+    sets = {'notebook Cell 7': NOTEBOOK_FACTORS}
+    if risk_factors is not None:
+        sets['pipeline RiskScore'] = list(risk_factors) + list(protective_factors or [])
+    rows = []
+    for name, features in sets.items():
+        for weights in WEIGHTS:
+            candidates = stats.positions(features)[None, :]
+            metrics, w = score_candidates(stats, candidates, weights)
+            rows += [{'set': name, 'weighting': weights, **row} for row in _results(stats, candidates, metrics, w)]
+    return pd.DataFrame(rows)
+
+
+def main():
+    from diabetes_pipeline.cache import load_dataset
+    from diabetes_pipeline.factors import classify_factors
+    from diabetes_pipeline.summary import class_summary
+
+    parser = argparse.ArgumentParser(description="Search RiskScore factor subsets and weights")
+    parser.add_argument('data', help="BRFSS CSV")
+    parser.add_argument('--target', default=TARGET)
+    parser.add_argument('--mode', choices=MODES, default='forward')
+    parser.add_argument('--max-k', type=int, default=5, help="subset size (exhaustive) or largest size (forward)")
+    parser.add_argument('--weights', choices=WEIGHTS, default='optimal')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    df = load_dataset(args.data)
+    start = time.perf_counter()
+    stats = class_statistics(df, target=args.target)
+    risk_factors, protective_factors = classify_factors(class_summary(df, args.target).correlations(), args.target)
+    print(f"Class statistics of {len(stats.columns)} features over {len(df):,} rows: "
+          f"{time.perf_counter() - start:.2f} s")
+
+    columns = ['set', 'weighting', 'k', 'separation', 'corr', 'auc']
+    print("\n== Baselines ==")
+    table = baselines(stats, risk_factors, protective_factors)[columns]
+    print(table.to_string(index=False, float_format='{:.4f}'.format))
+
+    start = time.perf_counter()
+    table, evaluated = search(stats, args.mode, args.max_k, args.weights, args.top, args.processes)
+    elapsed = time.perf_counter() - start
+    print(f"\n== {args.mode} search, {args.weights} weights: {evaluated:,} subsets in {elapsed:.2f} s ==")
+    print(table[['k', 'separation', 'corr', 'auc', 'features']].to_string(index=False, float_format='{:.4f}'.format))
+    best = table.loc[table['separation'].idxmax()]
+    print(f"\nBest weights (standardized, mean |w| = 1): {best['weights']}")
+
+
+if __name__ == '__main__':
+    main()
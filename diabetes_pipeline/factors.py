@@ -0,0 +1,20 @@
+"""
+Risk / protective factor classification (section 3 of the pipelines).
+"""
+
+from diabetes_pipeline.columns import TARGET
+
+
+def classify_factors(corr, target=TARGET):
+    """Split features by the sign of their correlation with ``target``.
+
+    ``corr`` is either a full correlation matrix or the target's correlation
+    column. Returns ``(risk_factors, protective_factors)`` ordered by
+    correlation, exactly as the pipelines build them.
+    """
+    correlations = corr[target] if getattr(corr, 'ndim', 1) == 2 else corr
+    correlations = correlations.drop(target, errors='ignore').sort_values()
+
+    risk_factors = correlations[correlations > 0].index.tolist()
+    protective_factors = correlations[correlations < 0].index.tolist()
+    return risk_factors, protective_factors
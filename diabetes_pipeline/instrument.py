@@ -0,0 +1,356 @@
+"""
+Per-stage instrumentation for the pipeline scripts and the notebook.
+
+``StageRecorder`` wraps a unit of work and records its wall and CPU time,
+process RSS (current and peak), the rows of the DataFrames it read and
+produced, and how many DataFrames were constructed or ``.copy()``-ed while it
+ran. Optionally each stage is also run under cProfile or tracemalloc.
+
+The runner executes an unmodified script section by section (sections are
+the ``# N) Title`` banners of the pipelines) or a notebook cell by cell, in
+one shared namespace, with every section as a stage. It writes a JSON run
+report and prints a summary table in the scripts' ``tabulate`` grid style.
+
+Usage:
+    python -m diabetes_pipeline.instrument "Old Files/full_pipeline2.py" --data brfss.csv --headless
+    python -m diabetes_pipeline.instrument diabetes_full_pipeline3.ipynb --profile cprofile --report run.json
+"""
+
+import argparse
+import ast
+import cProfile
+import datetime
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILERS = ('cprofile', 'tracemalloc')
+
+
+# =====================================
+# Process measurements
+# =====================================
+def current_rss_mb():
+    """Resident set size of this process in MB, or None if unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / 2 ** 20
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, 'peak_wset', info.rss) / 2 ** 20
+
+
+class FrameCounter:
+    """Counts DataFrame constructions and explicit copies while installed.
+
+    pandas builds most results through ``DataFrame._from_mgr`` rather than
+    ``__init__``, so both are counted as created frames.
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.copies = 0
+        self._patched = []
+
+    def _patch(self, owner, name, counter, wrap_classmethod=False):
+        original = owner.__dict__.get(name)
+        if original is None:
+            return
+        func = original.__func__ if wrap_classmethod else original
+
+        def wrapper(*args, **kwargs):
+            setattr(self, counter, getattr(self, counter) + 1)
+            return func(*args, **kwargs)
+
+        setattr(owner, name, classmethod(wrapper) if wrap_classmethod else wrapper)
+        self._patched.append((owner, name, original))
+
+    def install(self):
+        self._patch(pd.DataFrame, '__init__', 'created')
+        self._patch(pd.DataFrame, '_from_mgr', 'created', wrap_classmethod=True)
+        self._patch(pd.core.generic.NDFrame, 'copy', 'copies')
+        return self
+
+    def uninstall(self):
+        for owner, name, original in reversed(self._patched):
+            setattr(owner, name, original)
+        self._patched = []
+
+
+# =====================================
+# Recorder
+# =====================================
+def _rows(value):
+    return len(value) if isinstance(value, (pd.DataFrame, pd.Series)) else None
+
+
+class StageRecorder:
+    """Collects one record per stage; see ``stage``."""
+
+    def __init__(self, profile=None, top=15, count_frames=True):
+        if profile not in (None,) + PROFILERS:
+            raise ValueError(f"profile must be one of {PROFILERS}")
+        self.profile = profile
+        self.top = top
+        self.stages = []
+        self.frames = FrameCounter().install() if count_frames else None
+
+    def close(self):
+        if self.frames is not None:
+            self.frames.uninstall()
+            self.frames = None
+
+    @contextmanager
+    def stage(self, name, namespace=None, reads=()):
+        """Record the enclosed block as stage ``name``.
+
+        With ``namespace`` (a dict of variables), the DataFrames / Series that
+        the block reads (names in ``reads``) and binds are reported as rows in
+        and rows out. The record is appended even if the block raises.
+        """
+        before = dict(namespace) if namespace is not None else None
+        record = {'stage': name, 'status': 'ok'}
+        rows_in = [_rows(before[n]) for n in reads if before is not None and n in before]
+        record['rows_in'] = sum(r for r in rows_in if r is not None) if any(r is not None for r in rows_in) else None
+
+        created = self.frames.created if self.frames else 0
+        copies = self.frames.copies if self.frames else 0
+        rss_before = current_rss_mb()
+        profiler = None
+        if self.profile == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+        elif self.profile == 'tracemalloc':
+            tracemalloc.start()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        except SystemExit as exc:
+            record['status'] = f'exit({exc.code})'
+            raise
+        except BaseException as exc:
+            record['status'] = 'error'
+            record['error'] = f'{type(exc).__name__}: {exc}'
+            raise
+        finally:
+            record['wall_s'] = time.perf_counter() - wall
+            record['cpu_s'] = time.process_time() - cpu
+            if profiler is not None:
+                profiler.disable()
+                record['profile'] = _cprofile_top(profiler, self.top)
+            elif self.profile == 'tracemalloc':
+                record['traced_peak_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                record['profile'] = _tracemalloc_top(tracemalloc.take_snapshot(), self.top)
+                tracemalloc.stop()
+            rss_after = current_rss_mb()
+            record['rss_mb'] = rss_after
+            record['rss_delta_mb'] = None if rss_after is None or rss_before is None else rss_after - rss_before
+            record['peak_rss_mb'] = peak_rss_mb()
+            if self.frames:
+                record['frames_created'] = self.frames.created - created
+                record['frame_copies'] = self.frames.copies - copies
+            if namespace is not None:
+                bound = {n: _rows(v) for n, v in namespace.items()
+                         if _rows(v) is not None and (n not in before or before[n] is not v)}
+                record['rows_out'] = sum(bound.values()) if bound else None
+                record['frames_out'] = bound
+            self.stages.append(record)
+
+    @staticmethod
+    def count_rows(record, inputs, output):
+        """Fill ``rows_in`` / ``rows_out`` of a record from a stage's input and
+        output values (only DataFrames and Series count)."""
+        rows_in = [r for r in map(_rows, inputs) if r is not None]
+        record['rows_in'] = sum(rows_in) if rows_in else None
+        record['rows_out'] = _rows(output)
+
+    def report(self, **meta):
+        """The run report as a JSON-serialisable dict."""
+        totals = {key: sum(s.get(key) or 0 for s in self.stages)
+                  for key in ('wall_s', 'cpu_s', 'frames_created', 'frame_copies')}
+        totals['peak_rss_mb'] = peak_rss_mb()
+        meta.setdefault('timestamp', datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'))
+        meta.setdefault('python', sys.version.split()[0])
+        meta.setdefault('pandas', pd.__version__)
+        meta.setdefault('profile', self.profile)
+        return {'meta': meta, 'stages': self.stages, 'totals': totals}
+
+    def summary(self):
+        """Terminal table of the stages, in the scripts' ``tabulate`` grid style."""
+        columns = ['stage', 'status', 'wall_s', 'cpu_s', 'rss_mb', 'rss_delta_mb', 'peak_rss_mb',
+                   'rows_in', 'rows_out', 'frames_created', 'frame_copies']
+        rows = [{c: s.get(c) for c in columns} for s in self.stages]
+        try:
+            from tabulate import tabulate
+        except ImportError:
+            return pd.DataFrame(rows, columns=columns).to_string(index=False, float_format='%.3f', na_rep='')
+        return tabulate(rows, headers='keys', tablefmt='grid', floatfmt='.3f', missingval='')
+
+
+def _cprofile_top(profiler, top):
+    stats = pstats.Stats(profiler, stream=io.StringIO()).sort_stats('cumulative')
+    rows = []
+    for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({'function': f'{os.path.basename(filename)}:{line}({func})', 'calls': calls,
+                     'tottime_s': tottime, 'cumtime_s': cumtime})
+    rows.sort(key=lambda r: r['cumtime_s'], reverse=True)
+    return rows[:top]
+
+
+def _tracemalloc_top(snapshot, top):
+    return [{'location': f'{os.path.basename(s.traceback[0].filename)}:{s.traceback[0].lineno}',
+             'size_mb': s.size / 2 ** 20, 'count': s.count}
+            for s in snapshot.statistics('lineno')[:top]]
+
+
+# =====================================
+# Section runner
+# =====================================
+_BANNER = re.compile(r'^# =+\s*\n# (\d+\) .+?)\s*\n# =+\s*$', re.MULTILINE)
+
+
+def split_script(source):
+    """``[(title, source)]`` for each ``# N) Title`` section; code before the
+    first banner is the ``setup`` section."""
+    sections = []
+    matches = list(_BANNER.finditer(source))
+    start, title = 0, 'setup'
+    for match in matches:
+        sections.append((title, source[start:match.start()]))
+        start, title = match.start(), match.group(1)
+    sections.append((title, source[start:]))
+    return [(t, s) for t, s in sections if s.strip()]
+
+
+def split_notebook(path):
+    """``[(title, source)]`` for each code cell; the title is the cell's first
+    descriptive comment. IPython magics and shell escapes are dropped."""
+    with open(path, encoding='utf-8') as f:
+        notebook = json.load(f)
+    sections = []
+    for i, cell in enumerate(notebook['cells']):
+        if cell['cell_type'] != 'code':
+            continue
+        lines = ''.join(cell['source']).splitlines()
+        lines = [line for line in lines if not line.lstrip().startswith(('%', '!'))]
+        title = next((line.lstrip('# ').strip() for line in lines
+                      if line.startswith('#') and line.strip('#= -')), f'cell {i}')
+        sections.append((title, '\n'.join(lines) + '\n'))
+    return sections
+
+
+def _drop_assignments(tree, names):
+    """Remove top-level ``name = ...`` statements for overridden names."""
+    def keep(node):
+        return not (isinstance(node, ast.Assign) and len(node.targets) == 1
+                    and isinstance(node.targets[0], ast.Name) and node.targets[0].id in names)
+    tree.body = [node for node in tree.body if keep(node)]
+    return tree
+
+
+def _names(code):
+    names = set(code.co_names) | set(code.co_varnames)
+    for const in code.co_consts:
+        if hasattr(const, 'co_names'):
+            names |= _names(const)
+    return names
+
+
+def run_sections(sections, filename, recorder, overrides=None, headless=False):
+    """Execute ``sections`` in one namespace, one recorder stage each.
+
+    ``overrides`` pre-sets variables and drops the script's own top-level
+    assignments to them (e.g. the hard-coded ``file_path``).
+    """
+    overrides = dict(overrides or {})
+    if headless:
+        import matplotlib
+        matplotlib.use('Agg')
+    namespace = {'__name__': '__main__', '__file__': os.path.abspath(filename), **overrides}
+    try:
+        from IPython.display import display
+        namespace.setdefault('display', display)
+    except ImportError:
+        namespace.setdefault('display', print)
+
+    for title, source in sections:
+        tree = _drop_assignments(ast.parse(source, filename), set(overrides))
+        code = compile(tree, f'{filename} [{title}]', 'exec')
+        try:
+            with recorder.stage(title, namespace, reads=_names(code)):
+                exec(code, namespace)
+        except SystemExit:
+            break
+        finally:
+            if headless and 'matplotlib.pyplot' in sys.modules:
+                sys.modules['matplotlib.pyplot'].close('all')
+    return namespace
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a pipeline script or notebook with per-section instrumentation")
+    parser.add_argument('path', help="pipeline script (.py) or notebook (.ipynb)")
+    parser.add_argument('--data', help="dataset path, replacing the script's hard-coded file_path")
+    parser.add_argument('--profile', choices=PROFILERS, help="also profile every section")
+    parser.add_argument('--top', type=int, default=15, help="entries kept per profile")
+    parser.add_argument('--report', default='run_report.json')
+    parser.add_argument('--headless', action='store_true', help="Agg backend; figures are closed, not shown")
+    args = parser.parse_args()
+
+    if args.path.endswith('.ipynb'):
+        sections = split_notebook(args.path)
+    else:
+        with open(args.path, encoding='utf-8') as f:
+            sections = split_script(f.read())
+    # Scripts import from the repository root, as their own sys.path bootstrap does
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.path)))
+
+    recorder = StageRecorder(args.profile, args.top)
+    overrides = {'file_path': args.data} if args.data else {}
+    try:
+        run_sections(sections, args.path, recorder, overrides, args.headless)
+    finally:
+        recorder.close()
+        report = recorder.report(source=os.path.abspath(args.path), data=args.data)
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print("\n" + "=" * 80)
+        print("RUN REPORT")
+        print("=" * 80)
+        print(recorder.summary())
+        print(f"Report -> {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+"""
+Lazy, out-of-core execution of the full pipeline on Polars.
+
+``diabetes_full_pipeline.py`` runs eagerly: the whole CSV is loaded, then each
+section makes its own pass. Here the same analysis (load -> correlate ->
+score -> threshold -> group by status / income -> leaderboard) is built as
+Polars lazy query plans over the data files, so
+
+* only the columns a plan uses are read, and filters (e.g. the leaderboard's
+  non-diabetic rows) are applied inside the scan;
+* plans run on the streaming engine, in parallel over all cores, without
+  materialising the dataset; the final queries share one scan of the scored
+  plan through ``collect_all``;
+* a glob or list of files (pooled multi-year BRFSS extracts with the 2015
+  columns) is scanned as one table.
+
+The model is fitted from one aggregate pass (means, population standard
+deviations and target correlations), exactly as the eager ``model`` stage
+does, and ``--check`` compares every result with the eager pipeline.
+
+Needs the optional ``polars`` package (>= 1.0).
+
+Usage:
+    python -m diabetes_pipeline.lazy data.csv --check
+    python -m diabetes_pipeline.lazy "brfss_20*.csv" --threads 32
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Imported on first use (``_require_polars``), so ``main`` can size the
+# thread pool before Polars starts it
+pl = None
+
+from diabetes_pipeline.attribution import top_risk_features
+from diabetes_pipeline.columns import COLUMNS, TARGET
+from diabetes_pipeline.factors import classify_factors
+from diabetes_pipeline.model import RiskModel
+from diabetes_pipeline.stratify import INCOME_LABELS
+
+STATUS_SHARES = {
+    'no_diabetes': lambda status: status == 0,
+    'prediabetes': lambda status: status == 1,
+    'diabetes': lambda status: status == 2,
+    'any_diabetes': lambda status: status > 0,
+}
+
+
+def _require_polars():
+    global pl
+    if pl is None:
+        try:
+            import polars
+        except ImportError:
+            raise ImportError("the lazy backend needs polars: pip install polars") from None
+        pl = polars
+
+
+def scan(source, columns=COLUMNS):
+    """A LazyFrame over one file, a glob or a list of CSV / Parquet files."""
+    _require_polars()
+    paths = source if isinstance(source, (list, tuple)) else [source]
+    if all(str(p).endswith('.parquet') for p in paths):
+        return pl.scan_parquet(list(paths))
+    # The survey stores every value as a float ("1.0"); a fixed schema skips
+    # inference and keeps pooled files consistent
+    return pl.scan_csv(list(paths), schema_overrides={c: pl.Float64 for c in columns})
+
+
+def collect(plans, engine='streaming'):
+    """Collect one plan or a list of plans (sharing common subplans)."""
+    single = not isinstance(plans, (list, tuple))
+    plans = [plans] if single else list(plans)
+    _require_polars()
+    try:
+        frames = pl.collect_all(plans, engine=engine)
+    except TypeError:  # Polars < 1.23: no engine argument
+        frames = pl.collect_all(plans, streaming=engine == 'streaming')
+    return frames[0] if single else frames
+
+
+class LazyPipeline:
+    """The full pipeline's results from lazy plans over ``source``."""
+
+    def __init__(self, source, target=TARGET, quantile=0.90, k=10, n_features=3,
+                 labels=INCOME_LABELS, engine='streaming'):
+        self.frame = scan(source)
+        self.target = target
+        self.quantile = quantile
+        self.k = k
+        self.n_features = n_features
+        self.labels = list(labels)
+        self.engine = engine
+
+    # ---------------------------------
+    # Pass 1: statistics and model
+    # ---------------------------------
+    def statistics(self):
+        """Means, population std, target correlations and Income quartile
+        edges of every feature, from one aggregate pass."""
+        features = [c for c in self.frame.collect_schema().names() if c != self.target]
+        quantiles = np.linspace(0, 1, len(self.labels) + 1)
+        stats = collect(self.frame.select(
+            [pl.col(f).mean().alias(f'mean:{f}') for f in features]
+            + [pl.col(f).std(ddof=0).alias(f'std:{f}') for f in features]
+            + [pl.corr(f, self.target).alias(f'corr:{f}') for f in features]
+            + [pl.col('Income').quantile(float(q), interpolation='linear').alias(f'income:{i}')
+               for i, q in enumerate(quantiles)]
+        ), self.engine).row(0, named=True)
+        return {
+            'mean': pd.Series({f: stats[f'mean:{f}'] for f in features}),
+            'std': pd.Series({f: stats[f'std:{f}'] for f in features}),
+            'corr': pd.Series({f: stats[f'corr:{f}'] for f in features}, name=self.target),
+            'income_edges': np.unique([stats[f'income:{i}'] for i in range(len(quantiles))]),
+        }
+
+    def fit(self, stats):
+        risk_factors, protective_factors = classify_factors(stats['corr'], self.target)
+        features = risk_factors + protective_factors
+        scales = stats['std'][features].to_numpy(dtype=np.float64)
+        scales[scales == 0] = 1.0  # as StandardScaler does
+        return RiskModel(risk_factors, protective_factors, stats['mean'][features].to_numpy(), scales,
+                         self.target)
+
+    # ---------------------------------
+    # Pass 2: scored plans
+    # ---------------------------------
+    def scored(self, model):
+        """The scan with a row id and the RiskScore expression added."""
+        score = pl.lit(model.offset)
+        for feature, weight in zip(model.features, model.weights.tolist()):
+            score = score + pl.col(feature) * weight
+        return self.frame.with_row_index('row').with_columns(score.alias('RiskScore'))
+
+    def income_group(self, edges):
+        """Quartile group code of Income, matching ``pd.qcut`` (right-closed bins)."""
+        interior = edges[1:-1]
+        if not len(interior):
+            return pl.lit(0, dtype=pl.Int32)
+        return pl.sum_horizontal([(pl.col('Income') > float(e)).cast(pl.Int32) for e in interior])
+
+    def plans(self, model, edges):
+        scored = self.scored(model)
+        status = pl.col(self.target)
+        return {
+            'threshold': scored.select(
+                pl.col('RiskScore').quantile(self.quantile, interpolation='linear')),
+            'status_scores': scored.group_by(self.target).agg(pl.col('RiskScore').mean()).sort(self.target),
+            'income_summary': scored.group_by(self.income_group(edges).alias('IncomeGroup')).agg(
+                [pl.len().alias('n')]
+                + [share(status).mean().alias(name) for name, share in STATUS_SHARES.items()]
+                + [pl.col('RiskScore').mean().alias('mean_risk_score')]
+            ).sort('IncomeGroup'),
+            'leaderboard': scored.filter((status == 0) | (status == 1)).top_k(self.k, by='RiskScore')
+                                 .select(['row', 'RiskScore', self.target] + model.risk_factors),
+        }
+
+    # ---------------------------------
+    # Run
+    # ---------------------------------
+    def run(self):
+        """``{'model', 'correlations', 'threshold', 'status_scores', 'income_summary', 'leaderboard'}``
+        in the eager pipeline's shapes."""
+        stats = self.statistics()
+        model = self.fit(stats)
+        plans = self.plans(model, stats['income_edges'])
+        frames = dict(zip(plans, collect(list(plans.values()), self.engine)))
+        return {
+            'model': model,
+            'correlations': stats['corr'],
+            'threshold': frames['threshold'].item(),
+            'status_scores': self._status_scores(frames['status_scores']),
+            'income_summary': self._income_summary(frames['income_summary'], len(stats['income_edges']) - 1),
+            'leaderboard': self._leaderboard(frames['leaderboard'], model),
+        }
+
+    def _status_scores(self, frame):
+        index = pd.Index(frame[self.target].cast(pl.Int64).to_list(), name=self.target)
+        return pd.Series(frame['RiskScore'].to_numpy(), index=index, name='RiskScore')
+
+    def _income_summary(self, frame, n_groups):
+        labels = self.labels[:n_groups]
+        groups = [labels[code] for code in frame['IncomeGroup'].to_list()]
+        summary = pd.DataFrame({c: frame[c].to_numpy() for c in frame.columns if c != 'IncomeGroup'},
+                               index=pd.CategoricalIndex(groups, categories=labels, ordered=True,
+                                                         name='IncomeGroup'))
+        summary['n'] = summary['n'].astype(np.int64)
+        return summary
+
+    def _leaderboard(self, frame, model):
+        board = pd.DataFrame({c: frame[c].to_numpy() for c in frame.columns},
+                             index=pd.Index(frame['row'].to_list()))
+        n_risk = len(model.risk_factors)
+        features = top_risk_features(board, model.risk_factors, n=self.n_features,
+                                     means=model.means[:n_risk], scales=model.scales[:n_risk])
+        board = board.sort_values('RiskScore', ascending=False, kind='stable')
+        return pd.DataFrame({'RiskScore': board['RiskScore'], 'Top_Risk_Features': features[board.index],
+                             self.target: board[self.target].astype(np.int64)})
+
+
+def compare_with_eager(file_path, results, rtol=1e-6):
+    """Differences between lazy ``results`` and the eager pipeline on one CSV.
+
+    Returns a list of ``(result, message)``; empty when everything matches.
+    """
+    import tempfile
+
+    from diabetes_pipeline.pipeline import build_pipeline
+    from diabetes_pipeline.stages import DiskCache
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        eager = build_pipeline(file_path, results['model'].target, DiskCache(cache_dir))
+        corr, (risk, protective), threshold, status, income, board = eager.run(
+            'correlations', 'factors', 'threshold', 'status_scores', 'income_summary', 'leaderboard')
+
+    problems = []
+    model = results['model']
+    if (risk, protective) != (model.risk_factors, model.protective_factors):
+        problems.append(('factors', 'risk / protective factor lists differ'))
+    checks = [
+        ('correlations', corr[model.target].drop(model.target), results['correlations']),
+        ('threshold', np.float64(threshold), results['threshold']),
+        ('status_scores', status.to_numpy(), results['status_scores'].to_numpy()),
+        ('income_summary', income.to_numpy(dtype=np.float64),
+         results['income_summary'][income.columns].to_numpy(dtype=np.float64)),
+        ('leaderboard', board['RiskScore'].to_numpy(), results['leaderboard']['RiskScore'].to_numpy()),
+    ]
+    for name, expected, actual in checks:
+        expected, actual = np.asarray(expected, dtype=np.float64), np.asarray(actual, dtype=np.float64)
+        if expected.shape != actual.shape:
+            problems.append((name, f"shape {actual.shape}, expected {expected.shape}"))
+        elif not np.allclose(expected, actual, rtol=rtol, atol=1e-9):
+            problems.append((name, f"max abs difference {np.max(np.abs(expected - actual)):.3g}"))
+    if list(board.index) != list(results['leaderboard'].index):
+        problems.append(('leaderboard', 'row ids differ'))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the full pipeline lazily and out-of-core on Polars")
+    parser.add_argument('source', nargs='+', help="CSV / Parquet file(s) or glob(s)")
+    parser.add_argument('--target', default=TARGET)
+    parser.add_argument('--engine', default='streaming', choices=['streaming', 'in-memory'])
+    parser.add_argument('--threads', type=int, help="Polars thread pool size (default: all cores)")
+    parser.add_argument('--explain', action='store_true', help="print the optimised leaderboard plan")
+    parser.add_argument('--check', action='store_true', help="compare with the eager pipeline (single CSV)")
+    args = parser.parse_args()
+
+    if args.threads:
+        # must be set before Polars starts its thread pool
+        os.environ['POLARS_MAX_THREADS'] = str(args.threads)
+    _require_polars()
+
+    source = args.source[0] if len(args.source) == 1 else args.source
+    pipeline = LazyPipeline(source, args.target, engine=args.engine)
+    results = pipeline.run()
+
+    print(results['model'])
+    print(f"\nRisk factors: {results['model'].risk_factors}")
+    print(f"Protective factors: {results['model'].protective_factors}")
+    print(f"\n90th percentile RiskScore: {results['threshold']:.4f}")
+    print("\n== status_scores ==")
+    print(results['status_scores'].to_string())
+    print("\n== income_summary ==")
+    print(results['income_summary'].to_string())
+    print("\n== leaderboard ==")
+    print(results['leaderboard'].to_string())
+
+    if args.explain:
+        stats = pipeline.statistics()
+        print(pipeline.plans(results['model'], stats['income_edges'])['leaderboard'].explain())
+
+    if args.check:
+        problems = compare_with_eager(args.source[0], results)
+        for name, message in problems:
+            print(f"MISMATCH {name}: {message}")
+        print("Matches the eager pipeline" if not problems else f"{len(problems)} mismatches")
+        if problems:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
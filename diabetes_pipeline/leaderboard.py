@@ -0,0 +1,146 @@
+"""
+Bounded top-K leaderboards over RiskScore.
+
+Section 9 of the pipelines filters the top 10%, then sorts the non-diabetic
+subset just to keep ten rows. ``Leaderboard`` keeps only the current top K:
+every batch is reduced to its own top K with ``argpartition`` and folded into
+the running board, so nothing the size of the population is sorted or copied,
+and boards built on separate chunks or workers merge into one.
+
+``LeaderboardSet`` maintains several boards in the same pass: overall,
+non-diabetic / pre-diabetic, pre-diabetic, and one per income group.
+"""
+
+import numpy as np
+import pandas as pd
+
+from diabetes_pipeline.columns import TARGET
+
+# name -> (column, values kept); None keeps every row
+DEFAULT_BOARDS = {
+    'overall': None,
+    'non_diabetic': (TARGET, (0, 1)),
+    'prediabetic': (TARGET, (1,)),
+}
+
+
+def _top_positions(scores, k):
+    """Positions of the ``k`` largest scores, in no particular order."""
+    if len(scores) <= k:
+        return np.arange(len(scores))
+    return np.argpartition(-scores, k - 1)[:k]
+
+
+class Leaderboard:
+    """The ``k`` highest-scoring rows seen so far, with a few payload columns."""
+
+    def __init__(self, k=10, payload=()):
+        self.k = k
+        self.payload = list(payload)
+        self.scores = np.empty(0)
+        self.ids = np.empty(0, dtype=object)
+        self.values = {column: np.empty(0, dtype=object) for column in self.payload}
+
+    def __len__(self):
+        return len(self.scores)
+
+    def update(self, scores, ids, payload=None, where=None):
+        """Offer a batch: ``scores`` and ``ids`` arrays plus payload columns.
+
+        ``payload`` maps payload column names to arrays aligned with ``scores``
+        (a DataFrame works). Only the batch's own top ``k`` are kept; with a
+        boolean ``where``, only among the rows it selects (the others are
+        masked out rather than copied out).
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        if where is None:
+            top = _top_positions(scores, self.k)
+        else:
+            top = _top_positions(np.where(where, scores, -np.inf), self.k)
+            top = top[where[top]]
+        batch = {column: np.asarray(payload[column])[top] for column in self.payload}
+        self._fold(scores[top], np.asarray(ids)[top], batch)
+        return self
+
+    def merge(self, other):
+        """Fold in a board built on other chunks or by another worker."""
+        self._fold(other.scores, other.ids, other.values)
+        return self
+
+    def _fold(self, scores, ids, values):
+        scores = np.concatenate([self.scores, scores])
+        ids = np.concatenate([self.ids.astype(object), np.asarray(ids, dtype=object)])
+        keep = _top_positions(scores, self.k)
+        self.scores = scores[keep]
+        self.ids = ids[keep]
+        self.values = {column: np.concatenate([self.values[column], np.asarray(values[column], dtype=object)])[keep]
+                       for column in self.payload}
+
+    def result(self, score='RiskScore'):
+        """The board as a DataFrame, highest score first, indexed by row id."""
+        order = np.argsort(-self.scores, kind='stable')
+        frame = pd.DataFrame({score: self.scores[order]}, index=pd.Index(list(self.ids[order])))
+        for column in self.payload:
+            frame[column] = list(self.values[column][order])
+        return frame
+
+
+class LeaderboardSet:
+    """Several leaderboards filled in one pass over the scored rows.
+
+    ``boards`` maps a name to a ``(column, values)`` filter (``None`` keeps
+    every row); with ``group_by`` set, one extra board per value of that
+    column is kept under the key ``(group_by, value)``.
+    """
+
+    def __init__(self, k=10, payload=(), boards=DEFAULT_BOARDS, group_by='IncomeGroup', score='RiskScore'):
+        self.k = k
+        self.payload = list(payload)
+        self.filters = dict(boards)
+        self.group_by = group_by
+        self.score = score
+        self.boards = {name: Leaderboard(k, self.payload) for name in self.filters}
+
+    def __getitem__(self, name):
+        return self.boards[name].result(self.score)
+
+    def _board(self, name):
+        if name not in self.boards:
+            self.boards[name] = Leaderboard(self.k, self.payload)
+        return self.boards[name]
+
+    def update(self, chunk):
+        """Offer a scored chunk (DataFrame with the score and payload columns)."""
+        scores = chunk[self.score].to_numpy(dtype=np.float64)
+        ids = chunk.index.to_numpy()
+        payload = {column: chunk[column].to_numpy() for column in self.payload}
+
+        for name, condition in self.filters.items():
+            if condition is None:
+                self.boards[name].update(scores, ids, payload)
+                continue
+            column, values = condition
+            self._update_subset(name, np.isin(chunk[column].to_numpy(), values), scores, ids, payload)
+
+        if self.group_by is not None and self.group_by in chunk.columns:
+            column = chunk[self.group_by]
+            groups = column.groupby(column, observed=True, sort=True).indices
+            for value, positions in groups.items():
+                where = np.zeros(len(scores), dtype=bool)
+                where[positions] = True
+                self._update_subset((self.group_by, value), where, scores, ids, payload)
+        return self
+
+    def _update_subset(self, name, where, scores, ids, payload):
+        if where.any():
+            self._board(name).update(scores, ids, payload, where)
+
+    def merge(self, other):
+        """Fold in a set built on other chunks or by another worker."""
+        for name, board in other.boards.items():
+            self._board(name).merge(board)
+        return self
+
+    def results(self):
+        """``{board name: DataFrame}`` for every board."""
+        return {name: board.result(self.score) for name, board in self.boards.items()}
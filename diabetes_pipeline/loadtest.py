@@ -0,0 +1,159 @@
+"""
+Load test for the scoring service.
+
+Opens ``--concurrency`` keep-alive connections and sends single-record
+``/score`` requests (synthetic BRFSS respondents) as fast as the service
+answers, for ``--duration`` seconds or ``--requests`` in total. Reports
+client-side latency percentiles and throughput next to the service's own
+``/stats``, and exits with status 1 if p99 is above ``--p99-ms``.
+
+Usage:
+    python -m diabetes_pipeline.loadtest --url http://127.0.0.1:8000 --concurrency 64 --duration 30 --p99-ms 20
+    python -m diabetes_pipeline.loadtest --model model.json --p99-ms 20   # starts an in-process service
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from diabetes_pipeline.columns import COLUMNS
+from diabetes_pipeline.model import RiskModel
+from diabetes_pipeline.service import DEFAULT_MAX_BATCH, DEFAULT_MAX_DELAY, ScoringService
+from diabetes_pipeline.synthetic import generate_block
+
+
+def synthetic_payloads(n, seed=0):
+    """``n`` encoded JSON bodies of synthetic respondents."""
+    block = generate_block(n, np.random.default_rng(seed))
+    rows = block.to_numpy(dtype=np.float64).tolist()
+    return [json.dumps(dict(zip(COLUMNS, row))).encode() for row in rows]
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        return self
+
+    async def request(self, method, path, body=b''):
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                          f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+                          .encode('latin-1') + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        return status, await self.reader.readexactly(length)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def run_load(host, port, payloads, concurrency=32, duration=10.0, max_requests=None):
+    """Drive ``/score`` with ``concurrency`` clients; returns (latencies_s, errors, elapsed_s)."""
+    latencies, errors = [], 0
+    sent = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset):
+        nonlocal errors, sent
+        client = await Client(host, port).connect()
+        i = offset
+        try:
+            while time.perf_counter() < deadline and (max_requests is None or sent < max_requests):
+                sent += 1
+                body = payloads[i % len(payloads)]
+                i += concurrency
+                start = time.perf_counter()
+                status, _ = await client.request('POST', '/score', body)
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors += 1
+        finally:
+            client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return np.asarray(latencies), errors, time.perf_counter() - start
+
+
+async def _fetch_stats(host, port):
+    client = await Client(host, port).connect()
+    try:
+        _, body = await client.request('GET', '/stats')
+    finally:
+        client.close()
+    return json.loads(body)
+
+
+async def _main(args):
+    service = None
+    if args.model:
+        service = await ScoringService(RiskModel.load(args.model), args.max_batch,
+                                       args.max_delay_ms / 1e3).start('127.0.0.1', 0)
+        host, port = '127.0.0.1', service.port
+    else:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    try:
+        payloads = synthetic_payloads(args.records, args.seed)
+        latencies, errors, elapsed = await run_load(host, port, payloads, args.concurrency,
+                                                    args.duration, args.requests)
+        server_stats = await _fetch_stats(host, port)
+    finally:
+        if service is not None:
+            await service.stop()
+    return latencies, errors, elapsed, server_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the scoring service")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', default='http://127.0.0.1:8000')
+    target.add_argument('--model', help="start an in-process service for this RiskModel artifact instead")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds")
+    parser.add_argument('--requests', type=int, help="stop after this many requests")
+    parser.add_argument('--records', type=int, default=10_000, help="distinct synthetic records to cycle through")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--p99-ms', type=float, help="fail (exit 1) if client p99 latency is above this")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument('--max-delay-ms', type=float, default=DEFAULT_MAX_DELAY * 1e3)
+    args = parser.parse_args()
+
+    latencies, errors, elapsed, server_stats = asyncio.run(_main(args))
+    ms = latencies * 1e3
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99]) if len(ms) else (np.nan,) * 3
+    print(f"requests    {len(ms)}  ({errors} errors) in {elapsed:.1f} s, concurrency {args.concurrency}")
+    print(f"throughput  {len(ms) / elapsed:,.0f} req/s")
+    print(f"latency     p50 {p50:.2f} ms  p90 {p90:.2f} ms  p99 {p99:.2f} ms  max {ms.max() if len(ms) else np.nan:.2f} ms")
+    batches = server_stats['micro_batches']
+    print(f"server      {batches['count']} micro-batches, mean size {batches['mean_size']:.1f}, "
+          f"max {batches['max_size']}")
+
+    if args.p99_ms is not None:
+        if not p99 <= args.p99_ms:
+            print(f"FAIL p99 {p99:.2f} ms > target {args.p99_ms:.2f} ms")
+            sys.exit(1)
+        print(f"OK p99 {p99:.2f} ms <= target {args.p99_ms:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
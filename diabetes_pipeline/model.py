@@ -0,0 +1,229 @@
+"""
+Persisted RiskScore model: fit once, score anywhere.
+
+``RiskScore`` (sections 3-4 of the pipelines) is a fixed linear function of the
+features once the factor signs and the ``StandardScaler`` parameters are known:
+
+    RiskScore = sum_f sign_f * (x_f - mean_f) / scale_f
+              = x @ weights + offset
+
+``RiskModel.fit`` derives those parameters from a training frame, ``save`` /
+``load`` keep them in a small versioned JSON artifact, and ``score`` /
+``score_one`` apply them to new records without the training CSV.
+
+Usage:
+    python -m diabetes_pipeline.model fit data.csv model.json
+    python -m diabetes_pipeline.model fit brfss_weighted.csv model.json --weights _LLCPWT
+    python -m diabetes_pipeline.model score model.json intake.csv scored.csv
+"""
+
+import argparse
+import datetime
+import json
+
+import numpy as np
+import pandas as pd
+
+from diabetes_pipeline.columns import TARGET
+from diabetes_pipeline.correlation import target_correlations
+from diabetes_pipeline.factors import classify_factors
+from diabetes_pipeline.quantiles import RISK_LEVEL_QUANTILES, assign_risk_levels, risk_level_cutoffs
+from diabetes_pipeline.summary import class_summary
+from diabetes_pipeline.weighted import weight_vector, weighted_moments, weighted_risk_level_cutoffs
+
+ARTIFACT_FORMAT = 'diabetes-risk-model'
+ARTIFACT_VERSION = 1
+
+
+class RiskModel:
+    """Factor signs plus scaler parameters, i.e. everything RiskScore needs."""
+
+    def __init__(self, risk_factors, protective_factors, means, scales, target=TARGET,
+                 cutoffs=None, metadata=None):
+        self.risk_factors = list(risk_factors)
+        self.protective_factors = list(protective_factors)
+        self.features = self.risk_factors + self.protective_factors
+        self.target = target
+        # (q_low, q_high) RiskScore cutoffs for the RiskLevel bands, if known
+        self.cutoffs = None if cutoffs is None else tuple(float(c) for c in cutoffs)
+        self.metadata = dict(metadata or {})
+
+        self.signs = np.r_[np.ones(len(self.risk_factors)), -np.ones(len(self.protective_factors))]
+        self.means = np.asarray(means, dtype=np.float64)
+        self.scales = np.asarray(scales, dtype=np.float64)
+        if not len(self.means) == len(self.scales) == len(self.features):
+            raise ValueError("means and scales must have one entry per feature")
+
+        self.weights = self.signs / self.scales
+        self.offset = -float(self.weights @ self.means)
+        # Plain-Python copies for the single-record path (no NumPy overhead)
+        self._pairs = list(zip(self.features, self.weights.tolist()))
+
+    # ---------------------------------
+    # Fitting
+    # ---------------------------------
+    @classmethod
+    def fit(cls, df, target=TARGET, weights=None):
+        """Fit on a training frame, exactly as ``diabetes_full_pipeline.py`` does.
+
+        With survey ``weights`` (a column name or an array) the factor signs,
+        scaler moments and RiskLevel cutoffs are all weighted.
+        """
+        candidates = [c for c in df.select_dtypes('number').columns
+                      if c != target and not (isinstance(weights, str) and c == weights)]
+        if weights is None:
+            corr = target_correlations(df, {target: target}, candidates)[target]
+        else:
+            corr = class_summary(df, target, candidates + [target], {}, weights).correlations()[target]
+        risk_factors, protective_factors = classify_factors(corr, target)
+
+        X = df[risk_factors + protective_factors].to_numpy(dtype=np.float64)
+        if weights is None:
+            means, scales = X.mean(axis=0), X.std(axis=0)
+            scales[scales == 0] = 1.0
+        else:
+            w = weight_vector(df, weights)
+            means, scales = weighted_moments(X, w)
+        model = cls(risk_factors, protective_factors, means, scales, target,
+                    metadata={'fitted_rows': len(df), 'weights': weights if isinstance(weights, str) else
+                              None if weights is None else 'array'})
+        if weights is None:
+            model.cutoffs = tuple(np.quantile(model.score(X), RISK_LEVEL_QUANTILES).tolist())
+        else:
+            model.cutoffs = weighted_risk_level_cutoffs(model.score(X), w)
+        return model
+
+    @classmethod
+    def from_moments(cls, moments, target=TARGET):
+        """Fit from a ``RunningMoments`` accumulator (streaming pass one)."""
+        risk_factors, protective_factors = classify_factors(moments.correlation(), target)
+        position = [moments.columns.index(f) for f in risk_factors + protective_factors]
+        return cls(risk_factors, protective_factors, moments.mean[position], moments.scale[position],
+                   target, metadata={'fitted_rows': int(moments.count)})
+
+    def set_cutoffs(self, sketch, quantiles=RISK_LEVEL_QUANTILES):
+        """Take the RiskLevel cutoffs from a ``QuantileSketch`` of the scores."""
+        self.cutoffs = risk_level_cutoffs(sketch, quantiles)
+        return self
+
+    # ---------------------------------
+    # Scoring
+    # ---------------------------------
+    def score(self, data):
+        """RiskScore for a batch of records.
+
+        ``data`` may be a DataFrame, a dict of column arrays, a pyarrow
+        Table / RecordBatch, or a 2-D array whose columns are in
+        ``self.features`` order. Returns a float64 array.
+        """
+        if isinstance(data, np.ndarray):
+            X = np.atleast_2d(data)
+            if X.shape[1] != len(self.features):
+                raise ValueError(f"Expected {len(self.features)} columns in {self.features} order")
+            return X @ self.weights + self.offset
+
+        # Column-wise accumulation: no (rows x features) float64 matrix needed,
+        # and narrow uint8 / float32 columns are upcast one at a time
+        scores = None
+        for feature, weight in self._pairs:
+            term = np.multiply(_column(data, feature), weight, dtype=np.float64)
+            if scores is None:
+                scores = term
+            else:
+                scores += term
+        return scores + self.offset
+
+    def score_one(self, record):
+        """RiskScore for a single respondent given as a mapping of feature values."""
+        score = self.offset
+        for feature, weight in self._pairs:
+            score += record[feature] * weight
+        return score
+
+    def risk_levels(self, scores):
+        """Low / Medium / High labels for scores, using the fitted cutoffs."""
+        if self.cutoffs is None:
+            raise ValueError("RiskModel has no RiskLevel cutoffs; fit them first")
+        return assign_risk_levels(scores, self.cutoffs)
+
+    def score_frame(self, df):
+        """``df['RiskScore']`` as a Series aligned with ``df``."""
+        return pd.Series(self.score(df), index=df.index, name='RiskScore')
+
+    # ---------------------------------
+    # Artifact
+    # ---------------------------------
+    def to_dict(self):
+        return {
+            'format': ARTIFACT_FORMAT,
+            'version': ARTIFACT_VERSION,
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'target': self.target,
+            'risk_factors': self.risk_factors,
+            'protective_factors': self.protective_factors,
+            'means': dict(zip(self.features, self.means.tolist())),
+            'scales': dict(zip(self.features, self.scales.tolist())),
+            'cutoffs': None if self.cutoffs is None else list(self.cutoffs),
+            'metadata': self.metadata,
+        }
+
+    @classmethod
+    def from_dict(cls, payload):
+        if payload.get('format') != ARTIFACT_FORMAT:
+            raise ValueError("Not a RiskModel artifact")
+        if payload.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported RiskModel artifact version {payload.get('version')}")
+        features = payload['risk_factors'] + payload['protective_factors']
+        return cls(payload['risk_factors'], payload['protective_factors'],
+                   [payload['means'][f] for f in features],
+                   [payload['scales'][f] for f in features],
+                   payload['target'], payload.get('cutoffs'), payload.get('metadata'))
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def __repr__(self):
+        return (f"RiskModel({len(self.risk_factors)} risk, "
+                f"{len(self.protective_factors)} protective factors, target={self.target!r})")
+
+
+def _column(data, name):
+    """One column of a DataFrame / mapping / pyarrow table as a NumPy array."""
+    column = data[name]
+    if hasattr(column, 'to_numpy'):
+        # pandas Series and pyarrow (Chunked)Array both provide to_numpy()
+        return column.to_numpy()
+    return np.asarray(column)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fit or apply a persisted RiskScore model")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fit_cmd = commands.add_parser('fit', help="fit on a training CSV and save the artifact")
+    fit_cmd.add_argument('data')
+    fit_cmd.add_argument('model')
+    fit_cmd.add_argument('--weights', help="survey weight column (e.g. _LLCPWT) for a weighted fit")
+
+    score_cmd = commands.add_parser('score', help="score a CSV with a saved artifact")
+    score_cmd.add_argument('model')
+    score_cmd.add_argument('data')
+    score_cmd.add_argument('output')
+    args = parser.parse_args()
+
+    if args.command == 'fit':
+        model = RiskModel.fit(pd.read_csv(args.data), weights=args.weights)
+        model.save(args.model)
+        print(f"Saved {model} -> {args.model}")
+    else:
+        model = RiskModel.load(args.model)
+        df = pd.read_csv(args.data)
+        df['RiskScore'] = model.score(df)
+        df.to_csv(args.output, index=False)
+        print(f"Scored {len(df)} rows -> {args.output}")
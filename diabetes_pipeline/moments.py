@@ -0,0 +1,90 @@
+"""
+Mergeable first and second moments (count, mean, co-moment matrix).
+
+The accumulator is updated one chunk at a time and two accumulators can be
+merged, so the statistics behind ``df.corr()`` and ``StandardScaler`` can be
+gathered without ever holding the full dataset. Chunks are combined with
+Chan et al.'s pairwise update, which stays numerically stable where naive
+sum / sum-of-squares accumulation would cancel.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class RunningMoments:
+    """Count, mean and co-moment matrix over a fixed list of columns."""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        p = len(self.columns)
+        self.count = 0
+        self.mean = np.zeros(p)
+        self.comoment = np.zeros((p, p))
+
+    def update(self, data):
+        """Add a chunk (DataFrame or 2-D array in ``columns`` order)."""
+        if isinstance(data, pd.DataFrame):
+            data = data[self.columns]
+        X = np.asarray(data, dtype=np.float64)
+        n = X.shape[0]
+        if n == 0:
+            return self
+
+        mean = X.mean(axis=0)
+        centered = X - mean
+        self._combine(n, mean, centered.T @ centered)
+        return self
+
+    def merge(self, other):
+        """Fold another accumulator over the same columns into this one."""
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge moments over different columns")
+        if other.count:
+            self._combine(other.count, other.mean, other.comoment)
+        return self
+
+    def _combine(self, n_b, mean_b, comoment_b):
+        n_a = self.count
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * (n_b / n)
+        self.comoment = self.comoment + comoment_b + np.outer(delta, delta) * (n_a * n_b / n)
+        self.count = n
+
+    # ---------------------------------
+    # Derived statistics
+    # ---------------------------------
+    @property
+    def variance(self):
+        """Population variance (ddof=0), as used by ``StandardScaler``."""
+        return np.diag(self.comoment) / self.count
+
+    @property
+    def scale(self):
+        """``StandardScaler.scale_``: population std with zeros replaced by 1."""
+        scale = np.sqrt(self.variance)
+        scale[scale == 0] = 1.0
+        return scale
+
+    @property
+    def sums(self):
+        """Column sums."""
+        return self.mean * self.count
+
+    @property
+    def cross_products(self):
+        """Raw cross-product matrix ``X.T @ X``."""
+        return self.comoment + np.outer(self.mean, self.mean) * self.count
+
+    def covariance(self, ddof=1):
+        return pd.DataFrame(self.comoment / (self.count - ddof),
+                            index=self.columns, columns=self.columns)
+
+    def correlation(self):
+        """Pearson correlation matrix, matching ``df.corr()``."""
+        std = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = self.comoment / np.outer(std, std)
+        np.fill_diagonal(corr, np.where(std > 0, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
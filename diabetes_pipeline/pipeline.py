@@ -0,0 +1,148 @@
+"""
+The sections of ``diabetes_full_pipeline.py`` as memoised stages.
+
+    load -> model -> scores -> threshold
+                 \\-> factors -> top_features
+    scores + top_features -> leaderboard
+    load -> correlations
+    load -> income_groups -> income_summary
+
+Every stage is cached under a hash of its code (with the package modules it
+calls into), parameters and inputs (the load stage is keyed by the SHA-256 of the CSV), so rerunning after a change,
+e.g. a different income cut, only recomputes the stages downstream of it.
+
+Usage:
+    python -m diabetes_pipeline.pipeline data.csv
+    python -m diabetes_pipeline.pipeline data.csv --stages leaderboard income_summary
+    python -m diabetes_pipeline.pipeline data.csv --report run.json --profile cprofile
+"""
+
+import argparse
+import json
+
+import pandas as pd
+
+from diabetes_pipeline.attribution import top_risk_features
+from diabetes_pipeline.cache import ensure_cache, load_dataset
+from diabetes_pipeline.columns import TARGET
+from diabetes_pipeline.instrument import PROFILERS, StageRecorder
+from diabetes_pipeline.leaderboard import LeaderboardSet
+from diabetes_pipeline.model import RiskModel
+from diabetes_pipeline.stages import DEFAULT_CACHE_DIR, DiskCache, Pipeline, Stage
+from diabetes_pipeline.stratify import INCOME_LABELS, income_groups, stratum_summary
+
+
+# =====================================
+# Stage functions
+# =====================================
+def load(file_path):
+    return load_dataset(file_path)
+
+
+def file_fingerprint(file_path):
+    return ensure_cache(file_path)[1]['sha256']
+
+
+def correlations(df):
+    return df.corr(numeric_only=True)
+
+
+def model(df, target):
+    return RiskModel.fit(df, target)
+
+
+def factors(risk_model):
+    return risk_model.risk_factors, risk_model.protective_factors
+
+
+def scores(df, risk_model):
+    return risk_model.score_frame(df)
+
+
+def threshold(risk_scores, quantile):
+    return risk_scores.quantile(quantile)
+
+
+def status_scores(df, risk_scores, target):
+    return risk_scores.groupby(df[target]).mean()
+
+
+def top_features(df, factor_lists, n):
+    return top_risk_features(df, factor_lists[0], n=n)
+
+
+def leaderboard(df, risk_scores, features, target, k):
+    frame = pd.DataFrame({'RiskScore': risk_scores, 'Top_Risk_Features': features, target: df[target]})
+    boards = LeaderboardSet(k=k, payload=['Top_Risk_Features', target], group_by=None).update(frame)
+    return boards['non_diabetic']
+
+
+def income_group_labels(df, labels):
+    return income_groups(df['Income'], labels)
+
+
+def income_summary(df, risk_scores, groups, target):
+    frame = pd.DataFrame({'IncomeGroup': groups, target: df[target], 'RiskScore': risk_scores})
+    return stratum_summary(frame, 'IncomeGroup', target)
+
+
+def build_pipeline(file_path, target=TARGET, cache=None):
+    """The full pipeline's stage DAG for ``file_path``."""
+    pipeline = Pipeline(cache)
+    # The dataset already has its own columnar cache, so only key it by content
+    pipeline.add(Stage('load', load, params={'file_path': file_path},
+                       fingerprint=file_fingerprint, persist=False))
+    pipeline.add(Stage('correlations', correlations, ['load']))
+    pipeline.add(Stage('model', model, ['load'], {'target': target}))
+    pipeline.add(Stage('factors', factors, ['model']))
+    pipeline.add(Stage('scores', scores, ['load', 'model']))
+    pipeline.add(Stage('threshold', threshold, ['scores'], {'quantile': 0.90}))
+    pipeline.add(Stage('status_scores', status_scores, ['load', 'scores'], {'target': target}))
+    pipeline.add(Stage('top_features', top_features, ['load', 'factors'], {'n': 3}))
+    pipeline.add(Stage('leaderboard', leaderboard, ['load', 'scores', 'top_features'],
+                       {'target': target, 'k': 10}))
+    pipeline.add(Stage('income_groups', income_group_labels, ['load'], {'labels': INCOME_LABELS}))
+    pipeline.add(Stage('income_summary', income_summary, ['load', 'scores', 'income_groups'],
+                       {'target': target}))
+    return pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the memoised diabetes pipeline stages")
+    parser.add_argument('data', help="BRFSS CSV")
+    parser.add_argument('--target', default=TARGET)
+    parser.add_argument('--stages', nargs='+', default=['leaderboard', 'status_scores', 'income_summary'])
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--clear', action='store_true', help="empty the stage cache first")
+    parser.add_argument('--report', help="write a per-stage run report (JSON) and print its summary")
+    parser.add_argument('--profile', choices=PROFILERS, help="with --report, also profile every stage")
+    args = parser.parse_args()
+
+    cache = DiskCache(args.cache_dir)
+    if args.clear:
+        cache.clear()
+    recorder = StageRecorder(args.profile) if args.report else None
+    pipeline = build_pipeline(args.data, args.target, cache)
+    pipeline.recorder = recorder
+    try:
+        results = pipeline.run(*args.stages)
+    finally:
+        if recorder is not None:
+            recorder.close()
+    if len(args.stages) == 1:
+        results = [results]
+
+    for name, result in zip(args.stages, results):
+        print(f"\n== {name} ==")
+        print(result.to_string() if hasattr(result, 'to_string') else result)
+    print("\n" + ", ".join(f"{name}: {status}" for name, status in pipeline.last_run.items()))
+
+    if recorder is not None:
+        with open(args.report, 'w') as f:
+            json.dump(recorder.report(data=args.data, targets=args.stages), f, indent=2, default=str)
+        print(recorder.summary())
+        print(f"Report -> {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Streaming approximate quantiles for the RiskLevel bands.
+
+The notebook and the pipelines call ``df['RiskScore'].quantile(...)`` several
+times, and each call sorts the whole column. ``QuantileSketch`` is a KLL
+sketch: scores are fed in chunk by chunk during scoring, the sketch keeps only
+O(k) values, and sketches built by parallel workers merge into one. Quantiles
+come back with a normalised rank error of about ``eps``.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+RISK_LEVELS = ['Low', 'Medium', 'High']
+# Low/Medium cutoff at the median, High for the top 10%
+RISK_LEVEL_QUANTILES = (0.50, 0.90)
+
+_CAPACITY_DECAY = 2 / 3
+# k * eps giving a worst-case observed rank error below eps (k=600 at eps=0.005)
+_ERROR_CONSTANT = 3.0
+
+
+class QuantileSketch:
+    """Mergeable KLL quantile sketch over float values."""
+
+    def __init__(self, eps=0.005, seed=None):
+        self.eps = eps
+        self.k = max(8, math.ceil(_ERROR_CONSTANT / eps))
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def size(self):
+        """Number of values actually retained."""
+        return sum(len(level) for level in self._levels)
+
+    def _capacity(self, level):
+        depth = len(self._levels) - 1 - level
+        return max(2, math.ceil(self.k * _CAPACITY_DECAY ** depth))
+
+    def update(self, values):
+        """Add a batch of values (NaNs are ignored)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold in a sketch built elsewhere (another chunk or worker)."""
+        if other.count == 0:
+            return self
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for h, level in enumerate(other._levels):
+            self._levels[h] = np.concatenate([self._levels[h], level])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        """Compact every over-full level: sort it and promote every other item."""
+        h = 0
+        while h < len(self._levels):
+            level = self._levels[h]
+            if len(level) > self._capacity(h):
+                if h + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                level = np.sort(level)
+                # An odd item out stays behind at this level
+                keep = level[len(level) - len(level) % 2:]
+                level = level[:len(level) - len(level) % 2]
+                promoted = level[self._rng.integers(2)::2]
+                self._levels[h] = keep
+                self._levels[h + 1] = np.concatenate([self._levels[h + 1], promoted])
+            h += 1
+
+    def _weighted_items(self):
+        values = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self._levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """Approximate quantile(s) ``q`` in [0, 1]."""
+        if self.count == 0:
+            raise ValueError("Cannot take quantiles of an empty sketch")
+        values, cumulative = self._weighted_items()
+        q = np.asarray(q, dtype=np.float64)
+        idx = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        result = values[np.clip(idx, 0, len(values) - 1)]
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return float(result) if result.ndim == 0 else result
+
+    def rank(self, x):
+        """Approximate fraction of values <= ``x``."""
+        if self.count == 0:
+            raise ValueError("Cannot rank against an empty sketch")
+        values, cumulative = self._weighted_items()
+        idx = np.searchsorted(values, np.asarray(x, dtype=np.float64), side='right')
+        ranks = np.where(idx > 0, cumulative[np.maximum(idx - 1, 0)], 0.0) / cumulative[-1]
+        return float(ranks) if ranks.ndim == 0 else ranks
+
+
+def risk_level_cutoffs(sketch, quantiles=RISK_LEVEL_QUANTILES):
+    """``(q_low, q_high)`` RiskScore cutoffs from a sketch (50th / 90th pct.)."""
+    return tuple(float(v) for v in sketch.quantile(list(quantiles)))
+
+
+def assign_risk_levels(scores, cutoffs, labels=RISK_LEVELS):
+    """Low / Medium / High labels for ``scores`` given ``(q_low, q_high)``.
+
+    Same bins as the notebook's
+    ``pd.cut(scores, bins=[-inf, q_low, q_high, inf], labels=labels)``.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    codes = np.searchsorted(np.asarray(cutoffs, dtype=np.float64), scores, side='left')
+    codes[np.isnan(scores)] = -1
+    return pd.Categorical.from_codes(codes, categories=list(labels), ordered=True)
@@ -0,0 +1,212 @@
+"""
+Logistic regression backend: IRLS / Newton solver plus parallel bootstrap.
+
+``fit_logit`` reproduces the notebook's adjusted model
+
+    sm.Logit(DiabetesBinary, add_constant(df[covariates])).fit()
+
+with a vectorised Newton solver that keeps the design matrix in float32 and
+reuses it across iterations and refits; ``logit_table`` formats the result like
+``model.summary2().tables[1]``.
+
+``bootstrap_logit`` runs thousands of replicates on a process pool. The design
+matrix is placed in shared memory once, and each replicate refits with
+multinomial resampling counts as case weights, so no resampled copy of the
+data is ever built.
+"""
+
+import math
+import os
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from diabetes_pipeline.columns import TARGET
+from diabetes_pipeline.stratify import map_strata
+
+COVARIATES = ['HvyAlcoholConsump', 'Age', 'Income', 'PhysActivity', 'BMI']
+TABLE_COLUMNS = ['Coef.', 'Std.Err.', 'z', 'P>|z|', '[0.025', '0.975]']
+
+
+class LogitResult:
+    """Coefficients and covariance of a fitted logistic regression."""
+
+    def __init__(self, names, params, cov, iterations, converged, loglike):
+        self.names = list(names)
+        self.params = params
+        self.cov = cov
+        self.bse = np.sqrt(np.diag(cov))
+        self.iterations = iterations
+        self.converged = converged
+        self.loglike = loglike
+
+    def table(self, alpha=0.05):
+        return logit_table(self, alpha)
+
+
+def design_matrix(df, covariates=COVARIATES, outcome=None, target=TARGET, dtype=np.float32):
+    """``(X, y, names)`` for the notebook's model.
+
+    ``X`` has a leading ``const`` column like ``sm.add_constant``; ``y`` is
+    ``outcome`` if given, else ``DiabetesBinary`` (``target > 0``).
+    """
+    covariates = [c for c in covariates if c in df.columns]
+    X = np.empty((len(df), len(covariates) + 1), dtype=dtype)
+    X[:, 0] = 1
+    X[:, 1:] = df[covariates].to_numpy(dtype=dtype)
+    if outcome is None:
+        y = (df[target].to_numpy() > 0).astype(dtype)
+    else:
+        y = df[outcome].to_numpy(dtype=dtype)
+    return X, y, ['const'] + covariates
+
+
+def fit_logit(X, y, names=None, weights=None, start=None, max_iter=35, tol=1e-6):
+    """Fit a logistic regression by Newton-Raphson (IRLS).
+
+    The (possibly float32) design ``X`` is used as-is; only the small p x p
+    Hessian and the coefficient vector are kept in float64. ``weights`` are
+    case / frequency weights (e.g. bootstrap resampling counts) and ``start``
+    warm-starts the solver.
+    """
+    n, p = X.shape
+    names = names or [f'x{j}' for j in range(p)]
+    dtype = X.dtype
+    w = None if weights is None else np.asarray(weights, dtype=dtype)
+    beta = np.zeros(p) if start is None else np.array(start, dtype=np.float64)
+
+    converged = False
+    for iteration in range(1, max_iter + 1):
+        gradient, hessian, _ = _newton_terms(X, y, w, beta, dtype)
+        step = np.linalg.solve(hessian, gradient)
+        beta += step
+        if np.max(np.abs(step) / np.maximum(np.abs(beta), 1.0)) < tol:
+            converged = True
+            break
+
+    _, hessian, loglike = _newton_terms(X, y, w, beta, dtype)
+    return LogitResult(names, beta, np.linalg.inv(hessian), iteration, converged, loglike)
+
+
+def _newton_terms(X, y, w, beta, dtype):
+    """Gradient, observed information and log-likelihood at ``beta``."""
+    eta = X @ beta.astype(dtype)
+    mu = 1.0 / (1.0 + np.exp(-eta))
+    resid = y - mu
+    curvature = mu * (1.0 - mu)
+    if w is not None:
+        resid = resid * w
+        curvature = curvature * w
+
+    gradient = (X.T @ resid).astype(np.float64)
+    hessian = (X.T @ (X * curvature[:, None])).astype(np.float64)
+
+    # log-likelihood in float64: sum y*eta - log(1 + e^eta)
+    eta64 = eta.astype(np.float64)
+    ll_terms = y * eta64 - np.logaddexp(0.0, eta64)
+    loglike = float(ll_terms @ w) if w is not None else float(ll_terms.sum())
+    return gradient, hessian, loglike
+
+
+def logit_table(result, alpha=0.05):
+    """Coefficient table laid out like ``summary2().tables[1]``."""
+    z = result.params / result.bse
+    p_values = [math.erfc(abs(v) / math.sqrt(2.0)) for v in z]
+    crit = statistics.NormalDist().inv_cdf(1 - alpha / 2)
+    return pd.DataFrame({
+        'Coef.': result.params,
+        'Std.Err.': result.bse,
+        'z': z,
+        'P>|z|': p_values,
+        '[0.025': result.params - crit * result.bse,
+        '0.975]': result.params + crit * result.bse,
+    }, index=result.names, columns=TABLE_COLUMNS)
+
+
+# =====================================
+# Bootstrap over a process pool
+# =====================================
+_worker = {}
+
+
+def _attach(x_name, x_shape, y_name, dtype, start):
+    """Pool initializer: map the shared design matrix and outcome."""
+    x_shm = shared_memory.SharedMemory(name=x_name)
+    y_shm = shared_memory.SharedMemory(name=y_name)
+    _worker['shm'] = (x_shm, y_shm)
+    _worker['X'] = np.ndarray(x_shape, dtype=dtype, buffer=x_shm.buf)
+    _worker['y'] = np.ndarray(x_shape[:1], dtype=dtype, buffer=y_shm.buf)
+    _worker['start'] = start
+
+
+def _bootstrap_batch(seeds):
+    X, y = _worker['X'], _worker['y']
+    n = X.shape[0]
+    params = []
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        # Multinomial(n, 1/n) resampling counts used as case weights
+        counts = np.bincount(rng.integers(0, n, n), minlength=n)
+        params.append(fit_logit(X, y, weights=counts, start=_worker['start']).params)
+    return np.array(params)
+
+
+def bootstrap_logit(X, y, names=None, n_boot=1000, processes=None, seed=0, alpha=0.05, batch_size=25):
+    """Percentile bootstrap CIs for the coefficients of ``fit_logit``.
+
+    Returns ``(table, replicates)``: the point-estimate table with added
+    bootstrap standard errors and CIs, and the ``(n_boot, p)`` array of
+    replicate coefficients.
+    """
+    result = fit_logit(X, y, names)
+    # the workers view y with X's dtype, so store it that way
+    X = np.asarray(X)
+    y = np.asarray(y, dtype=X.dtype)
+    seeds = np.random.SeedSequence(seed).generate_state(n_boot)
+    batches = [seeds[i:i + batch_size] for i in range(0, n_boot, batch_size)]
+
+    x_shm = shared_memory.SharedMemory(create=True, size=max(X.nbytes, 1))
+    y_shm = shared_memory.SharedMemory(create=True, size=max(y.nbytes, 1))
+    try:
+        np.ndarray(X.shape, dtype=X.dtype, buffer=x_shm.buf)[:] = X
+        np.ndarray(y.shape, dtype=X.dtype, buffer=y_shm.buf)[:] = y
+        initargs = (x_shm.name, X.shape, y_shm.name, X.dtype, result.params)
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count(),
+                                 initializer=_attach, initargs=initargs) as pool:
+            replicates = np.vstack(list(pool.map(_bootstrap_batch, batches)))
+    finally:
+        for shm in (x_shm, y_shm):
+            shm.close()
+            shm.unlink()
+
+    table = logit_table(result, alpha)
+    table['Boot.Std.Err.'] = replicates.std(axis=0, ddof=1)
+    table[f'Boot.[{alpha / 2:g}'] = np.quantile(replicates, alpha / 2, axis=0)
+    table[f'Boot.{1 - alpha / 2:g}]'] = np.quantile(replicates, 1 - alpha / 2, axis=0)
+    return table, replicates
+
+
+# =====================================
+# Per-stratum models
+# =====================================
+def _stratum_table(frame, covariates=COVARIATES, outcome=None, target=TARGET):
+    # A covariate that is constant within the stratum (typically the one the
+    # strata were cut from) is collinear with the intercept; leave it out
+    covariates = [c for c in covariates if frame[c].nunique() > 1]
+    X, y, names = design_matrix(frame, covariates, outcome, target)
+    return fit_logit(X, y, names).table()
+
+
+def logit_by_stratum(df, by, covariates=COVARIATES, outcome=None, target=TARGET, processes=None):
+    """The adjusted model refit within every stratum of ``by``, in parallel.
+
+    Returns ``{stratum: coefficient table}``.
+    """
+    covariates = [c for c in covariates if c in df.columns]
+    columns = covariates + [outcome or target]
+    func = partial(_stratum_table, covariates=covariates, outcome=outcome, target=target)
+    return map_strata(df, by, func, columns=columns, processes=processes)
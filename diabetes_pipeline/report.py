@@ -0,0 +1,352 @@
+"""
+Headless, parallel rendering of the report figures under ``Images/``.
+
+The scripts and the notebook draw every chart inline and save them one after
+another at dpi=300, plotting raw rows (a KDE over 250k RiskScores is the slow
+part). Here every figure is split in two:
+
+* a *prepare* step in the parent process that reduces the data to what the
+  chart actually shows (histogram counts and a binned KDE curve instead of raw
+  scores via ``binning.BinnedScores``, five-number summaries instead of
+  boxplot rows), and
+* a *draw* function that runs in a process pool on the Agg backend.
+
+Each figure's prepared data (plus the code of its draw module and the dpi) is
+hashed and stored in ``.report_manifest.json`` next to the images; a figure
+whose hash is unchanged and whose file exists is not redrawn.
+
+Usage:
+    python -m diabetes_pipeline.report data.csv
+    python -m diabetes_pipeline.report data.csv --out Images --dpi 150 --force
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from diabetes_pipeline.binning import BinnedScores
+from diabetes_pipeline.columns import COLUMNS, TARGET
+from diabetes_pipeline.quantiles import RISK_LEVELS
+
+MANIFEST = '.report_manifest.json'
+DEFAULT_DPI = 300
+
+STATUS_LABELS = ["No Diabetes (0)", "Pre-diabetes (1)", "Diabetes (2)"]
+STATUS_COLORS = ["green", "orange", "red"]
+
+
+# =====================================
+# Downsampling
+# =====================================
+def histogram(binned, bins, groups=None, lo=None, kde=True):
+    """Histogram counts and a KDE curve in count units, from a ``BinnedScores``."""
+    counts, edges = binned.histogram(bins, groups, lo=lo)
+    data = {'counts': counts, 'edges': edges}
+    if kde and len(counts):
+        x, density = binned.kde(groups, lo=lo)
+        data['kde_x'], data['kde_y'] = x, density * (edges[1] - edges[0])
+    return data
+
+
+def box_summary(values, whis=1.5):
+    """Boxplot statistics for ``Axes.bxp``; fliers reduced to distinct values."""
+    values = np.asarray(values, dtype=np.float64)
+    q1, med, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - whis * iqr) & (values <= q3 + whis * iqr)]
+    fliers = values[(values < q1 - whis * iqr) | (values > q3 + whis * iqr)]
+    return {'med': med, 'q1': q1, 'q3': q3, 'whislo': inside.min(), 'whishi': inside.max(),
+            'fliers': np.unique(fliers)}
+
+
+# =====================================
+# Draw functions (run in the workers)
+# =====================================
+def _bars(ax, hist, color, label=None):
+    edges = hist['edges']
+    ax.bar(edges[:-1], hist['counts'], width=np.diff(edges), align='edge',
+           color=color, alpha=0.6, edgecolor='white', linewidth=0.5, label=label)
+    if 'kde_x' in hist:
+        ax.plot(hist['kde_x'], hist['kde_y'], color=color)
+
+
+def draw_correlation_matrix(plt, data):
+    import seaborn as sns
+    plt.figure(figsize=(12, 10))
+    sns.heatmap(data['corr'], cmap="RdBu_r", center=0)
+    plt.title("Correlation Matrix of Health Indicators", fontsize=14)
+
+
+def draw_histogram(plt, data):
+    fig, ax = plt.subplots(figsize=data['figsize'])
+    _bars(ax, data['hist'], data['color'])
+    ax.set_title(data['title'])
+    ax.set_xlabel("Risk Score")
+    ax.set_ylabel("Count")
+
+
+def draw_risk_levels(plt, data):
+    """Cell 7: stacked by RiskLevel, with the top 10% outlined."""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    edges = data['edges']
+    bottom = np.zeros(len(edges) - 1)
+    for level, color in zip(RISK_LEVELS, ['green', 'orange', 'red']):
+        counts = data['levels'][level]
+        ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', bottom=bottom,
+               color=color, alpha=0.7, edgecolor='w', label=level)
+        bottom = bottom + counts
+    ax.stairs(data['top']['counts'], data['top']['edges'], color='darkred', linewidth=1.5,
+              label='Top 10% (>= 90th pct.)')
+    ax.axvline(data['q50'], color='black', linestyle='--', linewidth=1, label='50th pct.')
+    ax.axvline(data['q90'], color='black', linestyle='-.', linewidth=1, label='90th pct.')
+    ax.set_title('Risk Score Distribution by Level with Top 10% Overlay')
+    ax.set_xlabel('Risk Score')
+    ax.set_ylabel('Count')
+    ax.legend(title='Category', loc='upper right')
+    plt.tight_layout()
+
+
+def draw_status_bars(plt, data):
+    plt.figure(figsize=(6, 4))
+    plt.bar(range(len(data['values'])), data['values'], color=STATUS_COLORS[:len(data['values'])])
+    plt.title(data['title'])
+    plt.ylabel(data['ylabel'])
+    plt.xticks(range(len(data['values'])), STATUS_LABELS[:len(data['values'])], rotation=30)
+    plt.tight_layout()
+
+
+def draw_leaderboard(plt, data):
+    board = data['board'].sort_values('RiskScore')
+    plt.figure(figsize=(10, 6))
+    colors = ['skyblue' if x == 0 else 'orange' for x in board[data['target']]]
+    plt.barh(range(len(board)), board['RiskScore'], color=colors)
+    for i, score in enumerate(board['RiskScore']):
+        plt.text(score + 0.1, i, f'{score:.2f}', va='center')
+    plt.yticks(range(len(board)), board['Top_Risk_Features'])
+    plt.xlabel("Risk Score")
+    plt.title("Top 10 High-Risk Non-Diabetic/Pre-diabetic Individuals")
+    plt.legend(handles=[plt.Rectangle((0, 0), 1, 1, color='skyblue'), plt.Rectangle((0, 0), 1, 1, color='orange')],
+               labels=['No Diabetes', 'Pre-diabetes'])
+    plt.tight_layout()
+
+
+def draw_income_risk(plt, data):
+    plt.figure(figsize=(8, 5))
+    plt.bar(data['groups'], data['values'], color='teal')
+    plt.title("Average Risk Score by Income Group")
+    plt.xlabel("Income Group")
+    plt.ylabel("Average Risk Score")
+
+
+def draw_income_status(plt, data):
+    data['proportions'].plot(kind='bar', stacked=True, figsize=(8, 5), color=STATUS_COLORS)
+    plt.title("Diabetes Status Distribution by Income Group")
+    plt.ylabel("Proportion")
+    plt.xlabel("Income Group")
+    plt.xticks(rotation=0)
+
+
+def draw_boxplots(plt, data):
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.bxp(data['stats'], patch_artist=True, boxprops={'facecolor': data['color']})
+    ax.set_xticklabels(data['labels'])
+    ax.set_xlabel(data['xlabel'])
+    ax.set_ylabel(data['ylabel'])
+    ax.set_title(data['title'])
+
+
+# =====================================
+# Figure set
+# =====================================
+def distribution_figures(binned, cutoffs):
+    """RiskScore distribution figures from a ``BinnedScores`` grouped by status.
+
+    ``cutoffs`` are the 50th / 90th percentile scores (e.g. from a
+    ``QuantileSketch``), so these charts also work for streamed scoring where
+    the scores are never held in memory.
+    """
+    q50, q90 = cutoffs
+    non_diabetic = [g for g in binned.groups if g != 2]
+    levels, edges = binned.stacked_histograms(30, {
+        'Low': {'hi': q50}, 'Medium': {'lo': q50, 'hi': q90}, 'High': {'lo': q90}})
+    return {
+        'risk_score_distribution.png': (draw_histogram, {
+            'hist': histogram(binned, 50), 'color': 'purple', 'figsize': (8, 5),
+            'title': "Distribution of Risk Scores"}),
+        'high_risk_distribution.png': (draw_histogram, {
+            'hist': histogram(binned, 20, lo=q90), 'color': 'red', 'figsize': (10, 6),
+            'title': "Distribution of Risk Scores for Top 10% At-Risk Individuals"}),
+        'high_risk_non_diabetic.png': (draw_histogram, {
+            'hist': histogram(binned, 20, non_diabetic, lo=q90), 'color': 'orange', 'figsize': (10, 6),
+            'title': "Distribution of Risk Scores for High-Risk Non-Diabetic/Pre-diabetic Individuals"}),
+        'risk_level_distribution.png': (draw_risk_levels, {
+            'levels': levels, 'edges': edges, 'q50': q50, 'q90': q90,
+            'top': histogram(binned, 30, lo=q90, kde=False)}),
+        'avg_risk_by_status.png': (draw_status_bars, {
+            'values': binned.mean[np.argsort(binned.groups)],
+            'title': "Average Risk Score by Diabetes Status", 'ylabel': "Average Risk Score"}),
+    }
+
+
+def prepare_figures(df, risk_factors=None, protective_factors=None, target=TARGET,
+                    leaderboard=None, income_summary=None):
+    """``{filename: (draw_func, data)}`` for a scored frame.
+
+    ``df`` needs ``RiskScore``; ``leaderboard`` (section 9's board) and
+    ``income_summary`` (``stratum_summary`` by IncomeGroup) add their charts.
+    With the factor lists, the risk-only / protective-only boxplots are added.
+    """
+    scores = df['RiskScore'].to_numpy(dtype=np.float64)
+    status = df[target].to_numpy()
+    binned = BinnedScores().update(scores, status)
+    cutoffs = tuple(np.quantile(scores, [0.50, 0.90]))
+
+    figures = distribution_figures(binned, cutoffs)
+    figures.update({
+        'correlation_matrix.png': (draw_correlation_matrix, {
+            'corr': df[[c for c in COLUMNS if c in df.columns]].corr()}),
+    })
+    if 'HvyAlcoholConsump' in df.columns:
+        rate = df['HvyAlcoholConsump'].groupby(status).mean().to_numpy() * 100
+        figures['heavy_alcohol_by_status.png'] = (draw_status_bars, {
+            'values': rate, 'title': "Proportion of Heavy Alcohol Consumers by Diabetes Status",
+            'ylabel': "Heavy Alcohol Consumers (%)"})
+    if leaderboard is not None:
+        figures['top_10_highrisk_by_risk_scre_non.png'] = (draw_leaderboard, {
+            'board': leaderboard[['RiskScore', 'Top_Risk_Features', target]], 'target': target})
+    if income_summary is not None:
+        figures['income_risk.png'] = (draw_income_risk, {
+            'groups': [str(g) for g in income_summary.index],
+            'values': income_summary['mean_risk_score'].to_numpy()})
+        proportions = income_summary[['no_diabetes', 'prediabetes', 'diabetes']]
+        proportions.columns = ['No Diabetes', 'Pre-diabetes', 'Diabetes']
+        figures['income_diabetes_status.png'] = (draw_income_status, {'proportions': proportions})
+    if risk_factors and protective_factors:
+        X = df[risk_factors + protective_factors].to_numpy(dtype=np.float64)
+        z = (X - X.mean(axis=0)) / np.where(X.std(axis=0) == 0, 1.0, X.std(axis=0))
+        groups = np.unique(status)
+        for filename, part, color, ylabel, title in [
+            ('risk_factors_distribution.png', z[:, :len(risk_factors)], 'red', 'RiskScore_only',
+             "Distribution of Risk Factors by Diabetes Status"),
+            ('protective_factors_distribution.png', z[:, len(risk_factors):], 'green', 'ProtectiveScore_only',
+             "Distribution of Protective Factors by Diabetes Status"),
+        ]:
+            totals = part.sum(axis=1)
+            figures[filename] = (draw_boxplots, {
+                'stats': [box_summary(totals[status == g]) for g in groups],
+                'labels': [str(g) for g in groups], 'color': color,
+                'xlabel': target, 'ylabel': ylabel, 'title': title})
+    return figures
+
+
+def figure_hash(draw, data, dpi):
+    """Content hash of a figure: its draw code, prepared data and dpi.
+
+    The draw code is the source of the whole module defining ``draw``, so
+    edits to shared helpers and constants (``_bars``, ``STATUS_COLORS``)
+    also trigger a redraw.
+    """
+    module = inspect.getmodule(draw)
+    try:
+        source = inspect.getsource(module)
+    except (OSError, TypeError):
+        source = inspect.getsource(draw)
+    digest = hashlib.sha256(source.encode())
+    digest.update(pickle.dumps((data, dpi), protocol=4))
+    return digest.hexdigest()
+
+
+# =====================================
+# Rendering
+# =====================================
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _render(draw, data, path, dpi):
+    import matplotlib.pyplot as plt
+    draw(plt, data)
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close('all')
+    return path
+
+
+def _read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def render_figures(figures, out_dir='Images', dpi=DEFAULT_DPI, processes=None, force=False):
+    """Render ``figures`` (from ``prepare_figures``) into ``out_dir``.
+
+    Figures whose hash matches the manifest and whose file exists are skipped.
+    If a figure fails, the others are still rendered and recorded before its
+    exception is raised. Returns ``{filename: 'rendered' | 'skipped'}``.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _read_manifest(out_dir)
+    status, pending = {}, {}
+    for filename, (draw, data) in figures.items():
+        digest = figure_hash(draw, data, dpi)
+        path = os.path.join(out_dir, filename)
+        if not force and manifest.get(filename) == digest and os.path.exists(path):
+            status[filename] = 'skipped'
+        else:
+            pending[filename] = digest
+
+    failed = None
+    try:
+        if pending:
+            with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+                futures = {filename: pool.submit(_render, *figures[filename], os.path.join(out_dir, filename), dpi)
+                           for filename in pending}
+                for filename, future in futures.items():
+                    try:
+                        future.result()
+                    except Exception as exc:
+                        failed = failed or exc
+                        continue
+                    manifest[filename] = pending[filename]
+                    status[filename] = 'rendered'
+    finally:
+        # keep the hashes of whatever did render, even if a figure failed
+        with open(os.path.join(out_dir, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+    if failed is not None:
+        raise failed
+    return status
+
+
+def main():
+    from diabetes_pipeline.pipeline import build_pipeline
+
+    parser = argparse.ArgumentParser(description="Render the report figures headlessly")
+    parser.add_argument('data', help="BRFSS CSV")
+    parser.add_argument('--out', default='Images')
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help="redraw every figure")
+    args = parser.parse_args()
+
+    pipeline = build_pipeline(args.data)
+    df, scores, (risk_factors, protective_factors), board, income = pipeline.run(
+        'load', 'scores', 'factors', 'leaderboard', 'income_summary')
+    df = df.assign(RiskScore=scores)
+    figures = prepare_figures(df, risk_factors, protective_factors, leaderboard=board, income_summary=income)
+    status = render_figures(figures, args.out, args.dpi, args.processes, args.force)
+    for filename, state in status.items():
+        print(f"{state:>8}  {os.path.join(args.out, filename)}")
+
+
+if __name__ == '__main__':
+    main()
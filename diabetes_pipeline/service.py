@@ -0,0 +1,383 @@
+"""
+Local HTTP scoring service for intake systems.
+
+Serves the notebook's RiskScore / RiskLevel / top-risk-features logic from a
+saved ``RiskModel`` artifact (factor signs, scaler means and scales, RiskLevel
+cutoffs), loaded once at startup. Plain asyncio, no web framework.
+
+Single-record requests are not scored one by one: ``MicroBatcher`` queues
+them and scores whatever has arrived within ``max_delay`` (up to
+``max_batch`` records) as one vectorised batch, so the per-request cost stays
+close to the batch path under concurrent load.
+
+Endpoints:
+    POST /score        one record           -> {"RiskScore", "RiskLevel", "Top_Risk_Features"}
+    POST /score/batch  {"records": [...]}   -> {"results": [...]}
+    GET  /stats        latency percentiles, throughput and batch sizes
+    GET  /health       liveness and model summary
+
+Usage:
+    python -m diabetes_pipeline.model fit data.csv model.json
+    python -m diabetes_pipeline.service model.json --port 8000
+    python -m diabetes_pipeline.loadtest --url http://127.0.0.1:8000 --p99-ms 20
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import time
+
+import numpy as np
+
+from diabetes_pipeline.attribution import format_top_features, top_n_indices
+from diabetes_pipeline.model import RiskModel
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_DELAY = 0.002
+LATENCY_WINDOW = 100_000
+MAX_BODY_BYTES = 64 * 2 ** 20
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+    """A client error, answered with ``status`` and the message."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# =====================================
+# Scoring
+# =====================================
+def score_records(model, records, n_features=3):
+    """Score a list of record dicts in one vectorised pass.
+
+    Returns one ``{'RiskScore', 'RiskLevel', 'Top_Risk_Features'}`` dict per
+    record; ``RiskLevel`` is None if the model has no cutoffs.
+    """
+    try:
+        X = np.array([[record[f] for f in model.features] for record in records], dtype=np.float64)
+    except KeyError as exc:
+        raise RequestError(f"missing feature {exc.args[0]!r}; expected {model.features}") from None
+    except (TypeError, ValueError):
+        raise RequestError("records must map every feature to a number") from None
+    X = X.reshape(len(records), len(model.features))
+    finite = np.isfinite(X)
+    if not finite.all():
+        # None / NaN / inf would score as NaN, which is not valid JSON
+        row, col = np.argwhere(~finite)[0]
+        where = f" in record {row}" if len(records) > 1 else ""
+        raise RequestError(f"feature {model.features[col]!r}{where} must be a finite number")
+
+    scores = model.score(X)
+    levels = model.risk_levels(scores) if model.cutoffs is not None else [None] * len(records)
+    # Top contributors among the risk factors, ranked by standardized value
+    n_risk = len(model.risk_factors)
+    contributions = (X[:, :n_risk] - model.means[:n_risk]) / model.scales[:n_risk]
+    top = format_top_features(top_n_indices(contributions, n_features), model.risk_factors)
+    return [{'RiskScore': float(s), 'RiskLevel': None if level is None else str(level),
+             'Top_Risk_Features': str(t)}
+            for s, level, t in zip(scores, levels, top)]
+
+
+class MicroBatcher:
+    """Groups concurrently submitted records into vectorised batches."""
+
+    def __init__(self, model, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY, n_features=3):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.n_features = n_features
+        self.batch_sizes = collections.deque(maxlen=LATENCY_WINDOW)
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, record):
+        """Score one record as part of the next batch."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.max_batch:
+            # take whatever is already queued before waiting for more
+            while not self._queue.empty() and len(batch) < self.max_batch:
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - time.perf_counter()
+            if len(batch) >= self.max_batch or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            self.batch_sizes.append(len(batch))
+            try:
+                self._score(batch)
+            except Exception as exc:
+                # never let one batch take the batcher down with it
+                for _, future in batch:
+                    _settle(future, exception=exc)
+
+    def _score(self, batch):
+        try:
+            results = score_records(self.model, [record for record, _ in batch], self.n_features)
+        except RequestError:
+            # one bad record must not fail its neighbours: score them alone
+            for record, future in batch:
+                try:
+                    _settle(future, score_records(self.model, [record], self.n_features)[0])
+                except RequestError as exc:
+                    _settle(future, exception=exc)
+            return
+        for (_, future), result in zip(batch, results):
+            _settle(future, result)
+
+
+def _settle(future, result=None, exception=None):
+    """Resolve ``future`` unless its client has gone (cancelled) or it is already resolved."""
+    if future.done():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+
+# =====================================
+# Metrics
+# =====================================
+class LatencyStats:
+    """Per-endpoint request latencies (last ``LATENCY_WINDOW``) and counts."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.latencies = collections.defaultdict(lambda: collections.deque(maxlen=LATENCY_WINDOW))
+        self.requests = collections.Counter()
+        self.records = collections.Counter()
+        self.errors = collections.Counter()
+        self._recent = collections.deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, endpoint, seconds, n_records=0, error=False):
+        self.latencies[endpoint].append(seconds)
+        self.requests[endpoint] += 1
+        self.records[endpoint] += n_records
+        if error:
+            self.errors[endpoint] += 1
+        self._recent.append((time.monotonic(), n_records))
+
+    def summary(self, batch_sizes=()):
+        uptime = time.time() - self.started
+        now = time.monotonic()
+        recent = [n for t, n in self._recent if now - t <= 60]
+        endpoints = {}
+        for endpoint, values in self.latencies.items():
+            ms = np.asarray(values) * 1e3
+            p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+            endpoints[endpoint] = {
+                'requests': self.requests[endpoint], 'records': self.records[endpoint],
+                'errors': self.errors[endpoint],
+                'p50_ms': p50, 'p90_ms': p90, 'p99_ms': p99, 'max_ms': float(ms.max()),
+            }
+        sizes = np.asarray(batch_sizes) if len(batch_sizes) else np.zeros(1)
+        return {
+            'uptime_s': uptime,
+            'requests_per_s': sum(self.requests.values()) / uptime if uptime > 0 else 0.0,
+            'records_per_s_last_60s': sum(recent) / min(60.0, max(uptime, 1e-9)),
+            'endpoints': endpoints,
+            'micro_batches': {'count': len(batch_sizes), 'mean_size': float(sizes.mean()),
+                              'max_size': int(sizes.max())},
+        }
+
+
+# =====================================
+# HTTP
+# =====================================
+class ScoringService:
+    """The HTTP/1.1 server: keep-alive connections, JSON in and out."""
+
+    def __init__(self, model, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY, n_features=3):
+        self.model = model
+        self.n_features = n_features
+        self.batcher = MicroBatcher(model, max_batch, max_delay, n_features)
+        self.stats = LatencyStats()
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=8000):
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    # ---------------------------------
+    # Routes
+    # ---------------------------------
+    async def route(self, method, path, body):
+        """``(status, payload, n_records)`` for one request."""
+        if path == '/score':
+            self._expect(method, 'POST')
+            record = _decode(body)
+            if not isinstance(record, dict):
+                raise RequestError("expected one JSON object")
+            return 200, await self.batcher.submit(record), 1
+        if path == '/score/batch':
+            self._expect(method, 'POST')
+            payload = _decode(body)
+            records = payload.get('records') if isinstance(payload, dict) else payload
+            if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+                raise RequestError('expected {"records": [...]} or a JSON list of objects')
+            results = score_records(self.model, records, self.n_features) if records else []
+            return 200, {'results': results}, len(records)
+        if path == '/stats':
+            self._expect(method, 'GET')
+            return 200, self.stats.summary(self.batcher.batch_sizes), 0
+        if path == '/health':
+            self._expect(method, 'GET')
+            return 200, {'status': 'ok', 'model': repr(self.model), 'features': self.model.features,
+                         'cutoffs': self.model.cutoffs}, 0
+        raise RequestError(f"no route for {path}", 404)
+
+    @staticmethod
+    def _expect(method, allowed):
+        if method != allowed:
+            raise RequestError(f"use {allowed}", 405)
+
+    # ---------------------------------
+    # Connection handling
+    # ---------------------------------
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                start = time.perf_counter()
+                n_records, error = 0, False
+                try:
+                    status, payload, n_records = await self.route(method, path, body)
+                except RequestError as exc:
+                    status, payload, error = exc.status, {'error': str(exc)}, True
+                except Exception as exc:
+                    status, payload, error = 500, {'error': f'{type(exc).__name__}: {exc}'}, True
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                self.stats.record(path, time.perf_counter() - start, n_records, error)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except RequestError as exc:
+            writer.write(_response(exc.status, {'error': str(exc)}, False))
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+def _decode(body):
+    try:
+        return json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise RequestError(f"invalid JSON: {exc}") from None
+
+
+async def _read_request(reader):
+    """``(method, path, headers, body)``, or None when the client hung up."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise RequestError("malformed request line") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0) or 0)
+    except ValueError:
+        raise RequestError("invalid Content-Length") from None
+    if length < 0:
+        raise RequestError("invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise RequestError("request body too large", 413)
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target.split('?', 1)[0], headers, body
+
+
+def _response(status, payload, keep_alive=True):
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+
+async def serve(model, host='127.0.0.1', port=8000, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY):
+    service = await ScoringService(model, max_batch, max_delay).start(host, port)
+    print(f"Serving {model} on http://{host}:{service.port}", flush=True)
+    try:
+        await service.server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve RiskScore over HTTP with micro-batching")
+    parser.add_argument('model', help="RiskModel artifact (python -m diabetes_pipeline.model fit ...)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument('--max-delay-ms', type=float, default=DEFAULT_MAX_DELAY * 1e3,
+                        help="how long a micro-batch waits for more requests")
+    args = parser.parse_args()
+
+    model = RiskModel.load(args.model)
+    try:
+        asyncio.run(serve(model, args.host, args.port, args.max_batch, args.max_delay_ms / 1e3))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""
+Resampling stability of the risk / protective factor split.
+
+Section 3 of the pipelines calls a feature a risk factor if its correlation
+with ``Diabetes_012`` is positive and protective if it is negative, from one
+point estimate; ``diabetes_risk.py`` then tiers the ``is_diabetes``
+correlations at |r| >= 0.30 / 0.10. Features near zero (``Smoker``,
+``Fruits``, ...) may land on either side in another sample. This module
+repeats the target correlations over thousands of replicates:
+
+* ``bootstrap``: multinomial resampling counts used as case weights, for
+  percentile CIs, sign stability (share of replicates agreeing with the point
+  estimate's sign) and tier stability;
+* ``permutation``: the outcome shuffled against the features, for a
+  permutation p-value of each correlation.
+
+Like ``regression.bootstrap_logit``, no resampled frame is ever built. The
+features (centred, with their squares) go into shared memory once, sorted by
+outcome class; a bootstrap replicate is then the product of its counts with
+each class block, i.e. the per-class sums that ``summary.ClassSummary``
+derives every target correlation from, and a batch of replicates is one
+matrix product per class. A permutation replicate only sums the (few)
+feature rows drawn for the prediabetes / diabetes classes. Batches run on a
+process pool.
+
+Usage:
+    python -m diabetes_pipeline.stability data.csv --replicates 2000
+    python -m diabetes_pipeline.stability data.csv --method permutation --outcome is_diabetes
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from diabetes_pipeline.columns import FEATURES, OUTCOME_INDICATORS, TARGET
+from diabetes_pipeline.summary import class_summary
+
+METHODS = ('bootstrap', 'permutation')
+# diabetes_risk.py section 13: |r| >= 0.30 high-risk, >= 0.10 secondary-risk
+RISK_TIERS = (0.10, 0.30)
+TIER_LABELS = ['none', 'secondary', 'high']
+
+
+def _correlations(counts, sums, squares, W):
+    """Batched ``ClassSummary.correlations``: ``(B, k)`` counts, ``(B, k, p)``
+    per-class sums and ``(B, p)`` sums of squares -> ``(B, p, targets)``."""
+    n = counts.sum(axis=1)
+    mean = sums.sum(axis=1) / n[:, None]
+    ss_x = squares - n[:, None] * mean ** 2
+    n_w = counts @ W
+    cov = np.einsum('kt,bkp->bpt', W, sums) - mean[:, :, None] * n_w[:, None, :]
+    ss_w = counts @ W ** 2 - n_w ** 2 / n[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return cov / np.sqrt(ss_x[:, :, None] * ss_w[:, None, :])
+
+
+# =====================================
+# Replicates over a process pool
+# =====================================
+_worker = {}
+
+
+def _attach(name, shape, bounds, W):
+    """Pool initializer: map the shared ``[X, X**2]`` matrix (rows sorted by class)."""
+    shm = shared_memory.SharedMemory(name=name)
+    _worker['shm'] = shm
+    _worker['A'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker['bounds'] = bounds
+    _worker['W'] = W
+
+
+def _bootstrap_batch(seeds):
+    A, bounds, W = _worker['A'], _worker['bounds'], _worker['W']
+    n, p = A.shape[0], A.shape[1] // 2
+    # Multinomial(n, 1/n) resampling counts, one row per replicate
+    C = np.empty((len(seeds), n))
+    for i, seed in enumerate(seeds):
+        C[i] = np.bincount(np.random.default_rng(seed).integers(0, n, n), minlength=n)
+    k = len(bounds) - 1
+    counts = np.empty((len(seeds), k))
+    sums = np.empty((len(seeds), k, p))
+    squares = np.zeros((len(seeds), p))
+    for j in range(k):
+        block = slice(bounds[j], bounds[j + 1])
+        counts[:, j] = C[:, block].sum(axis=1)
+        products = C[:, block] @ A[block]
+        sums[:, j] = products[:, :p]
+        squares += products[:, p:]
+    return _correlations(counts, sums, squares, W)
+
+
+def _permutation_batch(seeds):
+    A, bounds, W = _worker['A'], _worker['bounds'], _worker['W']
+    n, p = A.shape[0], A.shape[1] // 2
+    k = len(bounds) - 1
+    sizes = np.diff(bounds)
+    total = A[:, :p].sum(axis=0)
+    # class sizes and sums of squares do not change under a permutation;
+    # the largest class's sums are the total minus the others'
+    largest = int(np.argmax(sizes))
+    counts = np.tile(sizes.astype(np.float64), (len(seeds), 1))
+    squares = np.tile(A[:, p:].sum(axis=0), (len(seeds), 1))
+    sums = np.empty((len(seeds), k, p))
+    for i, seed in enumerate(seeds):
+        drawn = np.random.default_rng(seed).permutation(n)
+        others = [j for j in range(k) if j != largest]
+        for j in others:
+            sums[i, j] = A[drawn[bounds[j]:bounds[j + 1]], :p].sum(axis=0)
+        sums[i, largest] = total - sums[i, others].sum(axis=0)
+    return _correlations(counts, sums, squares, W)
+
+
+def resample_correlations(df, method='bootstrap', n_replicates=1000, columns=FEATURES, target=TARGET,
+                          indicators=OUTCOME_INDICATORS, processes=None, seed=0, batch_size=16):
+    """Target correlations of ``columns`` and their resampling replicates.
+
+    Returns ``(point, replicates)``: the point estimates as a DataFrame (one
+    row per column; the target and each indicator as columns, as
+    ``summary.ClassSummary.correlations``) and a ``(n_replicates, columns,
+    targets)`` array.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+    columns = list(columns)
+    summary = class_summary(df, target, columns, indicators)
+    point = summary.correlations()
+    W = np.column_stack(list(summary.target_weights().values()))
+
+    codes, _ = pd.factorize(df[target], sort=True)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(summary.classes) + 1))
+    seeds = np.random.SeedSequence(seed).generate_state(n_replicates)
+    batches = [seeds[i:i + batch_size] for i in range(0, n_replicates, batch_size)]
+
+    n, p = len(df), len(columns)
+    shm = shared_memory.SharedMemory(create=True, size=max(n * 2 * p * 8, 1))
+    try:
+        A = np.ndarray((n, 2 * p), dtype=np.float64, buffer=shm.buf)
+        for j, column in enumerate(columns):
+            values = df[column].to_numpy(dtype=np.float64)[order]
+            # centred, so the sums of squares do not cancel
+            A[:, j] = values - values.mean()
+            np.square(A[:, j], out=A[:, p + j])
+        batch = _bootstrap_batch if method == 'bootstrap' else _permutation_batch
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count(), initializer=_attach,
+                                 initargs=(shm.name, A.shape, bounds, W)) as pool:
+            replicates = np.concatenate(list(pool.map(batch, batches)))
+        del A
+    finally:
+        shm.close()
+        shm.unlink()
+    return point, replicates
+
+
+# =====================================
+# Summaries
+# =====================================
+def tier(values, cutoffs=RISK_TIERS):
+    """Tier index of ``|values|`` for ``cutoffs`` (0 = below the lowest)."""
+    return np.searchsorted(np.asarray(cutoffs), np.abs(values), side='right')
+
+
+def stability_table(point, replicates, outcome=TARGET, alpha=0.05, cutoffs=RISK_TIERS):
+    """Per-feature stability of the ``outcome`` correlation under bootstrap replicates.
+
+    Columns: the point estimate, its factor class (as ``classify_factors``),
+    the bootstrap standard error and percentile CI, the share of replicates
+    with the point estimate's sign (``sign_stability``), whether the CI
+    excludes zero, and the share of replicates in the same |r| tier.
+    """
+    j = list(point.columns).index(outcome)
+    r = point[outcome].to_numpy()
+    reps = replicates[:, :, j]
+    sign = np.sign(r)
+    table = pd.DataFrame({
+        'corr': r,
+        'factor': np.where(sign > 0, 'risk', np.where(sign < 0, 'protective', 'none')),
+        'std_err': reps.std(axis=0, ddof=1),
+        f'ci_{alpha / 2:g}': np.quantile(reps, alpha / 2, axis=0),
+        f'ci_{1 - alpha / 2:g}': np.quantile(reps, 1 - alpha / 2, axis=0),
+        'sign_stability': (np.sign(reps) == sign).mean(axis=0),
+        'tier': np.array(TIER_LABELS)[tier(r, cutoffs)],
+        'tier_stability': (tier(reps, cutoffs) == tier(r, cutoffs)).mean(axis=0),
+    }, index=point.index)
+    lo, hi = table[f'ci_{alpha / 2:g}'], table[f'ci_{1 - alpha / 2:g}']
+    table.insert(5, 'ci_excludes_zero', (lo > 0) | (hi < 0))
+    return table.sort_values('corr')
+
+
+def permutation_table(point, replicates, outcome=TARGET):
+    """Two-sided permutation p-value of each ``outcome`` correlation.
+
+    ``p = (1 + #{|r*| >= |r|}) / (1 + replicates)``, with the null spread of
+    the replicates for reference.
+    """
+    j = list(point.columns).index(outcome)
+    r = point[outcome].to_numpy()
+    reps = replicates[:, :, j]
+    exceed = (np.abs(reps) >= np.abs(r)).sum(axis=0)
+    return pd.DataFrame({
+        'corr': r,
+        'null_std': reps.std(axis=0, ddof=1),
+        'p_value': (1 + exceed) / (1 + len(reps)),
+    }, index=point.index).sort_values('corr')
+
+
+def main():
+    from diabetes_pipeline.cache import load_dataset
+
+    parser = argparse.ArgumentParser(description="Bootstrap / permutation stability of the factor split")
+    parser.add_argument('data', help="BRFSS CSV")
+    parser.add_argument('--method', choices=METHODS, default='bootstrap')
+    parser.add_argument('--replicates', type=int, default=1000)
+    parser.add_argument('--outcome', default=TARGET,
+                        help=f"target column or indicator to report ({TARGET}, {', '.join(OUTCOME_INDICATORS)})")
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--alpha', type=float, default=0.05)
+    args = parser.parse_args()
+
+    df = load_dataset(args.data)
+    point, replicates = resample_correlations(df, args.method, args.replicates, processes=args.processes,
+                                              seed=args.seed)
+    print(f"{args.replicates} {args.method} replicates of the correlations with {args.outcome}\n")
+    if args.method == 'bootstrap':
+        table = stability_table(point, replicates, args.outcome, args.alpha)
+        print(table.to_string(float_format='{:.4f}'.format))
+        unstable = table.index[~table['ci_excludes_zero']].tolist()
+        print(f"\nSign not settled (CI includes 0): {unstable or 'none'}")
+    else:
+        print(permutation_table(point, replicates, args.outcome).to_string(float_format='{:.4g}'.format))
+
+
+if __name__ == '__main__':
+    main()
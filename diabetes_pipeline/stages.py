@@ -0,0 +1,279 @@
+"""
+Named pipeline stages with on-disk memoisation.
+
+A ``Pipeline`` is a small DAG of stages. Each stage declares the stages it
+reads from and its own parameters; its cache key is a SHA-256 over the stage
+name, the stage function's source, the source of every ``diabetes_pipeline``
+module it reaches (the helpers doing the real work), its parameters and the
+keys of its inputs (plus an optional fingerprint, e.g. the hash of a data
+file). Results are
+pickled under that key, so rerunning after a change only recomputes the
+stages downstream of it. The cache is bounded and evicts least recently used
+entries first.
+"""
+
+import ast
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+import tempfile
+import types
+from contextlib import nullcontext
+from functools import lru_cache
+
+DEFAULT_CACHE_DIR = '.pipeline_cache'
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_MAX_ENTRIES = 512
+
+
+class Stage:
+    """One step of the pipeline: ``func(*input_results, **params)``."""
+
+    def __init__(self, name, func, inputs=(), params=None, fingerprint=None, persist=True):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.params = dict(params or {})
+        # Optional callable(**params) -> str for state outside the arguments,
+        # such as the contents of an input file
+        self.fingerprint = fingerprint
+        # False for stages that are cheap to redo or already cached elsewhere
+        # (e.g. loading from the columnar dataset cache); they still get a key
+        self.persist = persist
+
+    def code_hash(self):
+        try:
+            source = inspect.getsource(self.func)
+        except (OSError, TypeError):
+            code = self.func.__code__
+            source = repr((code.co_code, code.co_consts))
+        digest = hashlib.sha256(source.encode())
+        for module in sorted(_package_modules(self.func)):
+            digest.update(f'{module}:{_module_hash(module)}'.encode())
+        return digest.hexdigest()
+
+
+# =====================================
+# Source dependencies of a stage
+# =====================================
+_PACKAGE = __name__.split('.')[0]
+
+
+def _in_package(module_name):
+    return isinstance(module_name, str) and module_name.split('.')[0] == _PACKAGE
+
+
+def _referenced_modules(values):
+    """Package modules defining (or being) any of ``values``."""
+    found = set()
+    for value in values:
+        name = value.__name__ if isinstance(value, types.ModuleType) else getattr(value, '__module__', None)
+        if _in_package(name) and name in sys.modules:
+            found.add(name)
+    return found
+
+
+def _code_names(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _code_names(const)
+    return names
+
+
+def _imported_modules(module_name):
+    """Package modules ``module_name`` imports anywhere in its source (also inside functions)."""
+    try:
+        tree = ast.parse(inspect.getsource(sys.modules[module_name]))
+    except (OSError, TypeError, SyntaxError):
+        return set()
+    found = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            found.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            found.add(node.module)
+            found.update(f'{node.module}.{alias.name}' for alias in node.names)
+    return {name for name in found if _in_package(name) and name in sys.modules}
+
+
+@lru_cache(maxsize=None)
+def _module_closure(module_name):
+    """``module_name`` and every package module it imports, transitively."""
+    seen, pending = set(), [module_name]
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        pending.extend(_imported_modules(name) - seen)
+    return frozenset(seen)
+
+
+@lru_cache(maxsize=None)
+def _module_hash(module_name):
+    try:
+        source = inspect.getsource(sys.modules[module_name])
+    except (OSError, TypeError):
+        source = ''
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def _package_modules(func):
+    """Package modules whose code ``func`` can run: the modules of the globals
+    and closure variables it references, and everything those import. The
+    function's own module only counts through the names it uses."""
+    code = getattr(func, '__code__', None)
+    if code is None:
+        return set()
+    namespace = getattr(func, '__globals__', {})
+    values = [namespace[n] for n in _code_names(code) if n in namespace]
+    values += [cell.cell_contents for cell in func.__closure__ or ()]
+    own = func.__module__
+    modules = set()
+    for name in _referenced_modules(values):
+        modules |= {name} if name == own else _module_closure(name)
+    return modules
+
+
+class DiskCache:
+    """Pickle store keyed by hex digests, with LRU eviction by mtime."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MAX_ENTRIES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.pkl')
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        path = self._path(key)
+        with open(path, 'rb') as f:
+            value = pickle.load(f)
+        os.utime(path)  # mark as recently used
+        return value
+
+    def put(self, key, value):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until within both limits."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        while entries and (total > self.max_bytes or len(entries) > self.max_entries):
+            _, size, name = entries.pop(0)
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                os.remove(os.path.join(self.directory, name))
+
+
+class Pipeline:
+    """A DAG of memoised stages.
+
+    Stages are registered with the ``stage`` decorator, e.g.::
+
+        @pipeline.stage(inputs=['scores'], quantile=0.90)
+        def threshold(scores, quantile):
+            return scores.quantile(quantile)
+    """
+
+    def __init__(self, cache=None, recorder=None):
+        self.cache = cache if cache is not None else DiskCache()
+        # optional instrument.StageRecorder; each stage loaded or computed
+        # by run() becomes one record
+        self.recorder = recorder
+        self.stages = {}
+        # name -> 'cached' / 'computed' for the most recent run()
+        self.last_run = {}
+
+    def add(self, stage):
+        for name in stage.inputs:
+            if name not in self.stages:
+                raise ValueError(f"Stage {stage.name!r} depends on unknown stage {name!r}")
+        self.stages[stage.name] = stage
+        return stage
+
+    def stage(self, name=None, inputs=(), fingerprint=None, persist=True, **params):
+        """Decorator registering a function as a stage."""
+        def register(func):
+            self.add(Stage(name or func.__name__, func, inputs, params, fingerprint, persist))
+            return func
+        return register
+
+    def set_params(self, name, **params):
+        """Change a stage's parameters; only it and its dependents go stale."""
+        self.stages[name].params.update(params)
+
+    def key(self, name, _keys=None):
+        """Cache key of ``name``, derived without computing anything."""
+        keys = {} if _keys is None else _keys
+        if name not in keys:
+            stage = self.stages[name]
+            payload = {
+                'stage': stage.name,
+                'code': stage.code_hash(),
+                'params': stage.params,
+                'inputs': [self.key(dep, keys) for dep in stage.inputs],
+                'fingerprint': stage.fingerprint(**stage.params) if stage.fingerprint else None,
+            }
+            blob = json.dumps(payload, sort_keys=True, default=repr).encode()
+            keys[name] = hashlib.sha256(blob).hexdigest()
+        return keys[name]
+
+    def _record(self, name):
+        return self.recorder.stage(name) if self.recorder is not None else nullcontext()
+
+    def run(self, *targets):
+        """Results of ``targets``, loading or recomputing stages as needed.
+
+        A cached stage is loaded without touching its inputs, so a cache hit
+        near the end of the DAG skips everything upstream of it.
+        """
+        self.last_run = {}
+        keys, results = {}, {}
+
+        def resolve(name):
+            if name in results:
+                return results[name]
+            stage = self.stages[name]
+            key = self.key(name, keys)
+            if stage.persist and key in self.cache:
+                with self._record(name) as record:
+                    value = self.cache.get(key)
+                self.last_run[name] = 'cached'
+            else:
+                args = [resolve(dep) for dep in stage.inputs]
+                with self._record(name) as record:
+                    value = stage.func(*args, **stage.params)
+                    if stage.persist:
+                        self.cache.put(key, value)
+                self.last_run[name] = 'computed'
+            if record is not None:
+                record['status'] = self.last_run[name]
+                self.recorder.count_rows(record, [results.get(dep) for dep in stage.inputs], value)
+            results[name] = value
+            return value
+
+        values = [resolve(name) for name in targets]
+        return values[0] if len(values) == 1 else values
@@ -0,0 +1,146 @@
+"""
+Stratified breakdowns (income, age, sex, education and their crosses).
+
+Replaces the ``for group in df['IncomeGroup'].unique(): sub = df[...]`` loops
+with one grouped pass: the per-stratum sums for the finest cross are computed
+once, and every coarser breakdown (including the grand total) is rolled up from
+that small table instead of rescanning the rows.
+
+Heavier per-stratum work, such as a regression per income group, can be fanned
+out over a process pool with ``map_strata``.
+"""
+
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from diabetes_pipeline.columns import TARGET
+
+INCOME_LABELS = ['Low', 'Medium', 'High', 'Very High']
+
+
+def income_groups(income, labels=INCOME_LABELS):
+    """Income quantile groups, one per label (quartiles Low .. Very High by default)."""
+    groups = pd.qcut(income, q=len(labels), duplicates='drop')
+    n_groups = groups.cat.categories.size
+    return groups.cat.rename_categories(list(labels)[:n_groups])
+
+
+def age_groups(age):
+    """Age quartile groups, as in the notebook's alcohol investigation."""
+    return pd.qcut(age, q=4, duplicates='drop')
+
+
+# Stratifiers derived from a raw column; any other column is used as-is
+DERIVED_STRATIFIERS = {
+    'IncomeGroup': ('Income', income_groups),
+    'AgeGroup': ('Age', age_groups),
+}
+
+
+def strata(df, stratifiers):
+    """The ``stratifiers`` columns of ``df``, deriving IncomeGroup / AgeGroup when missing.
+
+    Returns a new frame; ``df`` is not modified.
+    """
+    columns = {}
+    for name in stratifiers:
+        if name not in df.columns and name in DERIVED_STRATIFIERS:
+            source, derive = DERIVED_STRATIFIERS[name]
+            columns[name] = derive(df[source])
+        else:
+            columns[name] = df[name]
+    return pd.DataFrame(columns, index=df.index)
+
+
+def add_strata(df, stratifiers):
+    """``df`` plus any derived stratifier columns (IncomeGroup, AgeGroup) it lacks.
+
+    The columns are added to a new frame (``df.assign``); ``df`` is left as it is.
+    """
+    missing = [name for name in stratifiers if name not in df.columns]
+    return df.assign(**dict(strata(df, missing).items())) if missing else df
+
+
+def _summary_inputs(df, by, target, score, alcohol):
+    """Stratifier columns plus one numeric column per statistic to be summed."""
+    status = df[target].to_numpy()
+    values = dict(strata(df, by).items())
+    values['n'] = np.ones(len(df))
+    values['no_diabetes'] = status == 0
+    values['prediabetes'] = status == 1
+    values['diabetes'] = status == 2
+    values['any_diabetes'] = status > 0
+    if score in df.columns:
+        values['mean_risk_score'] = df[score].to_numpy(dtype=np.float64)
+    if alcohol in df.columns:
+        values['heavy_alcohol_rate'] = df[alcohol].to_numpy(dtype=np.float64)
+    return pd.DataFrame(values, index=df.index)
+
+
+def _finish(sums):
+    """Turn summed columns into per-stratum rates and means."""
+    summary = sums.div(sums['n'], axis=0)
+    summary['n'] = sums['n'].astype(np.int64)
+    return summary
+
+
+def stratum_summary(df, by, target=TARGET, score='RiskScore', alcohol='HvyAlcoholConsump'):
+    """Per-stratum statistics in one grouped pass.
+
+    ``by`` is a stratifier or a list of them (a cross). Returns one row per
+    observed stratum with its size, the share of each diabetes status, the
+    mean ``RiskScore`` and the heavy-alcohol rate (when those columns exist).
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    values = _summary_inputs(df, by, target, score, alcohol)
+    return _finish(values.groupby(by, observed=True, sort=True).sum())
+
+
+def cross_tabulate(df, stratifiers, target=TARGET, score='RiskScore', alcohol='HvyAlcoholConsump'):
+    """Summaries for every combination of ``stratifiers``, from one scan.
+
+    Returns a dict keyed by the tuple of stratifiers in each breakdown, from
+    ``()`` (the whole population) up to the full cross. Only the full cross
+    touches the rows; every other breakdown is summed from it.
+    """
+    stratifiers = list(stratifiers)
+    values = _summary_inputs(df, stratifiers, target, score, alcohol)
+    finest = values.groupby(stratifiers, observed=True, sort=True).sum()
+
+    tables = {}
+    for r in range(len(stratifiers) + 1):
+        for subset in itertools.combinations(stratifiers, r):
+            if not subset:
+                sums = finest.sum().to_frame('All').T
+            elif len(subset) == len(stratifiers):
+                sums = finest
+            else:
+                sums = finest.groupby(level=list(subset), observed=True, sort=True).sum()
+            tables[subset] = _finish(sums)
+    return tables
+
+
+def _apply_to_stratum(func, key, frame):
+    return key, func(frame)
+
+
+def map_strata(df, by, func, columns=None, processes=None):
+    """Run ``func(stratum_frame)`` for every stratum on a process pool.
+
+    Meant for per-stratum work that is heavy enough to amortise shipping the
+    stratum to a worker (e.g. a regression fit). ``func`` must be picklable (a
+    module-level function); ``columns`` limits what is sent to the workers.
+    Returns ``{stratum_key: result}`` in stratum order.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    df = add_strata(df, by)
+    frame = df if columns is None else df[list(columns)]
+    positions = df.groupby(by, observed=True, sort=True).indices
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(_apply_to_stratum, func, key, frame.iloc[rows])
+                   for key, rows in positions.items()]
+        return dict(f.result() for f in futures)
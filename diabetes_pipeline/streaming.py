@@ -0,0 +1,112 @@
+"""
+Two-pass streaming RiskScore for survey files larger than memory.
+
+Streams sections 3-4 of ``diabetes_full_pipeline.py`` over CSV chunks:
+
+* pass one gathers count, mean, variance and covariance of every column,
+  from which the correlations and the risk / protective factor split follow;
+* pass two standardizes each chunk with those moments, appends its
+  ``RiskScore`` to the output file and feeds the scores into a quantile
+  sketch, which yields the 50th / 90th percentile ``RiskLevel`` cutoffs, and
+  into per-status bins from which the distribution charts are drawn.
+
+Peak memory depends on ``chunksize``, not on the size of the input, and there
+is no full-size ``scaled`` copy at any point.
+
+Usage:
+    python -m diabetes_pipeline.streaming input.csv scored.csv --chunksize 200000
+    python -m diabetes_pipeline.streaming input.csv scored.csv --figures Images
+"""
+
+import argparse
+
+import pandas as pd
+
+from diabetes_pipeline.binning import BinnedScores
+from diabetes_pipeline.columns import TARGET
+from diabetes_pipeline.model import RiskModel
+from diabetes_pipeline.moments import RunningMoments
+from diabetes_pipeline.quantiles import QuantileSketch
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def read_chunks(file_path, chunksize=DEFAULT_CHUNKSIZE, usecols=None):
+    """Iterate over ``file_path`` as DataFrames of at most ``chunksize`` rows."""
+    yield from pd.read_csv(file_path, chunksize=chunksize, usecols=usecols)
+
+
+def collect_moments(file_path, chunksize=DEFAULT_CHUNKSIZE):
+    """Pass one: moments of every numeric column in the file."""
+    moments = None
+    for chunk in read_chunks(file_path, chunksize):
+        if moments is None:
+            moments = RunningMoments(chunk.select_dtypes('number').columns)
+        moments.update(chunk)
+    if moments is None or moments.count == 0:
+        raise ValueError(f"No rows found in {file_path}")
+    return moments
+
+
+def score_chunks(file_path, model, chunksize=DEFAULT_CHUNKSIZE):
+    """Pass two: yield each chunk with its ``RiskScore`` column appended."""
+    for chunk in read_chunks(file_path, chunksize):
+        chunk['RiskScore'] = model.score(chunk)
+        yield chunk
+
+
+def stream_risk_scores(file_path, out_path, target=TARGET, chunksize=DEFAULT_CHUNKSIZE, eps=0.005,
+                       leaderboards=None):
+    """Run both passes, writing the scored rows of ``file_path`` to ``out_path``.
+
+    Returns a dict with the correlations, the fitted ``RiskModel`` (factor
+    split, scaler parameters and RiskLevel cutoffs, accurate to ``eps`` in
+    rank), the score sketch and the scores binned by ``target``, so the run
+    can be inspected, plotted or reused. A ``LeaderboardSet`` passed as
+    ``leaderboards`` is filled chunk by chunk.
+    """
+    moments = collect_moments(file_path, chunksize)
+    model = RiskModel.from_moments(moments, target)
+    sketch = QuantileSketch(eps)
+    bins = BinnedScores()
+
+    rows = 0
+    for i, chunk in enumerate(score_chunks(file_path, model, chunksize)):
+        chunk.to_csv(out_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        sketch.update(chunk['RiskScore'].to_numpy())
+        bins.update(chunk['RiskScore'].to_numpy(), chunk[target].to_numpy())
+        if leaderboards is not None:
+            leaderboards.update(chunk)
+        rows += len(chunk)
+    model.set_cutoffs(sketch)
+
+    return {
+        'rows': rows,
+        'correlations': moments.correlation(),
+        'model': model,
+        'sketch': sketch,
+        'bins': bins,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Two-pass streaming RiskScore")
+    parser.add_argument('input', help="BRFSS CSV to score")
+    parser.add_argument('output', help="CSV to write the scored rows to")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--model-out', help="also save the fitted RiskModel artifact here")
+    parser.add_argument('--figures', help="render the RiskScore distribution charts into this directory")
+    args = parser.parse_args()
+
+    result = stream_risk_scores(args.input, args.output, chunksize=args.chunksize)
+    model = result['model']
+    if args.model_out:
+        model.save(args.model_out)
+    print(f"Scored {result['rows']} rows -> {args.output}")
+    print(f"Risk factors:       {', '.join(model.risk_factors)}")
+    print(f"Protective factors: {', '.join(model.protective_factors)}")
+    print(f"RiskLevel cutoffs (50th / 90th pct.): {model.cutoffs[0]:.3f} / {model.cutoffs[1]:.3f}")
+    if args.figures:
+        from diabetes_pipeline.report import distribution_figures, render_figures
+        render_figures(distribution_figures(result['bins'], model.cutoffs), args.figures)
+        print(f"Distribution charts -> {args.figures}")
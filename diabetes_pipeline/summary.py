@@ -0,0 +1,127 @@
+"""
+Per-class means and multi-target correlations in one fused pass.
+
+``diabetes_risk.py``, ``diabetes_corr.py`` and ``diabetes_expl.py`` each scan
+the data for ``groupby('Diabetes_012').mean()`` and again for the correlations
+with the outcome and its one-vs-rest flags. Both come from the same small set
+of sufficient statistics: with the outcome one-hot encoded as ``Y`` (rows x
+classes), ``Y^T X`` holds every per-class column sum, and together with the
+class counts and the column sums of squares it determines
+
+* the class means of every column, ``S_k / n_k``;
+* the correlation of every column with any target that is a function of the
+  class, e.g. ``1[class in A]`` (prediabetes, diabetes, any diabetes) or the
+  ordinal ``Diabetes_012`` itself: with class weights ``w``,
+  ``cov(x, w[class]) = (w . S - n_w * mean_x) / n``.
+
+``class_summary`` accumulates ``Y^T X`` and the sums of squares block by
+block (no full float64 copy of the frame, nothing added to it) and returns a
+``ClassSummary`` that derives both tables from them. With survey ``weights``
+the same sums are taken over ``w * x`` and the counts become weight totals,
+which gives the weighted means and weighted correlations at the same cost.
+"""
+
+import numpy as np
+import pandas as pd
+
+from diabetes_pipeline.columns import OUTCOME_INDICATORS, TARGET
+from diabetes_pipeline.weighted import weight_vector
+
+DEFAULT_BLOCK_ROWS = 65_536
+
+
+class ClassSummary:
+    """Class counts (or weight totals), per-class column sums and column sums of squares."""
+
+    def __init__(self, columns, classes, counts, sums, squares, shift, target=TARGET,
+                 indicators=OUTCOME_INDICATORS):
+        self.columns = list(columns)
+        self.classes = list(classes)
+        self.counts = np.asarray(counts, dtype=np.float64)
+        # per-class sums and overall sums of squares of (x - shift); the shift
+        # (the first row) keeps the variance from cancelling on large values
+        self.sums = sums
+        self.squares = squares
+        self.shift = shift
+        self.target = target
+        self.indicators = dict(indicators)
+
+    @property
+    def count(self):
+        return self.counts.sum()
+
+    def means(self, columns=None):
+        """``df.groupby(target).mean().T``: one row per column, one column per class."""
+        means = self.sums / self.counts[:, None] + self.shift
+        table = pd.DataFrame(means.T, index=self.columns, columns=pd.Index(self.classes, name=self.target))
+        if columns is None:
+            return table.drop(index=self.target, errors='ignore')
+        return table.loc[list(columns)]
+
+    def target_weights(self):
+        """Class weights of every target: the ordinal outcome and each indicator."""
+        weights = {self.target: np.asarray(self.classes, dtype=np.float64)}
+        for name, (column, values) in self.indicators.items():
+            if column != self.target:
+                raise ValueError(f"indicator {name} is not defined on {self.target}")
+            weights[name] = np.isin(self.classes, values).astype(np.float64)
+        return weights
+
+    def correlations(self):
+        """Correlation of every column with each target (``df.corr()`` columns)."""
+        n = self.count
+        weights = self.target_weights()
+        W = np.column_stack(list(weights.values()))
+        mean = self.sums.sum(axis=0) / n
+        ss_x = self.squares - n * mean ** 2
+        n_w = self.counts @ W
+        cov = W.T @ self.sums - np.outer(n_w, mean)
+        ss_w = (self.counts @ W ** 2) - n_w ** 2 / n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.sqrt(np.outer(ss_w, ss_x))
+        return pd.DataFrame(corr.T, index=self.columns, columns=list(weights))
+
+
+def class_summary(df, target=TARGET, columns=None, indicators=OUTCOME_INDICATORS, weights=None,
+                  block_rows=DEFAULT_BLOCK_ROWS):
+    """Fused per-class means and target correlations of ``df`` (see module docstring).
+
+    ``columns`` defaults to every numeric column, the target included (its
+    correlation row is the outcome's own). ``weights`` (a column name or an
+    array) makes every statistic survey-weighted; a weight column is left out
+    of the default ``columns``. The frame is read, never modified.
+    """
+    if columns is None:
+        columns = [c for c in df.select_dtypes('number').columns
+                   if not (isinstance(weights, str) and c == weights)]
+    columns = list(columns)
+    w = None if weights is None else weight_vector(df, weights)
+    codes, classes = pd.factorize(df[target], sort=True)
+    if (codes < 0).any():
+        raise ValueError(f"{target} has missing values")
+    classes = [c.item() if isinstance(c, np.generic) else c for c in classes]
+    k, p = len(classes), len(columns)
+
+    arrays = [df[c].to_numpy() for c in columns]
+    shift = np.array([a[0] for a in arrays], dtype=np.float64) if len(df) else np.zeros(p)
+    sums = np.zeros((k, p))
+    squares = np.zeros(p)
+    one_hot = np.eye(k)
+    block = np.empty((min(block_rows, len(df)), p))
+    for start in range(0, len(df), block_rows):
+        stop = min(start + block_rows, len(df))
+        X = block[:stop - start]
+        for j, a in enumerate(arrays):
+            X[:, j] = a[start:stop]
+        X -= shift
+        Y = one_hot[codes[start:stop]]
+        if w is None:
+            sums += Y.T @ X
+            squares += np.einsum('ij,ij->j', X, X)
+        else:
+            wX = X * w[start:stop, None]
+            sums += Y.T @ wX
+            squares += np.einsum('ij,ij->j', wX, X)
+
+    counts = np.bincount(codes, weights=w, minlength=k)
+    return ClassSummary(columns, classes, counts, sums, squares, shift, target, indicators)
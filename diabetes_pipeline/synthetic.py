@@ -0,0 +1,176 @@
+"""
+Seeded synthetic datasets with the BRFSS 2015 diabetes schema.
+
+The scripts read the author's local copy of
+``diabetes_012_health_indicators_BRFSS2015.csv``; for timing and regression
+tests this module writes a stand-in of any size with the same 22 columns.
+
+Every column is driven by three independent latent factors (general health,
+socio-economic status and age) plus noise:
+
+* binary indicators are ``1[a + w . F + e > 0]`` (a probit), with ``a``
+  solved so the marginal rate matches the survey's;
+* ordinal columns (GenHlth, Age, Education, Income and ``Diabetes_012``
+  itself) cut ``w . F + e`` at the normal quantiles of the survey's category
+  shares, so their marginals match too;
+* BMI is log-normal and MentHlth / PhysHlth are zero-inflated day counts.
+
+Correlations come from the shared factors, so the signs of the target
+correlations (and hence the risk / protective split) follow the real data.
+Rows are generated in independently seeded blocks, so 100M rows stream to
+disk in constant memory and the output depends only on ``seed`` and
+``chunksize``.
+
+Usage:
+    python -m diabetes_pipeline.synthetic brfss_1m.csv --rows 1000000 --seed 0
+"""
+
+import argparse
+import math
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from diabetes_pipeline.columns import COLUMNS, DTYPES, TARGET
+
+DEFAULT_CHUNKSIZE = 1_000_000
+
+_inv_cdf = NormalDist().inv_cdf
+
+# Loadings on (health, ses, age); positive health = sicker
+FACTORS = ('health', 'ses', 'age')
+
+# column -> (share of 1s in the survey, loadings)
+BINARY = {
+    'HighBP': (0.429, (0.9, -0.2, 0.8)),
+    'HighChol': (0.424, (0.7, -0.1, 0.6)),
+    'CholCheck': (0.963, (0.3, 0.2, 0.6)),
+    'Smoker': (0.443, (0.3, -0.3, 0.2)),
+    'Stroke': (0.041, (0.5, -0.2, 0.5)),
+    'HeartDiseaseorAttack': (0.094, (0.8, -0.2, 0.7)),
+    'PhysActivity': (0.757, (-0.4, 0.4, -0.2)),
+    'Fruits': (0.634, (-0.2, 0.2, 0.1)),
+    'Veggies': (0.811, (-0.2, 0.3, 0.0)),
+    'HvyAlcoholConsump': (0.056, (-0.3, 0.1, -0.2)),
+    'AnyHealthcare': (0.951, (0.0, 0.5, 0.4)),
+    'NoDocbcCost': (0.084, (0.3, -0.6, -0.4)),
+    'DiffWalk': (0.168, (0.8, -0.4, 0.6)),
+    'Sex': (0.440, (0.1, 0.1, 0.0)),
+}
+
+# column -> (category values, shares, loadings)
+ORDINAL = {
+    TARGET: ((0, 1, 2), (0.842, 0.018, 0.140), (0.8, -0.3, 0.5)),
+    'GenHlth': ((1, 2, 3, 4, 5), (0.179, 0.351, 0.298, 0.124, 0.048), (1.3, -0.5, 0.3)),
+    'Age': (tuple(range(1, 14)),
+            (0.022, 0.030, 0.044, 0.055, 0.064, 0.078, 0.103, 0.122, 0.131, 0.127, 0.093, 0.063, 0.068),
+            (0.0, 0.0, 1.0)),
+    'Education': ((1, 2, 3, 4, 5, 6), (0.001, 0.016, 0.037, 0.247, 0.276, 0.423), (-0.1, 1.2, -0.1)),
+    'Income': (tuple(range(1, 9)), (0.039, 0.046, 0.063, 0.079, 0.102, 0.144, 0.170, 0.357), (-0.3, 1.3, -0.1)),
+}
+
+# BMI: log-normal with the survey's mean and standard deviation
+BMI_MEAN, BMI_SD = 28.4, 6.6
+BMI_LOADINGS = (0.5, -0.1, 0.0)
+
+# MentHlth / PhysHlth: share of zero days, loadings of the "any bad days" probit
+DAY_COUNTS = {
+    'MentHlth': (0.693, (0.5, -0.3, -0.4)),
+    'PhysHlth': (0.631, (0.9, -0.2, 0.2)),
+}
+# Distribution of the non-zero day counts (respondents favour round numbers)
+_DAY_VALUES = np.array([1, 2, 3, 4, 5, 7, 10, 14, 15, 20, 21, 25, 28, 30])
+_DAY_SHARES = np.array([5, 12, 8, 4, 10, 5, 8, 4, 8, 5, 2, 2, 1, 16], dtype=np.float64)
+_DAY_SHARES /= _DAY_SHARES.sum()
+
+
+def _latent(factors, loadings, rng):
+    """``w . F + e`` and its standard deviation."""
+    value = rng.standard_normal(len(factors))
+    for j, w in enumerate(loadings):
+        if w:
+            value += w * factors[:, j]
+    return value, math.sqrt(1.0 + sum(w * w for w in loadings))
+
+
+def _binary(factors, share, loadings, rng):
+    value, sd = _latent(factors, loadings, rng)
+    return value > -_inv_cdf(share) * sd
+
+
+def _ordinal(factors, values, shares, loadings, rng):
+    value, sd = _latent(factors, loadings, rng)
+    cumulative = np.cumsum(shares)[:-1] / sum(shares)
+    cutpoints = np.array([_inv_cdf(p) for p in cumulative]) * sd
+    return np.asarray(values)[np.searchsorted(cutpoints, value)]
+
+
+def generate_block(n_rows, rng):
+    """One block of ``n_rows`` synthetic respondents in the survey's column order."""
+    factors = rng.standard_normal((n_rows, len(FACTORS)))
+    columns = {}
+    for name, (values, shares, loadings) in ORDINAL.items():
+        columns[name] = _ordinal(factors, values, shares, loadings, rng)
+    for name, (share, loadings) in BINARY.items():
+        columns[name] = _binary(factors, share, loadings, rng)
+    for name, (zero_share, loadings) in DAY_COUNTS.items():
+        any_days = _binary(factors, 1.0 - zero_share, loadings, rng)
+        columns[name] = np.where(any_days, rng.choice(_DAY_VALUES, n_rows, p=_DAY_SHARES), 0)
+
+    sigma = math.sqrt(math.log1p((BMI_SD / BMI_MEAN) ** 2))
+    value, sd = _latent(factors, BMI_LOADINGS, rng)
+    bmi = np.exp(math.log(BMI_MEAN) - sigma ** 2 / 2 + sigma * value / sd)
+    columns['BMI'] = np.clip(np.round(bmi), 12, 98)
+
+    return pd.DataFrame({c: columns[c].astype(DTYPES[c]) for c in COLUMNS})
+
+
+def generate_chunks(n_rows, seed=0, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield DataFrames of at most ``chunksize`` rows, ``n_rows`` in total."""
+    n_blocks = max(1, math.ceil(n_rows / chunksize))
+    for i, child in enumerate(np.random.SeedSequence(seed).spawn(n_blocks)):
+        size = min(chunksize, n_rows - i * chunksize)
+        chunk = generate_block(size, np.random.default_rng(child))
+        chunk.index += i * chunksize
+        yield chunk
+
+
+def generate(n_rows, seed=0, chunksize=DEFAULT_CHUNKSIZE):
+    """A synthetic dataset as one DataFrame (uint8 / float32 columns)."""
+    return pd.concat(generate_chunks(n_rows, seed, chunksize))
+
+
+# The published file stores every value as a float ("1.0"); every synthetic
+# value is a whole number below 256, so rows are assembled from this table
+# instead of going through float formatting
+_CSV_VALUES = np.array([f'{i}.0' for i in range(256)], dtype=object)
+
+
+def _csv_lines(chunk):
+    X = chunk.to_numpy(dtype=np.uint8)
+    lines = _CSV_VALUES[X[:, 0]]
+    for j in range(1, X.shape[1]):
+        lines = lines + ',' + _CSV_VALUES[X[:, j]]
+    return '\n'.join(lines) + '\n'
+
+
+def write_csv(path, n_rows, seed=0, chunksize=DEFAULT_CHUNKSIZE):
+    """Stream a synthetic dataset to ``path`` in the survey's CSV layout."""
+    with open(path, 'w', newline='') as f:
+        f.write(','.join(COLUMNS) + '\n')
+        for chunk in generate_chunks(n_rows, seed, chunksize):
+            f.write(_csv_lines(chunk))
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write a synthetic BRFSS-shaped dataset")
+    parser.add_argument('output', help="CSV to write")
+    parser.add_argument('--rows', type=int, default=253_680)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    write_csv(args.output, args.rows, args.seed, args.chunksize)
+    print(f"Wrote {args.rows} synthetic rows -> {args.output}")
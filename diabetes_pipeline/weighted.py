@@ -0,0 +1,149 @@
+"""
+Survey-weighted statistics for BRFSS.
+
+BRFSS respondents carry a sampling weight (``_LLCPWT`` in the full survey
+files); every statistic in the scripts treats rows as equally weighted.
+Repeating rows by their weight is not an option (weights run into the
+thousands), so these kernels take the weights as a vector and fold them into
+the arithmetic. Each is one or a few vectorised passes over the rows:
+
+* ``weighted_moments``: weighted means and population standard deviations,
+  i.e. ``StandardScaler().fit(X, sample_weight=w)``;
+* ``weighted_corr``: the weighted ``df.corr()`` matrix;
+* ``weighted_quantile``: quantiles of the weighted distribution by sampled
+  selection (expected O(n), no full sort), used for the RiskLevel cutoffs;
+* ``fit_weighted_logit``: logistic regression with sampling weights and a
+  robust (sandwich) covariance, so the standard errors do not treat weights as
+  replicated respondents.
+
+Weighted means by ``Diabetes_012`` and weighted target correlations come from
+``summary.class_summary(df, weights=...)``, and ``RiskModel.fit(df,
+weights=...)`` fits the whole RiskScore model from weighted moments.
+"""
+
+import numpy as np
+import pandas as pd
+
+from diabetes_pipeline.quantiles import RISK_LEVEL_QUANTILES
+from diabetes_pipeline.regression import LogitResult, fit_logit
+
+
+def weight_vector(df, weights):
+    """Weights as a float64 array: a column name of ``df`` or an array-like."""
+    w = df[weights].to_numpy(dtype=np.float64) if isinstance(weights, str) else np.asarray(weights, np.float64)
+    if w.shape != (len(df),):
+        raise ValueError(f"expected {len(df)} weights, got shape {w.shape}")
+    if not np.isfinite(w).all() or (w < 0).any():
+        raise ValueError("weights must be finite and non-negative")
+    return w
+
+
+def weighted_moments(X, w):
+    """Weighted column means and population standard deviations of ``X``.
+
+    Same as ``StandardScaler().fit(X, sample_weight=w)``'s ``mean_`` /
+    ``scale_`` (zero scales are returned as 1).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    total = w.sum()
+    mean = (w @ X) / total
+    centered = X - mean
+    var = (w @ (centered * centered)) / total
+    scale = np.sqrt(var)
+    scale[scale == 0] = 1.0
+    return mean, scale
+
+
+def weighted_corr(df, weights, columns=None):
+    """Weighted Pearson correlation matrix (weighted ``df.corr()``)."""
+    columns = list(df.select_dtypes('number').columns if columns is None else columns)
+    w = weight_vector(df, weights)
+    X = df[columns].to_numpy(dtype=np.float64)
+    X -= (w @ X) / w.sum()
+    cov = (X * w[:, None]).T @ X
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = cov / np.outer(std, std)
+    return pd.DataFrame(corr, index=columns, columns=columns)
+
+
+def weighted_quantile(values, weights, q):
+    """Quantile(s) ``q`` of ``values`` under ``weights``.
+
+    Uses the inverted-CDF definition: the smallest value whose cumulative
+    weight reaches ``q`` of the total (``np.quantile(..., weights=w,
+    method='inverted_cdf')``). Each quantile is found by sampled selection
+    (a few O(n) passes and a sort of a small bracket) instead of a full sort.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    keep = weights > 0
+    values, weights = values[keep], weights[keep]
+    if not len(values):
+        raise ValueError("no positive weights")
+    total = weights.sum()
+    scalar = np.ndim(q) == 0
+    results = [_select(values, weights, p * total, total) for p in np.atleast_1d(q)]
+    return results[0] if scalar else np.array(results)
+
+
+# Below this many candidates the rest is simply sorted
+_SELECT_SORT_SIZE = 50_000
+_SELECT_SAMPLE = 20_000
+_SELECT_MARGIN = 0.02
+
+
+def _select(values, weights, need, total):
+    """Smallest value whose cumulative weight reaches ``need``.
+
+    A random sample brackets the target rank with two pivots; one pass sums
+    the weight below the bracket and keeps only the rows inside it (a few
+    percent), and repeats until the candidates are few enough to sort. A
+    bracket of one tied value holds the target, so it is the answer.
+    """
+    rng = np.random.default_rng(0)
+    while len(values) > _SELECT_SORT_SIZE:
+        p = need / total
+        sample = values[rng.integers(0, len(values), _SELECT_SAMPLE)]
+        lo, hi = np.quantile(sample, [max(p - _SELECT_MARGIN, 0.0), min(p + _SELECT_MARGIN, 1.0)])
+        below = values < lo
+        inside = ~below & (values <= hi)
+        weight_below, weight_inside = weights @ below, weights @ inside
+        if not weight_below < need <= weight_below + weight_inside:
+            break  # the sample missed the target: sort what is left
+        if lo == hi:
+            return float(lo)
+        if inside.all():
+            break  # no progress (heavy ties around the target): sort what is left
+        values, weights = values[inside], weights[inside]
+        need, total = need - weight_below, weight_inside
+    order = np.argsort(values, kind='stable')
+    cumulative = np.cumsum(weights[order])
+    position = min(np.searchsorted(cumulative, need), len(order) - 1)
+    return float(values[order[position]])
+
+
+def weighted_risk_level_cutoffs(scores, weights, quantiles=RISK_LEVEL_QUANTILES):
+    """Weighted ``(q_low, q_high)`` RiskScore cutoffs for the RiskLevel bands."""
+    return tuple(float(c) for c in weighted_quantile(scores, weights, quantiles))
+
+
+def fit_weighted_logit(X, y, weights, names=None, **kwargs):
+    """Logistic regression with sampling weights.
+
+    Point estimates maximise the weighted likelihood (weights normalised to
+    sum to n, so they do not act as replicated respondents); the covariance
+    is the robust sandwich ``H^-1 (sum w^2 r^2 x x') H^-1``, as survey
+    packages report it without strata / PSU information.
+    """
+    w = np.asarray(weights, dtype=np.float64)
+    w = w * (len(w) / w.sum())
+    result = fit_logit(X, y, names, weights=w, **kwargs)
+
+    dtype = X.dtype
+    mu = 1.0 / (1.0 + np.exp(-(X @ result.params.astype(dtype))))
+    score = (y - mu) * w.astype(dtype)
+    meat = (X.T @ (X * (score * score)[:, None])).astype(np.float64)
+    bread = result.cov  # inverse of the weighted information
+    cov = bread @ meat @ bread
+    return LogitResult(result.names, result.params, cov, result.iterations, result.converged, result.loglike)
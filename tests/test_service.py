@@ -0,0 +1,65 @@
+import asyncio
+import json
+import math
+
+import pytest
+
+from diabetes_pipeline.model import RiskModel
+from diabetes_pipeline.service import MicroBatcher, RequestError, ScoringService, score_records
+from diabetes_pipeline.synthetic import generate
+
+
+@pytest.fixture(scope='module')
+def model():
+    return RiskModel.fit(generate(5_000, seed=0))
+
+
+@pytest.fixture
+def record(model):
+    return {feature: 1.0 for feature in model.features}
+
+
+@pytest.mark.parametrize('bad', [None, math.nan, math.inf])
+def test_score_records_rejects_non_finite(model, record, bad):
+    with pytest.raises(RequestError, match="'BMI' in record 1"):
+        score_records(model, [record, dict(record, BMI=bad)])
+
+
+def test_batcher_survives_disconnected_client(model, record):
+    async def run():
+        batcher = MicroBatcher(model, max_delay=0.05).start()
+        try:
+            good = asyncio.ensure_future(batcher.submit(record))
+            gone = asyncio.ensure_future(batcher.submit(record))
+            bad = asyncio.ensure_future(batcher.submit({}))
+            await asyncio.sleep(0.001)
+            gone.cancel()  # the client hung up while its batch was queued
+            assert (await good)['RiskLevel'] is not None
+            with pytest.raises(RequestError):
+                await bad
+            later = await asyncio.wait_for(batcher.submit(record), 2)
+            assert later['RiskScore'] == (await good)['RiskScore']
+        finally:
+            await batcher.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 10))
+
+
+@pytest.mark.parametrize('length', [b'abc', b'-5'])
+def test_invalid_content_length_is_400(model, length):
+    async def run():
+        service = await ScoringService(model).start(port=0)
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', service.port)
+            writer.write(b'POST /score HTTP/1.1\r\nContent-Length: ' + length + b'\r\n\r\n')
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), 2)
+            writer.close()
+            await writer.wait_closed()
+        finally:
+            await service.stop()
+        head, _, body = response.partition(b'\r\n\r\n')
+        assert head.startswith(b'HTTP/1.1 400 ')
+        assert json.loads(body) == {'error': 'invalid Content-Length'}
+
+    asyncio.run(asyncio.wait_for(run(), 10))
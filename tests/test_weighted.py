@@ -0,0 +1,22 @@
+import numpy as np
+
+from diabetes_pipeline.weighted import weighted_quantile
+
+
+def _inverted_cdf(values, weights, q):
+    order = np.argsort(values, kind='stable')
+    cumulative = np.cumsum(weights[order])
+    return values[order[np.searchsorted(cumulative, q * cumulative[-1])]]
+
+
+def test_weighted_quantile_all_tied():
+    assert weighted_quantile(np.zeros(100_000), np.ones(100_000), 0.5) == 0.0
+
+
+def test_weighted_quantile_mostly_tied():
+    rng = np.random.default_rng(1)
+    values = rng.integers(1, 9, 1_000_000).astype(np.float64)  # ordinal, like Income
+    values[:700_000] = 8.0
+    weights = rng.uniform(0.5, 2.0, len(values))
+    for q in (0.1, 0.5, 0.9):
+        assert weighted_quantile(values, weights, q) == _inverted_cdf(values, weights, q)